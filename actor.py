@@ -0,0 +1,85 @@
+import asyncio
+import contextlib
+import inspect
+from collections import deque
+
+from scheduler import playorder
+
+"""
+ChannelActor is the one place a channel's state gets changed from. Commands that change the queue, sub list, played set,
+toggles or arena ID are handed to it with submit() instead of running right away, and it runs them one after another,
+so a command that waits on something partway through can never have another one change the state underneath it (two
+mods hitting !next at once, a !drop landing between a !plug's check and its insert). Everything waiting when it gets
+to run is taken as one batch: the changes the batch makes are journaled with a single write (see Journal.batch()), and
+once it's done a fresh Snapshot is published and onbatch is told how many changes went through.
+
+Read only commands like !queue and !arena don't wait in line. They read the latest Snapshot, which is only ever
+replaced between batches, so they never see a batch half applied. A snapshot copies each tier as it is, and only works
+out the order they'll play in if someone asks for it, so publishing one costs about as much as copying the queue.
+"""
+
+MAXBATCH = 64  # The most changes applied in one batch, so a flood of commands can't hold the journal back for long.
+
+
+class Snapshot: # What the read only commands show, frozen as it was after the last batch.
+    __slots__ = ('version', 'tiers', 'ratios', 'streaks', 'up', 'subs', 'played', 'arenaid', '_queue')
+
+    def __init__(self, state):
+        schedule = state.schedule
+        self.version = state.version
+        self.tiers = {tier: tuple(line) for tier, line in schedule.tiers.items()}
+        self.ratios = dict(schedule.ratios)
+        self.streaks = dict(schedule.streaks)
+        self.up = schedule.up
+        self.subs = tuple(state.sublist)
+        self.played = frozenset(state.played)
+        self.arenaid = state.arenaid
+        self._queue = None
+
+    @property
+    def queue(self): # Everyone waiting, in the order they'll play. Worked out the first time something asks, since most batches are never read.
+        if self._queue is None:
+            self._queue = tuple(playorder(self.tiers, self.ratios, self.streaks, self.up))
+        return self._queue
+
+
+class ChannelActor:
+    def __init__(self, state, maxbatch=MAXBATCH):
+        self.state = state
+        self.maxbatch = maxbatch
+        self.inbox = deque()  # (function, args, future) waiting to run
+        self.task = None
+        self.snapshot = Snapshot(state)
+        self.onbatch = None  # Called with how many changes were in each batch, e.g. for the bot's metrics.
+
+    def submit(self, function, *args): # Runs function(*args) once everything submitted before it is done, and returns a future of what it returns. Coroutines are awaited.
+        future = asyncio.get_running_loop().create_future()
+        self.inbox.append((function, args, future))
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self._run())
+        return future
+
+    def publish(self): # Replaces the snapshot with the state as it is now. Only call it between batches.
+        self.snapshot = Snapshot(self.state)
+
+    async def _run(self):
+        while self.inbox:
+            batch = [self.inbox.popleft() for _ in range(min(self.maxbatch, len(self.inbox)))]
+            version = self.state.version
+            journal = self.state.journal
+            with journal.batch() if journal is not None else contextlib.nullcontext():
+                for function, args, future in batch:
+                    try:
+                        result = function(*args)
+                        if inspect.isawaitable(result):
+                            result = await result
+                    except Exception as e: # One failed change doesn't stop the rest of the batch. Whoever submitted it gets the error.
+                        if not future.done():
+                            future.set_exception(e)
+                    else:
+                        if not future.done():
+                            future.set_result(result)
+            if self.state.version != version:
+                self.publish()
+            if self.onbatch:
+                self.onbatch(len(batch))
@@ -1,11 +1,28 @@
+import time
+STARTED = time.perf_counter() # Taken before twitchio is imported, so the cold start report covers the whole startup.
 import asyncio
+import atexit
 import sqlite3
-import hivemindsecrets
+import sys
 
 from twitchio import Channel
 from twitchio.ext import commands
+from twitchio.ext.commands.stringparser import StringParser
 import datetime
-import numpy as np
+from persistence import WriteBehind
+from playerdb import PlayerLog
+from channelstate import ChannelState
+from actor import ChannelActor
+from commandline import parse
+from cooldowns import Cooldowns
+from giftbombs import GiftBombs
+from journal import Journal
+from metrics import Metrics
+from outbox import MAXLENGTH, MOD, VIEWER, Outbox
+from pages import Pages
+from responsecache import ResponseCache
+from playerqueue import Player
+from variety import VarietyIndex
 
 """
 This bot is designed to manage viewer battles for the game Super Smash Bros. Ultimate, which IntroSpecktive plays on stream.
@@ -15,75 +32,254 @@ IntroSpecktive can play people in an orderly fashion.
 
 
 """
-self.toggles is a dictionary of booleans that is used to enforce restrictions on the queue depending on the streamer's ideals.
-"newsubperk" is an on switch for the automation of a new subscriber being offered a spot on the queue upon their subscription.
-"subsonlymode" being True restricts the queue to subscribers only when IntroSpecktive feels like playing subscribers only on certain days.
-"limit" being True restricts the cardinality of the queue to 7 at a time so it doesn't get too large, which can detract viewers.
-"open" dictates whether the queue is open for joining at a given point in time.
-"verbose" was implemented so that selective bot messages can be muted in case viewers spam the bot commands.
-"variety" being True means that players who have played within the past week (determined by data within a SQLite3 database) are inhibited from joining, so that different people get a chance to play.
+Every channel the bot is in gets its own ChannelState (see channelstate.py), which holds that channel's queue, sub list,
+played set, toggles and arena ID. Commands look the state up from ctx.channel, so each chat only ever sees its own line.
+New subs get priority through the channel's Schedule (see scheduler.py), which takes turns between the new sub list,
+the regular queue and any other tiers, so none of the commands have to keep a placeholder in the queue in sync anymore.
+Commands that change a channel's state wait their turn in its ChannelActor (see actor.py), which runs them one at a
+time and journals each batch with one write. The read only commands in READONLY skip the line and answer from the
+actor's latest snapshot instead.
+
+The commands themselves live in the modules in COMMANDMODULES (queuecommands.py, subcommands.py, logcommands.py and
+modcommands.py), each a twitchio Cog loaded with load_module(). Everything they work on, like the channel states, the
+actors, the outbox and the logs, belongs to the Bot or to this module, so a mod can fix a command mid stream by editing
+its module and typing !reload: the module is imported again and its commands swapped in, without disconnecting or
+touching the queue. If the new version doesn't import, the old one stays. This file itself (the events and the helpers
+the commands share) still needs a restart to change, but the journals bring the state back when it does.
+
+Importing this file doesn't touch the database. The background writer is started when the Bot is made, and the past
+week's log and the play history (which grows with every stream, and needs NumPy) are loaded on the writer's thread by
+warmup() once the bot has connected, so commands are answered from the first second. Until then the variety check asks
+the database directly through a read only connection. How long each step took is printed as a cold start report, and
+kept in the metrics, so time to first command can be watched as the history grows.
 """
-info = {'arenaid': None} # In the game Super Smash Bros. Ultimate, IntroSpecktive creates a lobby (which the game calls an arena) for people to join. This smaller dictionary is used to store the information of the arena he has up.
-
-twitchnames = np.vectorize(lambda player: player.split("🔥")[0],otypes=[str])
-switchnames = np.vectorize(lambda player: player.split("🔥")[1],otypes=[str])
-def logfiller(): # logfiller() is a helper function used to load the data from the SQLite3 database into a Python list.
-    conn = sqlite3.connect("playerlog")
-    cursor = conn.cursor()
-    #cursor.execute("CREATE TABLE players(twitchname text, switchname text, dateplayed date)")
-    cursor.execute("DELETE FROM players WHERE dateplayed <= date('now', '-7 day')")
-    cursor.execute("SELECT * FROM players")
-    full_log = np.array(["{}🔥{}".format(i[0],i[1]) for i in cursor.fetchall()])
-    conn.commit()
-    cursor.close()
-    return full_log
-
-full_log = logfiller()
-
-def write_to_log(player): # After a player has completed their turn, their name will be recorded in the SQLite3 database.
-    conn = sqlite3.connect("playerlog")
-    cursor = conn.cursor()
-    usertwitchname = player.split("🔥")[0]
-    userswitchname = player.split("🔥")[1]
-    userdateplayed = datetime.date.today().strftime("%Y-%m-%d")
-    cursor.execute("INSERT INTO players(twitchname, switchname, dateplayed) values(:usertwitchname, :userswitchname, :userdateplayed)",{'usertwitchname': usertwitchname, 'userswitchname': userswitchname, 'userdateplayed': userdateplayed})
-    cursor.execute("SELECT * FROM players")
-    print(cursor.fetchall())
-    conn.commit()
-    cursor.close()
-    with open('log.csv', 'a') as f: # The data is also stored in a csv file in case something goes wrong.
-        f.write("{},{},{}\n".format(usertwitchname, userswitchname, datetime.date.today().strftime("%Y-%m-%d")))
-
-def backuplog(playerqueue, filename): # This function is used to store a player as backup in a csv file
-    with open(filename, 'w') as f:
-        f.write("\n".join([player.replace("🔥",",") for player in playerqueue]))
-
-def intchecker(num): # A handful of commands used to alter data structures involve an optional position argument. intchecker() is used to determine whether or not a position was provided.
-    try:
-        newnum = int(num)
-        return True
-    except:
-        return False
+
+COMMANDMODULES = ('queuecommands', 'subcommands', 'logcommands', 'modcommands') # Where the commands are, in the order they're loaded. !reload reloads them.
+READONLY = {'queue', 'playedlist', 'showsubs', 'arena', 'amiasub', 'amifree', 'history', 'topplayers', 'showlog', 'stats'} # Commands that only look at the state, so they don't wait behind the ones changing it.
+playerdb = None # A read only connection to the SQLite3 database for commands, opened by reader() the first time it's needed.
+METRICSFILE = "metrics.prom" # The bot's metrics are written here in Prometheus' text format every 15 seconds. Set to None to turn it off.
+METRICSPORT = None # Set to a port number to also serve the metrics over HTTP on localhost, e.g. 9108 for Prometheus to scrape.
+metrics = Metrics() # Command latencies, event loop lag, outbox depth and database timings, shown to mods with !stats.
+writer = WriteBehind("playerlog", "log.csv", metrics) # All writes to the database and csv files happen on this background thread so commands never wait on the disk.
+atexit.register(writer.close) # Whatever is still queued gets written out before the program exits.
+
+full_logs = {} # Channel -> the variety index of who played in the past week, filled in by warmup().
+playhistory = None # How many times everyone has played on each day, for !history and !topplayers. Loaded by warmup().
+coldplays = [] # Plays logged while the play history is loading, added to it once it's there.
+
+def reader():
+    global playerdb
+    if playerdb is None:
+        playerdb = PlayerLog("playerlog", readonly=True)
+    return playerdb
+
+def logfiller(log): # logfiller() is a helper function used to load the past week of the SQLite3 database into a variety index for each channel. It runs on the writer's thread.
+    from history import PlayHistory # NumPy is only imported once the bot is up.
+    log.archive(7) # Anything older than a week moves to the archive, where !history and !topplayers can still see it.
+    return log.players(), PlayHistory.load(log.playcounts())
+
+def write_to_log(state, player): # After a player has completed their turn, their name will be recorded in the channel's variety index, and in the SQLite3 database (and log.csv) by the background writer.
+    dateplayed = datetime.date.today()
+    state.full_log.record(player.twitch, player.switch, dateplayed)
+    if playhistory is None:
+        coldplays.append((state.name, player.twitch, dateplayed))
+    else:
+        playhistory.record(state.name, player.twitch, dateplayed)
+    writer.log_play(state.name, player.twitch, player.switch, dateplayed.strftime("%Y-%m-%d"))
+
+class Context(commands.Context): # twitchio's Context, plus the message already split up into a CommandLine (see commandline.py) as ctx.line.
+    def __init__(self, message, bot, line=None, **attrs):
+        super().__init__(message, bot, **attrs)
+        self.line = line
 
 class Bot(commands.Bot):
-    def __init__(self):
+    def __init__(self, token=None, client_id=None, client_secret=None, channels=None):
+        if token is None: # Credentials come from hivemindsecrets unless they're passed in, e.g. by loadtest.py, which never connects to Twitch.
+            import hivemindsecrets
+            token, client_id, client_secret = hivemindsecrets.token, hivemindsecrets.client_id, hivemindsecrets.client_secret
+        channels = channels or ['IntroSpecktive', 'MacAtk_', 'RedFlare006'] # This indicates the Twitch channels that the bot will be active in when the program is run.
         super().__init__(
-            token=hivemindsecrets.token,  # Put oauth in
-            client_id=hivemindsecrets.client_id,  # Put client id in
-            client_secret=hivemindsecrets.client_secret,  # Put client secret in
+            token=token,  # Put oauth in
+            client_id=client_id,  # Put client id in
+            client_secret=client_secret,  # Put client secret in
             # The above variables are more sensitive information that I would rather not share publicly, but the above lines shouldn't be empty strings.
             nick='ZardBot',
             prefix='!', # The prefix indicates what each command starts with. For instance, !join, !plug, etc.
-            initial_channels=['IntroSpecktive', 'MacAtk_', 'RedFlare006'] # This indicates the Twitch channels that the bot will be active in when the program is run.
+            initial_channels=channels
         )
-        self.next_cd = None
-        self.playerqueue = np.array([])  # Stores the current list of people in the line.
-        self.sublist = np.array([])  # On Twitch, channels have both regular viewers and subscribers, the latter being a paid subscription.
-        # As a way to give back to the subscribers, IntroSpecktive likes to give subscribers priority, hence a separate list for them.
-        self.played = set()  # Once people have finished their turn, their name will be stored in this set to inhibit them from
-        # rejoining the queue so that more people have a chance to play.
-        self.toggles = {'newsubperk': True, 'subsonlymode': False, 'limit': True, 'open': False, 'verbose': True,
-                   'variety': False, 'runback': False}
+        self.startup = {}  # Stage -> seconds after STARTED it was reached, for the cold start report.
+        self.stage("imported")
+        self.expire_task = None
+        self.warmup_task = None
+        self.warm = False  # Whether the past week's log and the play history have been loaded.
+        self.metrics_tasks = []
+        self.channelstates = {}  # Channel name -> ChannelState, created the first time a channel is heard from.
+        self.actors = {}  # Channel name -> the ChannelActor every change to that channel's state goes through.
+        self.outbox = Outbox()  # Every message the bot sends goes through here so that it stays under Twitch's rate limits.
+        self.responses = ResponseCache(10)  # Answers to read-only commands, reused until the channel's state changes and not repeated within 10 seconds.
+        self.pages = {}  # (channel, command) -> the Pages that command's list is shown in.
+        self.cooldowns = Cooldowns()  # How many more times each viewer can use each command right now.
+        self.giftbombs = GiftBombs(self.giftbomb)  # Gifted subs are collected here so a bomb of 100 is one sub list change and one message.
+        metrics.gauge("outbox_depth", self.outbox.depth)
+        metrics.gauge("messages_sent", self.outbox.sent, "counter")
+        metrics.gauge("writer_backlog", writer.pending.qsize)
+        writer.start()
+        for channel in channels: # The state from before a restart is brought back right away, so no one has to refill the queue by hand.
+            self.loadstate(channel)
+        for name in COMMANDMODULES:
+            self.load_module(name)
+        self.stage("restored")
+
+    def channelstate(self, channel): # Looks up (or sets up) the state of the channel a command or event came from.
+        return self.channelstates.get(channel.name.lower()) or self.loadstate(channel.name)
+
+    def loadstate(self, name): # Sets up a channel's state and replays its journal, so it picks up exactly where it was before the bot last stopped.
+        name = name.lower()
+        start = time.perf_counter()
+        state = ChannelState(name, full_logs.setdefault(name, VarietyIndex(7)))
+        journal = Journal(writer, name)
+        journal.attach(state)
+        replayed = journal.replay()
+        if replayed:
+            journal.compact() # Folds what was just replayed into a fresh snapshot, so the next restart is just as quick.
+        print("Restored {} with {} in line and {} subs from {} journaled changes in {:.1f}ms".format(name, len(state.playerqueue), len(state.sublist), replayed, (time.perf_counter() - start) * 1000))
+        self.channelstates[name] = state
+        self.actors[name] = ChannelActor(state)
+        self.actors[name].onbatch = lambda changes: metrics.count("actor_changes", changes)
+        return state
+
+    def actor(self, channel): # The ChannelActor of the channel a command or event came from.
+        return self.actors[self.channelstate(channel).name]
+
+    def stage(self, name): # Notes how long after the program started a stage of startup was reached, and keeps it in the metrics.
+        seconds = self.startup[name] = time.perf_counter() - STARTED
+        metrics.gauge("startup_{}_seconds".format(name), lambda: "{:.3f}".format(seconds))
+        return seconds
+
+    def playedrecently(self, state, twitch): # The variety check. Until warmup() is done, anyone not already in the index is looked up in the database.
+        if twitch in state.full_log:
+            return True
+        if self.warm:
+            return False
+        try:
+            return reader().played_since(state.name, twitch, 7)
+        except sqlite3.Error as e: # e.g. the database is still being created on the very first run, so there's no one to find yet.
+            print("Couldn't check {} in the database: {}".format(twitch, e))
+            return False
+
+    async def warmup(self): # Loads the past week's log and the play history on the writer's thread while commands keep being answered.
+        global playhistory
+        start = time.perf_counter()
+        future = writer.call(logfiller)
+        coldplays.clear() # Anything logged before the call was queued is already in the database it reads.
+        try:
+            rows, history = await asyncio.wrap_future(future)
+        except Exception as e: # The variety check keeps asking the database, so the bot still works, just without !history and !topplayers.
+            print("Couldn't load the full log: {}".format(e))
+            return
+        plays = {}
+        for channel, twitchname, switchname, dateplayed in rows:
+            plays.setdefault(channel, []).append((twitchname, switchname, dateplayed))
+        for channel, channelplays in plays.items(): # The indexes are already shared with each ChannelState, so they're added to rather than replaced.
+            full_log = full_logs.setdefault(channel, VarietyIndex(7))
+            if channel in self.actors: # Loaded between the channel's batches like any other change, so no command sees the index half filled. The actor publishes a new snapshot for !amifree once it's done.
+                await self.actors[channel].submit(full_log.load, channelplays)
+            else:
+                full_log.load(channelplays)
+        for play in coldplays:
+            history.record(*play)
+        playhistory = history
+        coldplays.clear()
+        self.warm = True
+        self.stage("warm")
+        print("{} players in the full log".format(sum([len(full_log) for full_log in full_logs.values()]))) # I am printing the size of the full log in the terminal (not the Twitch chat) so I can verify that it is working.
+        print("Cold start: {} ({} plays this week and {} person-days of play history loaded in {:.2f}s)".format(
+            ", ".join(["{} at {:.2f}s".format(name, seconds) for name, seconds in self.startup.items()]), len(rows), len(history), time.perf_counter() - start))
+
+    def resolve(self, state, typed, sources): # For when a mod names someone who isn't there exactly. Returns (the name they meant, []) if only one name differs from what was typed in case, spacing or Unicode, otherwise (None, names they might have meant).
+        same = state.names.same(typed, sources)
+        if len(same) == 1:
+            return same[0], []
+        return None, same or state.names.search(typed, sources)
+
+    def didyoumean(self, text, suggestions): # Adds suggestions from resolve() onto a "not found" reply.
+        if not suggestions:
+            return text
+        return "{} Did you mean {}?".format(text, " or ".join(suggestions))
+
+    def say(self, ctx, text): # Queues a reply in the channel the command came from. Replies to moderators go out ahead of replies to viewers.
+        self.outbox.say(ctx.channel, text, MOD if ctx.author.is_mod else VIEWER)
+
+    def ack(self, ctx, text, group): # Queues a reply to the author that gets merged with other waiting replies of the same group, e.g. "@a @b the queue is closed atm. Sorry!"
+        self.outbox.ack(ctx.channel, text, group, "@{}".format(ctx.author.name), MOD if ctx.author.is_mod else VIEWER)
+
+    def cached(self, ctx, command, render, key=None): # Replies to a read-only command with its cached answer, unless that exact answer just went out.
+        state = self.channelstate(ctx.channel)
+        text = self.responses.get(state.name, command, key, self.actors[state.name].snapshot.version, render)
+        if text is not None:
+            self.say(ctx, text)
+        return text
+
+    def showpages(self, ctx, command, title, entries, numbered=True): # Replies with one page of a list, e.g. !queue 2 for the second page. entries is only called when the list has changed.
+        state = self.channelstate(ctx.channel)
+        number = int(ctx.line.target) if ctx.line.target.isdigit() else 1
+        pages = self.pages.get((state.name, command))
+        if pages is None:
+            pages = self.pages[(state.name, command)] = Pages(title, command, numbered)
+        def render():
+            pages.update(entries())
+            return pages.page(number)
+        self.cached(ctx, command, render, key=number)
+
+    def giftbomb(self, channel, gifter, recipients): # Called by GiftBombs once a bomb is over. Welcoming the subs changes the sub list, so it waits its turn with the commands.
+        self.actor(channel).submit(self.welcomesubs, channel, gifter, recipients)
+
+    def welcomesubs(self, channel, gifter, recipients): # Puts new subs on the new sub list all at once and lets them know in one message. gifter is None for someone who subscribed themselves.
+        state = self.channelstate(channel)
+        if not (state.toggles["open"] and state.toggles["newsubperk"]):
+            return
+        state.sublist.extend([Player(name, "NULL") for name in dict.fromkeys([name.lower() for name in recipients]) if not state.sublist.has_twitch(name)]) # Lowercased before the repeats are dropped, so Foo and foo in one bomb are one person.
+        offer = "Type [!optin in_game_name] or !optout depending on if you want in or not (don't actually use the [ ])"
+        if gifter is None or len(recipients) == 1:
+            newsub = recipients[0]
+            self.outbox.ack(channel, "@{} you get priority as a new sub. {}".format(newsub, offer), "you get priority as new subs. {}".format(offer), "@{}".format(newsub))
+        else:
+            metrics.count("gift_bombs")
+            text = "Thanks @{} for the {} gift subs!".format(gifter, len(recipients))
+            tail = " you get priority as new subs. {}".format(offer)
+            mentioned = 0
+            for newsub in recipients: # As many of them as fit in one message are mentioned, and the rest can find themselves in !showsubs.
+                mention = " @{}".format(newsub)
+                rest = len(recipients) - mentioned - 1
+                if len(text) + len(mention) + len(tail) + (len(" and 999 more (see !showsubs)") if rest else 0) > MAXLENGTH:
+                    break
+                text += mention
+                mentioned += 1
+            if mentioned < len(recipients):
+                text += " and {} more (see !showsubs)".format(len(recipients) - mentioned)
+            self.outbox.say(channel, text + tail)
+        print("Sub message sent")
+
+    async def close(self): # Gives waiting messages a few seconds to go out before disconnecting.
+        self.giftbombs.flush()
+        await self.outbox.close()
+        await super().close()
+
+    async def expirelog(self): # Drops people from the variety index as their week runs out, and cleans the same rows out of the database in the background.
+        if self.warmup_task is not None: # Until the past week is loaded, the indexes can't say when the first person's week is up.
+            await asyncio.wait([self.warmup_task])
+        while True:
+            expired = 0
+            for name, full_log in list(full_logs.items()):
+                if name in self.actors:
+                    expired += await self.actors[name].submit(full_log.expire)
+                else:
+                    expired += full_log.expire()
+            if expired:
+                writer.archive(7)
+            today = datetime.date.today() # Sleeps until the day the next week is up. Anyone who plays in the meantime has a whole week to go, so an empty index waits that long.
+            wake = min([full_log.next_expiry() or today + datetime.timedelta(days=full_log.days) for full_log in full_logs.values()], default=today + datetime.timedelta(days=1))
+            await asyncio.sleep(max(0.0, (datetime.datetime.combine(wake, datetime.time()) - datetime.datetime.now()).total_seconds()))
 
     async def cooldown(self):
         print("nextn't")
@@ -93,27 +289,65 @@ class Bot(commands.Bot):
 
     async def event_ready(self,): # This is the function that gets triggered when the bot starts up.
         print(f"ZardBot is sent out!")
-        print(full_log) # I am printing the full_log in the terminal (not the Twitch chat) so I can verify that it is working.
+        if "ready" not in self.startup:
+            self.stage("ready")
+        if self.warmup_task is None:
+            self.warmup_task = asyncio.create_task(self.warmup())
+        if self.expire_task is None or self.expire_task.done():
+            self.expire_task = asyncio.create_task(self.expirelog())
+        if not self.metrics_tasks:
+            self.metrics_tasks.append(asyncio.create_task(metrics.sample_lag()))
+            if METRICSFILE:
+                self.metrics_tasks.append(asyncio.create_task(metrics.export(METRICSFILE)))
+            if METRICSPORT:
+                self.metrics_tasks.append(asyncio.create_task(metrics.serve(METRICSPORT)))
 
     async def event_message(self,ctx): # This function is to ensure that commands are handles properly independent of viewer messages. ctx is a parameter in many of the functions indicating the context, or the message that induced the command.
-        await bot.handle_commands(ctx)
+        if ctx.echo:
+            return
+        content = ctx.content
+        if ctx.tags and "reply-parent-msg-id" in ctx.tags: # Replies in Twitch chat start with @name of the person being replied to.
+            content = content.partition(" ")[2]
+        line = parse(content)
+        if line is None: # Most of chat isn't commands, and stops here after one character is looked at.
+            return
+        command = self.commands.get(line.command)
+        if command is None: # Neither do typos and other bots' commands get any further than a dictionary lookup.
+            metrics.count("unknown_commands")
+            return
+        if not ctx.author.is_mod: # Viewers going over a command's cooldown are ignored without an answer, so spamming it gets them nothing.
+            state = self.channelstate(ctx.channel)
+            if not self.cooldowns.allow(state.name, ctx.author.name.lower(), command.name, state.cooldowns.get(command.name)):
+                metrics.count("throttled_commands", command=command.name)
+                return
+        start = time.perf_counter()
+        # twitchio's handle_commands() would tokenize the message all over again, so the context is built from the CommandLine instead.
+        context = Context(message=ctx, bot=self, prefix="!", command=command, valid=True, view=StringParser(), line=line)
+        if command.name in READONLY:
+            await self.invoke(context)
+        else:
+            await self.actor(ctx.channel).submit(self.invoke, context)
+        metrics.observe("command_seconds", time.perf_counter() - start, command=command.name)
+        if "firstcommand" not in self.startup:
+            print("Cold start: first command (!{}) answered {:.2f}s after starting".format(command.name, self.stage("firstcommand")))
 
     async def event_command_error(self,ctx,error): # This function is used to ignore errors, such as if a user types a command that doesn't exist.
+        metrics.count("command_errors", error=type(error).__name__)
         print(error)
 
     async def event_raw_usernotice(self,channel,tags):
+        state = self.channelstate(channel)
         print(tags)
-        if tags["msg-id"] in ["subgift","sub"] and self.toggles["open"] and self.toggles["newsubperk"]:
-            if tags["msg-id"]=="subgift":
-                newsub = tags['msg-param-recipient-display-name']
-            else:
-                newsub = tags['display-name']
-            if "check !showsubs🔥check !showsubs" not in self.playerqueue:
-                self.playerqueue = np.insert(self.playerqueue, 1, "check !showsubs🔥check !showsubs")
-            self.sublist = np.append(self.sublist, np.array(["{}🔥NULL".format(newsub.lower())]))
-            backuplog(self.sublist, "backupsublog.csv")
-            await channel.send("@{} you get priority as a new sub. Type [!optin in_game_name] or !optout depending on if you want in or not (don't actually use the [ ])".format(newsub))
-            print("Sub message sent")
+        if not (state.toggles["open"] and state.toggles["newsubperk"]):
+            return
+        msgid = tags["msg-id"]
+        if msgid == "sub":
+            await self.actor(channel).submit(self.welcomesubs, channel, None, [tags['display-name']])
+        elif msgid in ("subgift", "anonsubgift"): # Gifts are collected by origin ID (or gifter) and welcomed together once the bomb is over.
+            self.giftbombs.add(channel, tags.get('msg-param-origin-id'), tags.get('display-name') or tags.get('login'), tags['msg-param-recipient-display-name'])
+        elif msgid in ("submysterygift", "anonsubmysterygift"): # Comes before the gifts themselves, with how many there will be.
+            count = tags.get('msg-param-mass-gift-count', '')
+            self.giftbombs.expect(channel, tags.get('msg-param-origin-id'), tags.get('display-name') or tags.get('login'), int(count) if count.isdigit() else None)
     """
     async def event_usernotice_subscription(self,ctx): # When a new user subscribes, they do have the option of new subscriber priority, which they can opt in.
         print("New sub")
@@ -127,426 +361,31 @@ class Bot(commands.Bot):
                 await ctx.channel.send("@{} you get priority as a new sub. Type [!optin in_game_name] or !optout depending on if you want in or not (don't actually use the [ ])".format(ctx.user.name))
                 print("Sub message sent")
     """
-    @commands.command(name='toggle') # !toggle keyname is used by moderators to toggle on or off the various restrictions for the stream.
-    async def toggle(self,ctx):
-        if ctx.author.is_mod:
-            if ' ' not in ctx.message.content:
-                await ctx.channel.send("@{} you forgot to give an argument for what is to be toggled.".format(ctx.author.name))
-            else:
-                if ctx.message.content.split(' ')[1].lower() not in self.toggles.keys():
-                    await ctx.channel.send("@{} {} is not a togglable argument. Current togglable arguments: {}".format(ctx.author.name, ctx.message.content.split()[1], self.toggles))
-                else:
-                    self.toggles[ctx.message.content.split(' ')[1].lower()] = not self.toggles[ctx.message.content.split(' ')[1].lower()]
-                    await ctx.channel.send("@{} here are the states of your booleans: {}".format(ctx.author.name, self.toggles))
-
-    @commands.command(name='setid')
-    async def setid(self,ctx): # !setid ARENA_ID allows a moderator to alter the arena ID.
-        if ctx.author.is_mod:
-            temp = ctx.message.content.split(" ")
-            if len(temp) < 2:
-                await ctx.channel.send("@{} you need to provide an arena ID. Type !setid ARENA_ID".format(ctx.author.name))
-            else:
-                info['arenaid'] = temp[1]
-                await ctx.channel.send("@{} the ID has been set to {}".format(ctx.author.name,info['arenaid']))
-
-    @commands.command(name='arena')
-    async def arena(self,ctx): # !arena prints the arena ID in the chat so that viewers can join.
-        await ctx.channel.send("{}".format(info['arenaid']))
-
-    @commands.command(name='amiasub')
-    async def amiasub(self,ctx):
-        await ctx.channel.send("{}".format(ctx.author.is_subscriber))
-
-    @commands.command(name='amifree')
-    async def amifree(self,ctx): # !amifree allows a user to check if they can play today.
-        if self.toggles['variety']:
-            if ctx.author.name.lower() in twitchnames(full_log) or ctx.author.name.lower() in self.played:
-                await ctx.channel.send("@{} you have played in the past week or just now. In either case, give others a chance pls.".format(ctx.author.name))
-            else:
-                await ctx.channel.send("@{} all clear! Go for it!!".format(ctx.author.name))
-        else:
-            if ctx.author.name.lower() in self.played:
-                await ctx.channel.send("@{} you have played today already. Give others a chance pls.".format(ctx.author.name))
-            else:
-                await ctx.channel.send("@{} all clear! Go for it!!".format(ctx.author.name))
-
-    @commands.command(name='optin')
-    async def optin(self,ctx): # !optin in_game_name is to be used by the new subscriber, but only intended if they were propmpted to do so from event_usernotice_subscription()
-        if ctx.author.name.lower() in twitchnames(self.sublist):
-            if " " in ctx.message.content: # The user needs to provide their in game name so that the streamer can verify that it's actually them when they join his lobby.
-                self.sublist[np.where(twitchnames(self.sublist)==ctx.author.name.lower())] = ctx.author.name.lower()+"🔥"+' '.join(ctx.message.content.split(" ")[1:]).lower()
-                backuplog(self.sublist, "backupsublog.csv")
-                await ctx.channel.send("@{} you've been registered in the new subs list! The arena ID is {}".format(ctx.author.name, info["arenaid"]))
-            else:
-                await ctx.channel.send("@{} you need to provide your in game name too! Type [!optin in_game_name]".format(ctx.author.name))
-        else:
-            await ctx.channel.send("@{} you're not on the new sub list rn.".format(ctx.author.name))
-
-    @commands.command(name='optout')
-    async def optout(self,ctx): # !optout is also intended for the user to opt out, but only if they were prompted to do so from event_usernotice_subscription().
-        if ctx.author.name.lower() in twitchnames(self.sublist):
-            self.sublist = np.delete(self.sublist,np.where(twitchnames(self.sublist)==ctx.author.name.lower()))
-            if self.sublist.shape[0] == 0:
-                self.playerqueue = np.delete(self.playerqueue,np.where(self.playerqueue=="check !showsubs🔥check !showsubs"))
-            await ctx.channel.send("@{} you've opted out of the new sub list.".format(ctx.author.name))
-        else:
-            await ctx.channel.send("@{} you're not on the new sub list rn.".format(ctx.author.name))
-
-    @commands.command(name='queue')
-    async def queue(self,ctx): # !queue prints the current state of the player list in chat.
-        print(self.playerqueue)
-        await ctx.channel.send("{}".format(self.playerqueue))
-
-    @commands.command(name='playedlist')
-    async def playedlist(self,ctx): # !playedlist prints the state of the current set of players who have played during the stream in chat.
-        print(self.played)
-        await ctx.channel.send("{}".format(self.played))
-
-    @commands.command(name='showsubs')
-    async def showsubs(self,ctx): # !showsubs prints the state of the subscriber list in chat.
-        print(self.sublist)
-        await ctx.channel.send("{}".format(self.sublist))
-
-    @commands.command(name='remove')
-    async def remove(self,ctx): # !remove player is a moderator command used to remove someone from playerqueue, as well as sublist.
-        if ctx.author.is_mod:
-            if ' ' in ctx.message.content:
-                userplayed = ' '.join(ctx.message.content.split(' ')[1:]).lower()
-                if userplayed in np.append(twitchnames(self.playerqueue),switchnames(self.playerqueue)):
-                    ind = np.where(twitchnames(self.playerqueue)==userplayed)
-                    if len(ind[0])==0:
-                        ind = np.where(switchnames(self.playerqueue)==userplayed)
-                    person = twitchnames(self.playerqueue)[ind][0]
-                    #self.played.add(person)
-                    #write_to_log(self.playerqueue[ind])
-                    self.playerqueue = np.delete(self.playerqueue,ind)
-                    await ctx.channel.send("{} has been removed from the queue.".format(person))
-                else:
-                    await ctx.channel.send("{} isn't in the queue.".format(userplayed))
-            else:
-                await ctx.channel.send("@{} who did you want to remove? Type [!remove userplayed] referring to their in game or Twitch name (w/o the [])".format(ctx.author.name))
-
-    @commands.command(name='clearqueue')
-    async def clearqueue(self,ctx): # If necessary, a moderator can clear the entire self.playerqueue and self.sublist.
-        if ctx.author.is_mod:
-            if "check !showsubs🔥check !showsubs" in self.playerqueue:
-                self.sublist = np.array([])
-            self.playerqueue = np.array([])
-            await ctx.channel.send("@{} the player queue has been cleared".format(ctx.author.name))
-
-    @commands.command(name='removesub')
-    async def removesub(self,ctx): # !removesub player is a moderator only command to remove a subscriber from self.sublist specifically.
-        if ctx.author.is_mod:
-            if ' ' in ctx.message.content:
-                userplayed = ' '.join(ctx.message.content.split(' ')[1:]).lower()
-                if userplayed in np.append(twitchnames(self.sublist),switchnames(self.sublist)):
-                    ind = np.where(twitchnames(self.sublist) == userplayed)
-                    if len(ind[0]) == 0:
-                        ind = np.where(switchnames(self.sublist) == userplayed)
-                    self.sublist = np.delete(self.sublist, ind)
-                    if len(self.sublist) == 0 and self.playerqueue[1] == "check !showsubs🔥check !showsubs":
-                        self.playerqueue = np.delete(self.playerqueue, 1)
-                    await ctx.channel.send("{} has been removed from the sublist.".format(userplayed))
-                else:
-                    await ctx.channel.send("{} isn't in the sublist.".format(userplayed))
-            else:
-                await ctx.channel.send("@{} who did you want to remove? Type [!removesub persontoremove] referring to their in game or Twitch name (w/o the [])".format(ctx.author.name))
-
-    @commands.command(name='clearsubs')
-    async def clearsubs(self,ctx): # !clearsubs is used to clear the subscriber list specifically.
-        if ctx.author.is_mod:
-            self.sublist = np.array([])
-            if "check !showsubs🔥check !showsubs" in self.playerqueue:
-                self.playerqueue = np.delete(self.playerqueue,np.where(twitchnames(self.playerqueue)=="check !showsubs"))
-            await ctx.channel.send("@{} the sub list has been cleared".format(ctx.author.name))
-
-    @commands.command(name='removeplayed')
-    async def removeplayed(self,ctx): # !removeplayed player is a moderator command that removes a player from the set of played players.
-        if ctx.author.is_mod:
-            if ' ' in ctx.message.content:
-                userplayed = ' '.join(ctx.message.content.split(' ')[1]).lower()
-                if userplayed in self.played:
-                    self.played.remove(userplayed)
-                    await ctx.channel.send("{} has been removed from the played list.".format(userplayed))
-                else:
-                    await ctx.channel.send("{} isn't in the played list.".format(userself.played))
-            else:
-                await ctx.channel.send("@{} who did you want to remove? Type [!removeplayed user] referring to their in game or Twitch name (w/o the [])".format(ctx.author.name))
-
-    @commands.command(name='clearplayed')
-    async def clearplayed(self,ctx): # clearplayed is a moderator command to clear the set of played players.
-        if ctx.author.is_mod:
-            self.played.clear()
-            await ctx.channel.send("@{} the played list has been cleared".format(ctx.author.name))
-
-    @commands.command(name='pluglog')
-    async def pluglog(self,ctx): # !pluglog twitchname switchname is a command used to insert a player into the full_log()
-        if ctx.author.is_mod:
-            if ' ' in ctx.message.content:
-                templist = ctx.message.content.split(' ')
-                if templist[1].lower() in twitchnames(full_log):
-                    await ctx.channel.send("{} is already in the full log".format(templist[1]))
-                elif len(templist) < 3:
-                    await ctx.channel.send("@{} not enough positional arguments. It's [!pluglog twitchname switchname position] without the [ ] (position is optional). If no information is provided on Twitch name, use 'NULL' instead".format(ctx.author.name))
-                elif not intchecker(templist[-1]):
-                    full_log = np.append(full_log,np.array([templist[1].lower()+"🔥"+' '.join(templist[2:]).lower()]))
-                    write_to_log(full_log[-1])
-                    await ctx.channel.send("{} has been added to the full log at the back".format(full_log[-1]))
-                else:
-                    full_log = np.insert(full_log,int(templist[-1]), templist[1].lower()+"🔥"+' '.join(templist[2:-1]).lower())
-                    await ctx.channel.send("{} has been added to the full log at position {}".format(' '.join(templist[2:-1]).lower(),templist[-1]))
-            else:
-                await ctx.channel.send("@{} not enough positional arguments. It's [!pluglog twitchname switchname position] without the [ ] (position is optional). If no information is provided on Twitch name, use 'NULL' instead".format(ctx.author.name))
-
-    @commands.command(name='removelog')
-    async def removelog(self,ctx): # !removelog player is used to remove a person from the full_log as well as the SQLite3 database.
-        if ctx.author.is_mod:
-            if ' ' in ctx.message.content:
-                person = ' '.join(ctx.message.content.split(' ')[1:]).lower()
-                if person in np.append(twitchnames(full_log),switchnames(full_log)):
-                    ind = np.where(twitchnames(full_log)==person)
-                    flag = True
-                    if len(ind[0]) == 0:
-                        ind = np.where(switchnames(full_log)==person)
-                        flag = False
-                    conn = sqlite3.connect("playerlog")
-                    cursor = conn.cursor()
-                    if flag:
-                        cursor.execute("DELETE FROM players WHERE twitchname = '{}'".format(person))
-                    else:
-                        cursor.execute("DELETE FROM players WHERE switchname = '{}'".format(person))
-                    cursor.execute("SELECT * FROM players")
-                    print(cursor.fetchall())  # Printing the contents of the database to the terminal just to double check
-                    conn.commit()
-                    cursor.close()
-                    full_log = np.delete(full_log,ind)
-                    await ctx.channel.send("{} has been removed from the full log".format(person))
-                else:
-                    await ctx.channel.send("{} isn't in the full log".format(person))
-            else:
-                await ctx.channel.send("@{} not enough positional arguments. It's [!removelog twitchname] or [!removelog switchname] without the [ ]".format(ctx.author.name))
-    '''
-    @bot.command(name='clearlog')
-    async def clearlog(ctx):
-        if ctx.author.is_mod:
-            conn = sqlite3.connect("playerlog")
-            cursor = conn.cursor()
-            cursor.execute("DELETE FROM players")
-            cursor.execute("SELECT * FROM players")
-            print(cursor.fetchall())
-            conn.commit()
-            cursor.close()
-            full_log.clear()
-            await ctx.channel.send("@{} the full log has been cleared".format(ctx.author.name))
-    '''
-    @commands.command(name='showlog')
-    async def showlog(self,ctx): # !showlog is a moderator only command that prints the database contents to the terminal, usually only intended for the moderator running the program.
-        if ctx.author.is_mod:
-            print(full_log)
-            conn = sqlite3.connect("playerlog")
-            cursor = conn.cursor()
-            cursor.execute("SELECT * FROM players")
-            print(cursor.fetchall())
-            conn.commit()
-            cursor.close()
-
-    @commands.command(name='next')
-    async def next(self,ctx): # !next is the command intended for the streamer to use once they're finished with a person. This takes into account subscriber priority as well.
-        if (self.next_cd==None or self.next_cd.done()) and ctx.author.is_mod:
-            if len(self.playerqueue) > 0:
-                if self.playerqueue[0] != "check !showsubs🔥check !showsubs":
-                    removed = self.playerqueue[0]
-                    self.playerqueue = self.playerqueue[1:]
-                    self.played.add(removed.split("🔥")[0])
-                    write_to_log(removed)
-                    if len(self.playerqueue) > 0:
-                        if self.playerqueue[0] != "check !showsubs🔥check !showsubs":
-                            await ctx.channel.send("{} is done. {} is up next! The arena info is in !arena, so pls join the room".format(removed, self.playerqueue[0]))
-                        else:
-                            await ctx.channel.send("{} is done. {} is up next! The arena info is in !arena, so pls join the room".format(removed, self.sublist[0]))
-                    else:
-                        await ctx.channel.send("{} is done. No one else in line!".format(removed))
-                else:
-                    removed = self.sublist[0]
-                    self.sublist = self.sublist[1:]
-                    self.played.add(removed.split("🔥")[0])
-                    write_to_log(removed)
-                    if len(self.sublist) == 0:
-                        self.playerqueue = self.playerqueue[1:]
-                        if len(self.playerqueue) > 0:
-                            await ctx.channel.send("{} is done. {} is up next! The arena info is in !arena, so pls join the room".format(removed, self.playerqueue[0]))
-                        else:
-                            await ctx.channel.send("{} is done. No one else in line!".format(removed))
-                    else:
-                        await ctx.channel.send("{} is done. {} is up next! The arena info is in !arena, so pls join the room".format(removed, self.sublist[0]))
-                backuplog(self.playerqueue, "backuplog.csv")
-            else:
-                await ctx.channel.send("No one's in line!")
-            self.next_cd = asyncio.create_task(self.cooldown())
-
-    @commands.command(name='join')
-    async def join(self,ctx): # !join ingamename is the command for users to join the queue.
-        if not self.toggles['open']:
-            await ctx.channel.send("@{} the queue is closed atm. Sorry!".format(ctx.author.name))
-        elif self.toggles['variety'] and ctx.author.name.lower() in twitchnames(full_log):
-            await ctx.channel.send("@{} you already played recently. Sorry!".format(ctx.author.name))
-        elif not self.toggles['runback'] and ctx.author.name.lower() in self.played:
-            await ctx.channel.send("@{} you already played today. Sorry!".format(ctx.author.name))
-        elif self.toggles['subsonlymode'] and not ctx.author.is_subscriber:
-            if self.toggles['verbose']:
-                await ctx.channel.send("@{} the queue is subs only rn. Sorry!".format(ctx.author.name))
-            else:
-                print("No verbose lol")
-        elif self.toggles['limit'] and len(self.playerqueue) >= 7:
-            if self.toggles['verbose']:
-                await ctx.channel.send("@{} The queue is full. Try joining when Intro hits !next".format(ctx.author.name))
-            else:
-                print("No verbose lol")
-        elif ctx.author.name.lower() in twitchnames(self.playerqueue):
-            await ctx.channel.send("@{} you're already in the queue".format(ctx.author.name))
-        else:
-            if ' ' in ctx.message.content:
-                self.playerqueue = np.append(self.playerqueue,ctx.author.name.lower()+"🔥"+' '.join(ctx.message.content.split(' ')[1:]).lower())
-                backuplog(self.playerqueue, "backuplog.csv")
-                await ctx.channel.send("@{} I've added you to the queue! Your in game name is {}".format(ctx.author.name, ' '.join(ctx.message.content.split(' ')[1:]).lower()))
-            else:
-                await ctx.channel.send("@{} you didn't provide enough arguments! It's [!join in_game_name] without the [ ]".format(ctx.author.name))
-
-    @commands.command(name='drop')
-    async def drop(self,ctx): # If a user can no longer play, they can type !drop to remove themselves from the queue.
-        if ctx.author.name.lower() in twitchnames(self.playerqueue):
-            self.playerqueue = np.delete(self.playerqueue,np.where(twitchnames(self.playerqueue)==ctx.author.name.lower()))
-            await ctx.channel.send("@{} you have dropped from the queue".format(ctx.author.name))
-            backuplog(self.playerqueue, "backuplog.csv")
-        elif ctx.author.name.lower() in twitchnames(self.sublist):
-            self.sublist = np.delete(self.sublist,np.where(twitchnames(self.sublist)==ctx.author.name.lower()))
-            await ctx.channel.send("@{} you have dropped from the queue".format(ctx.author.name))
-            backuplog(self.playerqueue, "backupsublog.csv")
-        else:
-            await ctx.channel.send("@{} you aren't in the queue".format(ctx.author.name))
-
-    @commands.command(name='rename')
-    async def rename(self,ctx):  # If a user input their name wrong when joining, they can use !changename newingamename to fix the mishap.
-            if ctx.author.name.lower() in twitchnames(self.playerqueue):
-                templist = ctx.message.content.split(' ')
-                if len(templist) < 2:
-                    await ctx.channel.send("@{} not enough positional arguments. It's !rename newingamename".format(ctx.author.name))
-                else:
-                    self.playerqueue[np.where(twitchnames(self.playerqueue)==ctx.author.name.lower())] = ctx.author.name.lower()+"🔥"+' '.join(templist[1:]).lower()
-                    await ctx.channel.send("@{} I've changed your in game name to {}".format(ctx.author.name,' '.join(templist[1:]).lower()))
-                    backuplog(self.playerqueue, "backuplog.csv")
-            elif ctx.author.name.lower() in twitchnames(self.sublist):
-                templist = ctx.message.content.split(' ')
-                if len(templist) < 2:
-                    await ctx.channel.send("@{} not enough positional arguments. It's !rename newingamename".format(ctx.author.name))
-                else:
-                    self.sublist[np.where(twitchnames(self.sublist)==ctx.author.name.lower())] = ctx.author.name.lower()+"🔥"+' '.join(templist[1:]).lower()
-                    await ctx.channel.send("@{} I've changed your in game name to {}".format(ctx.author.name, ' '.join(templist[1:]).lower()))
-                    backuplog(self.sublist, "backupsublog.csv")
-            else:
-                await ctx.channel.send("@{} you're not in the queue".format(ctx.author.name))
-
-    @commands.command(name='changename')
-    async def changename(self,ctx): # If a user input their name wrong when joining, a moderator can use !changename twitchname newingamename to fix the mishap.
+    @commands.command(name='reload') # !reload is a moderator only command that loads the command modules again after they've been edited, without restarting the bot. !reload queuecommands reloads just that one.
+    async def reload(self,ctx):
         if ctx.author.is_mod:
-            templist = ctx.message.content.split(' ')
-            if templist[1].lower() in twitchnames(self.playerqueue):
-                if len(templist) < 3:
-                    await ctx.channel.send("@{} not enough positional arguments. It's !changename twitchname newingamename".format(ctx.author.name))
-                else:
-                    self.playerqueue[np.where(twitchnames(self.playerqueue)==templist[1].lower())] = templist[1].lower()+"🔥"+' '.join(templist[2:]).lower()
-                    await ctx.channel.send("@{} I've changed @{}'s in game name to {}".format(ctx.author.name, templist[1].lower(), ' '.join(templist[2:]).lower()))
-                    backuplog(self.playerqueue, "backuplog.csv")
-            elif templist[1].lower() in twitchnames(self.sublist):
-                if len(templist) < 3:
-                    await ctx.channel.send("@{} not enough positional arguments. It's !changename twitchname newingamename".format(ctx.author.name))
-                else:
-                    self.sublist[np.where(twitchnames(self.sublist)==templist[1].lower())] = templist[1].lower()+"🔥"+' '.join(templist[2:]).lower()
-                    await ctx.channel.send("@{} I've changed @{}'s in game name to {}".format(ctx.author.name, templist[1].lower(), ' '.join(templist[2:]).lower()))
-                    backuplog(self.sublist, "backupsublog.csv")
+            names = [word.lower() for word in ctx.line.words] or list(COMMANDMODULES)
+            unknown = [name for name in names if name not in COMMANDMODULES]
+            if unknown:
+                self.say(ctx, "@{} there's no {} to reload. The command modules are {}".format(ctx.author.name, ", ".join(unknown), ", ".join(COMMANDMODULES)))
+                return
+            start = time.perf_counter()
+            failed = []
+            for name in names:
+                try:
+                    self.reload_module(name)
+                except Exception as e: # twitchio puts the old version back, so those commands keep working as they were.
+                    print("Couldn't reload {}: {!r}".format(name, e))
+                    failed.append("{} ({})".format(name, type(e).__name__))
+            self.responses.clear() # Answers built by the old code shouldn't be handed out again.
+            self.pages.clear()
+            metrics.count("reloads")
+            if failed:
+                self.say(ctx, "@{} couldn't reload {}, so the old version is still running. The error is in the bot's console".format(ctx.author.name, ", ".join(failed)))
             else:
-                await ctx.channel.send("@{} I couldn't find this user in the queue".format(ctx.author.name))
+                self.say(ctx, "@{} reloaded {} in {:.0f}ms".format(ctx.author.name, ", ".join(names), (time.perf_counter() - start) * 1000))
 
-    @commands.command(name='plug')
-    async def plug(self,ctx): # !plug twitchname switchname is a moderator only command to insert someone into the queue.
-        if ctx.author.is_mod:
-            if ' ' in ctx.message.content:
-                templist = ctx.message.content.split(' ')
-                if templist[1].lower() in twitchnames(self.playerqueue):
-                    await ctx.channel.send("{} is already in the queue".format(templist[1]))
-                elif len(templist) < 3:
-                    await ctx.channel.send("@{} not enough positional arguments. It's [!plug twitchname switchname position] without the [ ] (position is optional). If no information is provided on Twitch name, use 'NULL' instead".format(ctx.author.name))
-                elif not intchecker(templist[-1]):
-                    self.playerqueue = np.append(self.playerqueue,templist[1].lower()+"🔥"+' '.join(templist[2:]).lower())
-                    backuplog(self.playerqueue, "backuplog.csv")
-                    if self.playerqueue[-1] in self.played:
-                        self.played.discard(self.playerqueue[-1].split("🔥")[0])
-                    await ctx.channel.send("{} has been added to the queue at the back".format(self.playerqueue[-1]))
-                else:
-                    self.playerqueue = np.insert(self.playerqueue,int(templist[-1]), templist[1].lower()+"🔥"+' '.join(templist[2:-1]).lower())
-                    if templist[1].lower() in self.played:
-                        self.played.discard(templist[1].lower())
-                    await ctx.channel.send("{} has been added to the queue at position {}".format(' '.join(templist[2:-1]).lower(), templist[-1]))
-            else:
-                await ctx.channel.send("@{} not enough positional arguments. It's [!plug twitchname switchname position] without the [ ] (position is optional). If no information is provided on Twitch name, use 'NULL' instead".format(ctx.author.name))
-
-    @commands.command(name='plugsub')
-    async def plugsub(self,ctx):
-        if ctx.author.is_mod: # !plugsub twitchname switchname is a moderator only command used to plug someone into the self.sublist.
-            if "check !showsubs🔥check !showsubs" not in self.playerqueue:
-                self.playerqueue = np.insert(self.playerqueue,1,"check !showsubs🔥check !showsubs")
-            if ' ' in ctx.message.content:
-                templist = ctx.message.content.split(' ')
-                if templist[1].lower() in twitchnames(self.sublist):
-                    await ctx.channel.send("{} is already in the queue".format(templist[1]))
-                elif len(templist) < 3:
-                    await ctx.channel.send("@{} not enough positional arguments. It's [!plugsub twitchname switchname position] without the [ ] (position is optional). If no information is provided on Twitch name, use 'NULL' instead".format(ctx.author.name))
-                elif not intchecker(templist[-1]):
-                    self.sublist = np.append(self.sublist,templist[1].lower()+"🔥"+' '.join(templist[2:]).lower())
-                    backuplog(self.sublist, "backupsublog.csv")
-                    if self.sublist[-1] in self.played:
-                        self.played.discard(self.sublist[-1].split("🔥")[0])
-                    await ctx.channel.send("{} has been added to the sublist at the back".format(self.sublist[-1]))
-                else:
-                    self.sublist = np.insert(self.sublist,int(templist[-1]), templist[1].lower()+"🔥"+' '.join(templist[2:-1]).lower())
-                    if templist[1].lower() in self.played:
-                        self.played.discard(templist[1].lower())
-                    await ctx.channel.send("{} has been added to the sublist at position {}".format(' '.join(templist[2:-1]).lower(), templist[-1]))
-            else:
-                await ctx.channel.send("@{} not enough positional arguments. It's [!plugsub twitchname switchname position] without the [ ] (position is optional). If no information is provided on Twitch name, use 'NULL' instead".format(ctx.author.name))
-
-    @commands.command(name='plugplayed')
-    async def plugplayed(self,ctx): # !plugplayed switchname twitchname is a moderator only command to add a user to the set of players who already played.
-        if ctx.author.is_mod:
-            if ' ' in ctx.message.content:
-                templist = ctx.message.content.split(' ')
-                if templist[1].lower() in self.played:
-                    await ctx.channel.send("{} is already in the played list".format(templist[1]))
-                elif len(templist) < 2:
-                    await ctx.channel.send("@{} not enough positional arguments. It's [!plugplayed twitchname] without the [ ]. If no information is provided on Twitch name, just use their Switch name as a placeholder".format(ctx.author.name))
-                else:
-                    self.played.add(templist[1].lower())
-                    await ctx.channel.send("{} has been added to the played list".format(templist[1].lower()))
-            else:
-                await ctx.channel.send("@{} not enough positional arguments. It's [!plugplayed twitchname] without the [ ]. If no information is provided on Twitch name, just use their Switch name as a placeholder".format(ctx.author.name))
-
-    @commands.command(name='fillqueue')
-    async def fillqueue(self,ctx): # In the event the program needs to be rerun, the data can be immediately loaded from backuplog.csv, which is updated alongside the queue.
-        if ctx.author.is_mod:
-            with open("backuplog.csv", 'r') as f:
-                for person in f.read().split('\n'):
-                    if ',' in person:
-                        self.playerqueue = np.append(self.playerqueue,person.replace(',',"🔥"))
-            await ctx.channel.send("@{} the queue has been restored".format(ctx.author.name))
-
-    @commands.command(name='fillsubs')
-    async def fillsubs(self,ctx): # Similarly to the above command, !fillsubs is used to restore the self.sublist.
-        if ctx.author.is_mod:
-            with open("backupsublog.csv", 'r') as f:
-                for person in f.read().split('\n'):
-                    if ',' in person:
-                        self.sublist = np.append(self.sublist,person.replace(',',"🔥"))
-            await ctx.channel.send("@{} the subs list has been restored".format(ctx.author.name))
-
-bot = Bot()
-bot.run()
\ No newline at end of file
+if __name__ == "__main__":
+    sys.modules["botsql"] = sys.modules["__main__"] # The command modules import botsql, which has to be this module rather than a second copy with its own writer and logs.
+    bot = Bot()
+    bot.run()
\ No newline at end of file
@@ -0,0 +1,118 @@
+from cooldowns import COOLDOWNS
+from nameindex import NameIndex
+from scheduler import Schedule
+from variety import VarietyIndex
+
+"""
+ChannelState holds everything the bot keeps track of for a single Twitch channel, so that one bot process can run viewer
+battles for several streamers at once without a !join in one chat landing in someone else's queue. Each channel gets
+its own schedule of priority tiers (see scheduler.py), played set, toggles, !next cooldown, arena ID, variety index and
+journal. playerqueue and sublist are the regular and new sub tiers of the schedule. names is a NameIndex (see
+nameindex.py) of everyone in the schedule, played set and variety index, which mod commands fall back on when a name
+they're given doesn't match exactly.
+
+toggles is a dictionary of booleans that is used to enforce restrictions on the queue depending on the streamer's ideals.
+"newsubperk" is an on switch for the automation of a new subscriber being offered a spot on the queue upon their subscription.
+"subsonlymode" being True restricts the queue to subscribers only when the streamer feels like playing subscribers only on certain days.
+"limit" being True restricts the cardinality of the queue to 7 at a time so it doesn't get too large, which can detract viewers.
+"open" dictates whether the queue is open for joining at a given point in time.
+"verbose" was implemented so that selective bot messages can be muted in case viewers spam the bot commands.
+"variety" being True means that players who have played within the past week (determined by data within a SQLite3 database) are inhibited from joining, so that different people get a chance to play.
+"runback" being True lets people who already played this stream join again.
+"subpriority" being True puts subscribers who !join into the sub tier of the schedule, which goes ahead of everyone else according to its ratio.
+
+cooldowns is how often viewers can use each command in this channel (see cooldowns.py), which mods change with !cooldown.
+
+version sums up the change counters of everything a read-only command can show, so it goes up on any change to them.
+When a Journal is attached (see journal.py), every change to the schedule, played set, toggles, cooldowns and arena ID is
+also passed on to it so the state can be rebuilt after a restart.
+"""
+
+
+class PlayedSet(set): # A set of twitch names that counts its changes, so cached responses built from it know when they're stale.
+    def __init__(self, *args, names=None):
+        super().__init__(*args)
+        self.version = 0
+        self.onchange = None
+        self.names = names  # A NameIndex the names are kept in as "played".
+
+    def __repr__(self): # Shown in chat just like a plain set.
+        return repr(set(self))
+
+    def add(self, name):
+        if self.names is not None and name not in self:
+            self.names.add(name, 'played')
+        super().add(name)
+        self.version += 1
+        if self.onchange:
+            self.onchange('add', name)
+
+    def discard(self, name):
+        if name in self:
+            self.remove(name)
+
+    def remove(self, name):
+        super().remove(name)
+        if self.names is not None:
+            self.names.discard(name, 'played')
+        self.version += 1
+        if self.onchange:
+            self.onchange('discard', name)
+
+    def clear(self):
+        if self.names is not None:
+            for name in self:
+                self.names.discard(name, 'played')
+        super().clear()
+        self.version += 1
+        if self.onchange:
+            self.onchange('clear')
+
+
+class Toggles(dict): # The toggles dictionary, which tells onchange whenever a toggle is flipped. The cooldowns are kept in one too.
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.onchange = None
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        if self.onchange:
+            self.onchange('set', key, value)
+
+
+class ChannelState:
+    __slots__ = ('name', 'names', 'schedule', 'playerqueue', 'sublist', 'played', 'toggles', 'cooldowns', 'next_cd', '_arenaid', '_arenaversion', 'full_log', 'journal')
+
+    def __init__(self, name, full_log=None):
+        self.name = name.lower()
+        self.names = NameIndex()  # Every twitch and in game name in the channel's lines, played set and variety index.
+        self.schedule = Schedule(names=self.names)  # Every line of people waiting to play, and whose turn it is.
+        self.playerqueue = self.schedule['regular']  # Stores the current list of people in the line.
+        self.sublist = self.schedule['newsub']  # On Twitch, channels have both regular viewers and subscribers, the latter being a paid subscription.
+        # As a way to give back to the subscribers, streamers like to give subscribers priority, hence a separate list for them.
+        self.played = PlayedSet(names=self.names)  # Once people have finished their turn, their name will be stored in this set to inhibit them from
+        # rejoining the queue so that more people have a chance to play.
+        self.toggles = Toggles({'newsubperk': True, 'subsonlymode': False, 'limit': True, 'open': False, 'verbose': True,
+                                'variety': False, 'runback': False, 'subpriority': False})
+        self.cooldowns = Toggles(COOLDOWNS)  # Command -> (uses, seconds) viewers get, or None for no limit.
+        self.next_cd = None
+        self._arenaversion = 0
+        self._arenaid = None  # In the game Super Smash Bros. Ultimate, the streamer creates a lobby (which the game calls an arena) for people to join.
+        self.full_log = full_log if full_log is not None else VarietyIndex(7)  # Everyone who played in this channel in the past week.
+        self.full_log.index_names(self.names)
+        self.journal = None
+
+    @property
+    def arenaid(self):
+        return self._arenaid
+
+    @arenaid.setter
+    def arenaid(self, arenaid):
+        self._arenaid = arenaid
+        self._arenaversion += 1
+        if self.journal is not None:
+            self.journal.record('arena', 'set', arenaid)
+
+    @property
+    def version(self):
+        return self.schedule.version + self.played.version + self.full_log.version + self._arenaversion
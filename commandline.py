@@ -0,0 +1,47 @@
+"""
+CommandLine is a chat message that starts with the command prefix, split up once when it arrives so that the commands
+don't each have to split, join and lowercase the message again. Most messages in a busy chat aren't commands at all,
+and parse() turns those away after looking at the first character.
+
+For "!plug SomeOne Their Name 3":
+    command is "plug", the word right after the prefix
+    words is ["SomeOne", "Their", "Name", "3"], everything after the command as typed
+    text is "someone their name 3", everything after the command in lowercase, e.g. the in game name for !join
+    target is "someone", the first word in lowercase, e.g. the twitch name for !plug or !changename
+    rest is "their name 3", everything after the target in lowercase
+    position is 3, since the last word is a number and there's something before it
+    name is "their name", rest without the position
+"""
+
+
+def intchecker(num): # A handful of commands used to alter data structures involve an optional position argument. intchecker() is used to determine whether or not a position was provided.
+    try:
+        newnum = int(num)
+        return True
+    except:
+        return False
+
+
+class CommandLine:
+    __slots__ = ('command', 'words', 'text', 'target', 'rest', 'name', 'position')
+
+    def __init__(self, command, words):
+        self.command = command
+        self.words = words
+        self.text = " ".join(words).lower()
+        self.target = words[0].lower() if words else ""
+        self.rest = " ".join(words[1:]).lower()
+        self.position = int(words[-1]) if len(words) >= 2 and intchecker(words[-1]) else None
+        self.name = " ".join(words[1:-1]).lower() if self.position is not None else self.rest
+
+    def __repr__(self):
+        return "CommandLine({!r}, {!r})".format(self.command, self.words)
+
+
+def parse(content, prefix="!"): # Returns a CommandLine, or None if the message isn't a command.
+    if not content.startswith(prefix):
+        return None
+    words = content[len(prefix):].lstrip().split(" ")
+    if not words[0]:
+        return None
+    return CommandLine(words[0], [word for word in words[1:] if word]) # Double spaces don't make empty words.
@@ -0,0 +1,66 @@
+import time
+from collections import OrderedDict
+
+"""
+Cooldowns keeps viewers from flooding the bot with the same command. Every (channel, user, command) gets a token bucket
+that holds up to uses tokens and refills at uses per seconds, so "!join 3 per 30 seconds" lets someone !join three times
+in a row and then once every ten seconds. A bucket is just the tokens left and when that was worked out, so checking one
+is a dictionary lookup and a little arithmetic. Commands used while the bucket is empty are dropped before they run.
+
+Buckets are kept in least recently used order. Anyone whose bucket has refilled all the way is the same as someone who
+never used the command, so those are let go from the front as new ones come in, and maxsize caps how many there can be
+during a raid of thousands of viewers.
+
+COOLDOWNS is what each channel starts with, as (uses, seconds) per command or None for no limit. Mods can change a
+channel's with !cooldown, and are never held back themselves.
+"""
+
+COOLDOWNS = {
+    'join': (3, 30),
+    'drop': (3, 30),
+    'rename': (3, 30),
+    'amifree': (2, 30),
+    'amiasub': (2, 30),
+    'queue': (2, 30),
+    'showsubs': (2, 30),
+    'playedlist': (2, 30),
+    'arena': (2, 30),
+    'optin': (3, 30),
+    'optout': (3, 30),
+}
+
+
+class Cooldowns:
+    def __init__(self, maxsize=10000):
+        self.maxsize = maxsize
+        self.buckets = OrderedDict()  # (channel, user, command) -> (tokens left, when they were counted, when it'll be full again)
+
+    def __len__(self):
+        return len(self.buckets)
+
+    def allow(self, channel, user, command, limit, now=None): # Takes a token from the user's bucket for command if there is one. limit is (uses, seconds), or None for no limit.
+        if not limit:
+            return True
+        uses, seconds = limit
+        now = time.monotonic() if now is None else now
+        key = (channel, user, command)
+        bucket = self.buckets.get(key)
+        tokens = uses if bucket is None else min(uses, bucket[0] + (now - bucket[1]) * uses / seconds)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        self.buckets[key] = (tokens, now, now + (uses - tokens) * seconds / uses)
+        self.buckets.move_to_end(key)
+        self._evict(now)
+        return allowed
+
+    def clear(self, channel=None, command=None): # Starts everyone's buckets over, e.g. after a command's cooldown is changed.
+        for key in [key for key in self.buckets if (channel is None or key[0] == channel) and (command is None or key[2] == command)]:
+            del self.buckets[key]
+
+    def _evict(self, now):
+        while self.buckets:
+            key, bucket = next(iter(self.buckets.items()))
+            if bucket[2] > now and len(self.buckets) <= self.maxsize:
+                break
+            del self.buckets[key]
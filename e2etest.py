@@ -0,0 +1,262 @@
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import re
+import signal
+import sys
+import tempfile
+import time
+
+from loadtest import percentile, recorded, synthetic
+from tmiserver import TMIServer
+
+"""
+e2etest.py measures the whole path a command takes on stream, from the IRC line arriving to the bot's reply going out,
+which loadtest.py skips by calling the bot's event handlers directly. It starts a TMIServer (see tmiserver.py), runs
+the real bot in a second process with twitchio pointed at it (in a temporary directory, with fake credentials), and
+has a crowd of viewers talk in its channels at a set rate: the same synthetic viewer battle or recorded chat file that
+loadtest.py uses, with the occasional gift bomb (a submysterygift followed by its subgifts) mixed in.
+
+Two things are reported:
+    How long commands took to be answered. Replies are matched to commands by who they mention, so each @name in a
+    reply (merged ones like "@a @b added to the queue" included) answers the latest command from that viewer. Commands
+    that never got an answer, like ones dropped by a cooldown or repeats the response cache stays quiet about, are
+    counted as unanswered, and so are mod commands whose reply is about someone else (!next calling up the next
+    player counts for that player's latest command instead). Replies wait their turn in the outbox, so these mostly
+    show Twitch's send limits at work.
+    How far behind the bot is in reading chat, from how long it takes to answer a PING sent after everything so far.
+    With --ramp the crowd talks at each rate in turn for --step seconds, and the highest rate the bot kept up with
+    (99% of PINGs answered within --maxlag seconds) is reported as the highest sustainable message rate.
+
+The server also holds the bot to Twitch's send limits, so any message the outbox let through too soon shows up as dropped.
+
+Examples:
+    python e2etest.py --messages 5000 --rate 200
+    python e2etest.py --ramp 250 500 1000 2000 4000 --step 10
+    python e2etest.py --workload battle.tsv --rate 100 --json e2e.json
+"""
+
+NICK = "zardbot"  # The bot's login on the stand-in server.
+TICK = 0.01  # How often the crowd sends whatever messages are due.
+PINGEVERY = 0.2  # Seconds between PINGs.
+BOMBS = (5, 10, 20, 50)  # How many subs a gift bomb can be.
+
+
+def crowd(workload, users, bombs, seed): # The workload with a gift bomb from a random viewer after about one in every 1/bombs messages.
+    rng = random.Random(seed)
+    origins = itertools.count(1)
+    for channel, user, flags, text in workload:
+        yield channel, user, flags, text
+        if rng.random() < bombs:
+            origin = next(origins)
+            count = rng.choice(BOMBS)
+            gifter = "viewer{}".format(rng.randrange(users))
+            yield channel, gifter, "s", "USERNOTICE msg-id=submysterygift;msg-param-mass-gift-count={};msg-param-origin-id={}".format(count, origin)
+            for _ in range(count):
+                yield channel, gifter, "s", "USERNOTICE msg-id=subgift;msg-param-origin-id={};msg-param-recipient-display-name=viewer{}".format(origin, rng.randrange(users))
+
+
+class Crowd:
+    def __init__(self, server):
+        self.server = server
+        self.pending = {}  # (channel, viewer) -> [(when, command)] not answered yet
+        self.sent = {}  # command -> how many times it was sent
+        self.latencies = {}  # command -> seconds each answered one took
+        self.lastreply = time.perf_counter()
+        server.onsend = self.replied
+
+    def say(self, channel, user, flags, text):
+        if text.startswith("USERNOTICE "):
+            tags = dict(tag.split("=", 1) for tag in text[len("USERNOTICE "):].split(";"))
+            self.server.usernotice(channel, user, tags.pop("msg-id"), tags)
+            return
+        self.server.chat(channel, user, text, "m" in flags, "s" in flags)
+        if text.startswith("!"):
+            command = text.split(" ")[0].lower()
+            self.sent[command] = self.sent.get(command, 0) + 1
+            self.pending.setdefault((channel.lower(), user.lower()), []).append((time.perf_counter(), command))
+
+    def replied(self, channel, text):
+        now = time.perf_counter()
+        self.lastreply = now
+        for name in set(re.findall(r"@(\w+)", text)):
+            waiting = self.pending.pop((channel, name.lower()), None)
+            if waiting:
+                when, command = waiting[-1]
+                self.latencies.setdefault(command, []).append(now - when)
+
+    async def talk(self, workload, rate, seconds=None): # Sends workload at rate messages a second, for seconds or until it runs out. Returns how many were sent.
+        begin = time.perf_counter()
+        count = 0
+        while seconds is None or time.perf_counter() - begin < seconds:
+            due = int((time.perf_counter() - begin) * rate) - count
+            said = 0
+            for message in itertools.islice(workload, due):
+                self.say(*message)
+                said += 1
+            count += said
+            if said < due: # The workload ran out.
+                break
+            await asyncio.sleep(TICK)
+        return count
+
+
+class Pinger:
+    def __init__(self, server):
+        self.server = server
+        self.lags = []
+        self.outstanding = None  # When the PING that hasn't been answered yet was sent.
+        self.task = None
+
+    async def run(self):
+        while True:
+            self.outstanding = time.perf_counter()
+            self.lags.append(await self.server.ping())
+            self.outstanding = None
+            await asyncio.sleep(PINGEVERY)
+
+    def take(self): # The lags since the last take(), counting a PING still waiting as late as it is so far.
+        lags, self.lags = self.lags, []
+        if self.outstanding is not None:
+            lags.append(time.perf_counter() - self.outstanding)
+        return sorted(lags)
+
+
+async def run(args, workload):
+    server = TMIServer(botismod=not args.notmod)
+    url = await server.start()
+    with open("bot.log", "w") as log:
+        process = await asyncio.create_subprocess_exec(sys.executable, os.path.abspath(__file__), "--bot", url, "--channels", *args.channels, stdout=log, stderr=log)
+    try:
+        await asyncio.wait_for(server.wait_joined(args.channels), 60)
+        await asyncio.sleep(args.settle) # Gives the bot time to finish warming up, like it would have before a battle starts.
+        crowd, pinger = Crowd(server), Pinger(server)
+        pinger.task = asyncio.create_task(pinger.run())
+        workload = iter(workload)
+        steps = []
+        begin = time.perf_counter()
+        for rate in args.ramp or [args.rate]:
+            start = time.perf_counter()
+            sent = await crowd.talk(workload, rate, args.step if args.ramp else None)
+            lags = pinger.take()
+            steps.append({
+                'rate': rate,
+                'messages': sent,
+                'achieved': sent / (time.perf_counter() - start),
+                'lagp50ms': percentile(lags, 0.50) * 1000,
+                'lagp99ms': percentile(lags, 0.99) * 1000,
+                'sustained': percentile(lags, 0.99) <= args.maxlag,
+            })
+            if args.ramp and not steps[-1]['sustained']:
+                break
+        elapsed = time.perf_counter() - begin
+        crowd.lastreply = time.perf_counter()
+        while time.perf_counter() - crowd.lastreply < args.quiet and time.perf_counter() - begin - elapsed < args.drain: # Lets the outbox finish sending what it's holding.
+            await asyncio.sleep(0.1)
+        pinger.task.cancel()
+    finally:
+        if process.returncode is None:
+            process.send_signal(signal.SIGINT)
+            try:
+                await asyncio.wait_for(process.wait(), 10)
+            except asyncio.TimeoutError:
+                process.kill()
+        await server.close()
+    sustained = [step['rate'] for step in steps if step['sustained']]
+    report = {
+        'messages': sum([step['messages'] for step in steps]),
+        'seconds': elapsed,
+        'steps': steps,
+        'sustainable': max(sustained) if sustained else None,
+        'replies': server.accepted,
+        'dropped': server.dropped,
+        'log': os.path.abspath("bot.log"),
+        'commands': {},
+    }
+    for command, count in sorted(crowd.sent.items()):
+        values = sorted(crowd.latencies.get(command, []))
+        report['commands'][command] = {
+            'sent': count,
+            'answered': len(values),
+            'p50ms': percentile(values, 0.50) * 1000,
+            'p99ms': percentile(values, 0.99) * 1000,
+            'maxms': values[-1] * 1000 if values else 0.0,
+        }
+    return report
+
+
+def show(report):
+    print("{messages} messages in {seconds:.2f}s, {replies} replies sent, dropped by the server: {}".format(report['dropped'] or "none", **report))
+    print("{:<10}{:>10}{:>12}{:>12}{:>12}".format("rate/s", "messages", "achieved/s", "lag p50 ms", "lag p99 ms"))
+    for step in report['steps']:
+        print("{rate:<10g}{messages:>10}{achieved:>12.0f}{lagp50ms:>12.1f}{lagp99ms:>12.1f}{}".format("" if step['sustained'] else "  fell behind", **step))
+    if len(report['steps']) > 1:
+        print("Highest sustainable rate: {}".format("{:g} messages/s".format(report['sustainable']) if report['sustainable'] else "none of them"))
+    print("{:<16}{:>8}{:>10}{:>10}{:>10}{:>10}".format("command", "sent", "answered", "p50 ms", "p99 ms", "max ms"))
+    for command, stats in report['commands'].items():
+        print("{:<16}{sent:>8}{answered:>10}{p50ms:>10.1f}{p99ms:>10.1f}{maxms:>10.1f}".format(command, **stats))
+    print("The bot's output is in {log}".format(**report))
+
+
+def runbot(args): # The bot's side, in its own process so the crowd and the server don't take its CPU.
+    import aiohttp
+    import twitchio.websocket
+    twitchio.websocket.HOST = args.bot # twitchio looks this up every time it connects.
+    import botsql
+    bot = botsql.Bot(token="e2etest", client_id="e2etest", client_secret="e2etest", channels=args.channels)
+    bot._http.nick = NICK # With the nick already known, twitchio doesn't ask Twitch to validate the token.
+
+    async def opensession(): # twitchio only makes its HTTP session the first time it calls the API, which never happens here.
+        bot._http.session = aiohttp.ClientSession()
+
+    bot.loop.run_until_complete(opensession())
+    bot.run()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End to end test of the bot against a local stand-in for Twitch chat.")
+    parser.add_argument("--messages", type=int, default=5000, help="how many synthetic chat messages to send")
+    parser.add_argument("--workload", help="replay a recorded chat file instead of a synthetic battle")
+    parser.add_argument("--rate", type=float, default=200, help="messages per second to send at")
+    parser.add_argument("--ramp", type=float, nargs="+", help="send at each of these rates in turn to find the highest one the bot keeps up with")
+    parser.add_argument("--step", type=float, default=10, help="seconds to spend at each --ramp rate")
+    parser.add_argument("--maxlag", type=float, default=0.5, help="seconds behind the bot can be and still count as keeping up")
+    parser.add_argument("--bombs", type=float, default=0.001, help="chance of a gift bomb after each message")
+    parser.add_argument("--notmod", action="store_true", help="don't make the bot a moderator, so it gets the lower send limit")
+    parser.add_argument("--settle", type=float, default=2, help="seconds to wait after the bot joins before the crowd starts")
+    parser.add_argument("--quiet", type=float, default=5, help="stop waiting for replies once the bot has been quiet this long")
+    parser.add_argument("--drain", type=float, default=60, help="the longest to wait for replies after the crowd is done")
+    parser.add_argument("--channels", nargs="+", default=["introspecktive", "macatk_", "redflare006"])
+    parser.add_argument("--users", type=int, default=2000, help="how many different viewers the crowd has")
+    parser.add_argument("--mods", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="also write the report to this file")
+    parser.add_argument("--bot", help=argparse.SUPPRESS) # Set when this file runs itself as the bot's process.
+    args = parser.parse_args()
+
+    if args.bot:
+        runbot(args)
+        return
+    if args.workload:
+        args.workload = os.path.abspath(args.workload)
+    if args.json:
+        args.json = os.path.abspath(args.json)
+    os.chdir(tempfile.mkdtemp(prefix="e2etest-")) # The bot's database, log.csv and journals all land here instead of next to the real ones.
+
+    if args.workload:
+        workload = recorded(args.workload)
+    else:
+        messages = sum([rate * args.step for rate in args.ramp]) if args.ramp else args.messages
+        workload = synthetic(int(messages), args.channels, args.users, args.mods, args.seed)
+    report = asyncio.run(run(args, crowd(workload, args.users, args.bombs, args.seed)))
+    show(report)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
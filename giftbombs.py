@@ -0,0 +1,76 @@
+import asyncio
+
+"""
+GiftBombs collects the subs from a gift bomb so the bot can welcome them all at once. When someone gifts 50 subs, Twitch
+sends one submysterygift notice with the count, followed by 50 subgift notices, one per recipient, all with the same
+msg-param-origin-id. Handling each of those on its own meant 50 changes to the sub list and 50 mentions in chat within
+a few seconds. Instead, recipients are collected per channel and origin (or per gifter when there's no origin ID), and
+onflush(channel, gifter, recipients) is called once for the whole bomb: as soon as the count from the submysterygift
+has arrived, or once no more gifts have come in for window seconds. A single gifted sub is just a bomb of one.
+"""
+
+WINDOW = 2.0  # Seconds to wait for more gifts from the same bomb.
+LONGEST = 15.0  # A bomb is let go after this many seconds even if gifts are still coming in.
+
+
+class Bomb:
+    __slots__ = ('channel', 'gifter', 'expected', 'recipients', 'started', 'timer')
+
+    def __init__(self, channel, gifter, started):
+        self.channel = channel
+        self.gifter = gifter
+        self.expected = None  # How many subs the submysterygift said were coming, if there was one.
+        self.recipients = {}  # recipient -> None, in the order they arrived
+        self.started = started
+        self.timer = None
+
+
+class GiftBombs:
+    def __init__(self, onflush, window=WINDOW, longest=LONGEST):
+        self.onflush = onflush
+        self.window = window
+        self.longest = longest
+        self.bombs = {}  # (channel name, origin ID or gifter) -> Bomb
+
+    def __len__(self): # How many bombs are still being collected.
+        return len(self.bombs)
+
+    def expect(self, channel, origin, gifter, count): # A submysterygift: count subs from gifter are on their way.
+        key, bomb = self._bomb(channel, origin, gifter)
+        bomb.expected = count
+        self._check(key, bomb)
+
+    def add(self, channel, origin, gifter, recipient): # A subgift to recipient, which may be part of a bomb.
+        key, bomb = self._bomb(channel, origin, gifter)
+        bomb.recipients[recipient] = None
+        self._check(key, bomb)
+
+    def flush(self): # Lets go of every bomb still being collected, e.g. when the bot shuts down.
+        for key in list(self.bombs):
+            self._flush(key)
+
+    def _bomb(self, channel, origin, gifter):
+        key = (channel.name.lower(), origin or gifter)
+        bomb = self.bombs.get(key)
+        if bomb is None:
+            bomb = self.bombs[key] = Bomb(channel, gifter, asyncio.get_running_loop().time())
+        return key, bomb
+
+    def _check(self, key, bomb): # Lets go of a bomb once it's complete, or waits a little longer for the rest of it.
+        loop = asyncio.get_running_loop()
+        if bomb.timer is not None:
+            bomb.timer.cancel()
+        if bomb.expected is not None and len(bomb.recipients) >= bomb.expected:
+            self._flush(key)
+        else:
+            delay = min(self.window, bomb.started + self.longest - loop.time())
+            bomb.timer = loop.call_later(max(delay, 0), self._flush, key)
+
+    def _flush(self, key):
+        bomb = self.bombs.pop(key, None)
+        if bomb is None:
+            return
+        if bomb.timer is not None:
+            bomb.timer.cancel()
+        if bomb.recipients:
+            self.onflush(bomb.channel, bomb.gifter, list(bomb.recipients))
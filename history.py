@@ -0,0 +1,103 @@
+import datetime
+
+import numpy as np
+
+"""
+PlayHistory answers !history and !topplayers from the playcounts table kept in playerdb.py, which has one row per
+person per channel per day they played. The rows are loaded once into NumPy arrays, one per column and sorted by day, so
+a question about the past 30 days is a binary search for where those days start followed by a few vectorized sums over
+that slice, instead of a SQL query going through years of plays. Each person (a channel and twitch name pair) is given a
+small integer id so the sums can be done with np.bincount.
+
+New plays are recorded as they're logged and kept in plain lists until the next question is asked, when they're
+appended onto the arrays in one go, so logging a play stays as cheap as appending to a list.
+"""
+
+
+class PlayHistory:
+    def __init__(self):
+        self.ids = {}  # (channel, twitch name) -> id
+        self.people = []  # id -> (channel, twitch name)
+        self.channels = {}  # channel -> channel id
+        self.personchannel = np.zeros(0, dtype=np.int32)  # id -> channel id
+        self.person = np.zeros(0, dtype=np.int32)  # The columns, one entry per person per day played, sorted by day.
+        self.day = np.zeros(0, dtype=np.int32)  # date.toordinal() of the day played
+        self.plays = np.zeros(0, dtype=np.int32)
+        self.pending = ([], [], [])  # Plays recorded since the arrays were last built, in the same three columns.
+
+    def __len__(self):
+        return len(self.person) + len(self.pending[0])
+
+    @classmethod
+    def load(cls, rows): # Builds the arrays from (channel, twitchname, day, plays) rows sorted by day, e.g. PlayerLog.playcounts().
+        history = cls()
+        person, day, plays = history.pending
+        for channel, twitchname, dateplayed, count in rows:
+            person.append(history._id(channel, twitchname))
+            day.append(datetime.date.fromisoformat(dateplayed).toordinal())
+            plays.append(count)
+        history._merge()
+        return history
+
+    def record(self, channel, twitchname, dateplayed, plays=1):
+        if isinstance(dateplayed, str):
+            dateplayed = datetime.date.fromisoformat(dateplayed)
+        self.pending[0].append(self._id(channel, twitchname))
+        self.pending[1].append(dateplayed.toordinal())
+        self.pending[2].append(plays)
+
+    def history(self, channel, twitchname, days=30, today=None): # Returns (total plays, plays in the past days, first day, last day) for someone, or None if they've never played.
+        self._merge()
+        personid = self.ids.get((channel, twitchname))
+        if personid is None:
+            return None
+        rows = np.flatnonzero(self.person == personid)
+        if not len(rows):
+            return None
+        cutoff = self._cutoff(days, today)
+        recent = rows[self.day[rows] > cutoff]
+        return (int(self.plays[rows].sum()), int(self.plays[recent].sum()),
+                datetime.date.fromordinal(int(self.day[rows[0]])), datetime.date.fromordinal(int(self.day[rows[-1]])))
+
+    def top(self, channel, days=30, limit=5, today=None): # Returns [(twitch name, plays)] for whoever played most in a channel over the past days (or ever, if days is None).
+        self._merge()
+        if channel not in self.channels:
+            return []
+        start = 0 if days is None else np.searchsorted(self.day, self._cutoff(days, today), side='right')
+        person = self.person[start:]
+        inchannel = self.personchannel[person] == self.channels[channel]
+        totals = np.bincount(person[inchannel], weights=self.plays[start:][inchannel], minlength=len(self.people))
+        limit = min(limit, np.count_nonzero(totals))
+        if not limit:
+            return []
+        best = np.argpartition(totals, -limit)[-limit:]
+        best = best[np.argsort(-totals[best], kind='stable')]
+        return [(self.people[personid][1], int(totals[personid])) for personid in best]
+
+    def _cutoff(self, days, today):
+        return (today or datetime.date.today()).toordinal() - days
+
+    def _id(self, channel, twitchname):
+        key = (channel, twitchname)
+        personid = self.ids.get(key)
+        if personid is None:
+            personid = self.ids[key] = len(self.people)
+            self.people.append(key)
+            self.channels.setdefault(channel, len(self.channels))
+        return personid
+
+    def _merge(self): # Appends the plays recorded since the last question onto the arrays.
+        if len(self.personchannel) < len(self.people):
+            added = [self.channels[channel] for channel, _ in self.people[len(self.personchannel):]]
+            self.personchannel = np.concatenate((self.personchannel, np.array(added, dtype=np.int32)))
+        if not self.pending[0]:
+            return
+        person, day, plays = (np.array(column, dtype=np.int32) for column in self.pending)
+        self.pending = ([], [], [])
+        ordered = len(self.day) == 0 or day.min() >= self.day[-1]
+        self.person = np.concatenate((self.person, person))
+        self.day = np.concatenate((self.day, day))
+        self.plays = np.concatenate((self.plays, plays))
+        if not ordered or np.any(np.diff(day) < 0): # Plays almost always come in on or after the latest day already there, so this rarely runs.
+            order = np.argsort(self.day, kind='stable')
+            self.person, self.day, self.plays = self.person[order], self.day[order], self.plays[order]
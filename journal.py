@@ -0,0 +1,164 @@
+import contextlib
+import json
+import os
+
+from playerqueue import Player
+from scheduler import TIERS
+
+"""
+Journal makes a channel's schedule, played set, toggles, cooldowns and arena ID survive a restart. Every change to them is
+appended as one small JSON line to journal-<channel>.jsonl (through the background writer, so commands never wait on it),
+which keeps the cost of saving a change the same no matter how long the queue is. Every so often the whole state is
+written to snapshot-<channel>.json and the journal starts over, so replaying it on startup only ever has a few lines to
+go through. Each line has a sequence number and the snapshot remembers the last one it includes, so a crash between
+writing a snapshot and starting the journal over can't apply anything twice.
+
+The regular and new sub tiers are journaled as "queue" and "subs", the names they had before there were tiers, so older
+journals and snapshots still load. So does the "check !showsubs" placeholder those used to have in the queue, which is
+skipped since the schedule took over its job.
+"""
+
+TARGETS = {'regular': 'queue', 'newsub': 'subs'}  # Tiers that are journaled under another name. The rest use the tier's name.
+TIERNAMES = {target: tier for tier, target in TARGETS.items()}
+SUBCHECK = "check !showsubs"
+
+
+class Journal:
+    def __init__(self, writer, name, compactevery=1000):
+        self.writer = writer
+        self.journalfile = "journal-{}.jsonl".format(name)
+        self.snapshotfile = "snapshot-{}.json".format(name)
+        self.compactevery = compactevery  # How many changes are journaled before the next snapshot.
+        self.seq = 0
+        self.since = 0
+        self.replaying = False
+        self.held = None  # Lines waiting for the batch they're in to finish, see batch().
+        self.state = None
+
+    def attach(self, state): # Hooks the journal into each part of the channel state, so every change gets recorded.
+        self.state = state
+        state.journal = self
+        for tier in TIERS:
+            state.schedule[tier].onchange = lambda op, *args, target=TARGETS.get(tier, tier): self.record(target, op, *args)
+        state.schedule.onchange = lambda op, *args: self.record('schedule', op, *args)
+        state.played.onchange = lambda op, *args: self.record('played', op, *args)
+        state.toggles.onchange = lambda op, *args: self.record('toggles', op, *args)
+        state.cooldowns.onchange = lambda op, *args: self.record('cooldowns', op, *args)
+
+    def record(self, target, op, *args):
+        if self.replaying:
+            return
+        self.seq += 1
+        self.since += 1
+        line = json.dumps([self.seq, target, op] + list(args), ensure_ascii=False)
+        if self.held is not None:
+            self.held.append(line)
+            return
+        self.writer.append(self.journalfile, line)
+        if self.since >= self.compactevery:
+            self.compact()
+
+    @contextlib.contextmanager
+    def batch(self): # Holds on to the changes made inside it and journals them all with one write at the end, e.g. for each batch a ChannelActor runs.
+        if self.held is not None:
+            yield
+            return
+        self.held = []
+        try:
+            yield
+        finally:
+            lines, self.held = self.held, None
+            if lines:
+                self.writer.append(self.journalfile, "\n".join(lines))
+            if self.since >= self.compactevery:
+                self.compact()
+
+    def compact(self): # Writes out the whole state and starts the journal over.
+        state = self.state
+        snapshot = {
+            'seq': self.seq,
+            'tiers': {tier: [list(player) for player in state.schedule[tier]] for tier in TIERS},
+            'schedule': {'up': state.schedule.up, 'streaks': state.schedule.streaks, 'ratios': state.schedule.ratios},
+            'played': sorted(state.played),
+            'toggles': dict(state.toggles),
+            'cooldowns': dict(state.cooldowns),
+            'arena': state.arenaid,
+        }
+        self.writer.compact(self.snapshotfile, self.journalfile, json.dumps(snapshot, ensure_ascii=False))
+        self.since = 0
+
+    def replay(self): # Rebuilds the attached state from the snapshot and journal on disk. Returns how many changes were replayed.
+        state = self.state
+        self.replaying = True
+        replayed = 0
+        try:
+            if os.path.exists(self.snapshotfile):
+                with open(self.snapshotfile, 'r', encoding='utf-8') as f:
+                    snapshot = json.load(f)
+                self.seq = snapshot['seq']
+                tiers = snapshot.get('tiers') or {'regular': snapshot['queue'], 'newsub': snapshot['subs']}
+                for tier, players in tiers.items():
+                    for twitch, switch in players:
+                        if twitch != SUBCHECK:
+                            state.schedule[tier].append(Player(twitch, switch))
+                if 'schedule' in snapshot:
+                    for tier, ratio in snapshot['schedule']['ratios'].items():
+                        state.schedule.setratio(tier, ratio)
+                    state.schedule.restore(snapshot['schedule']['up'], snapshot['schedule']['streaks'])
+                for name in snapshot['played']:
+                    state.played.add(name)
+                state.toggles.update(snapshot['toggles'])
+                state.cooldowns.update(snapshot.get('cooldowns', {}))
+                state.arenaid = snapshot['arena']
+            if os.path.exists(self.journalfile):
+                with open(self.journalfile, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        try:
+                            seq, target, op, *args = json.loads(line)
+                        except ValueError: # The last line can be cut off if the bot died while writing it.
+                            continue
+                        if seq <= self.seq:
+                            continue
+                        self.apply(target, op, args)
+                        self.seq = seq
+                        self.since += 1
+                        replayed += 1
+        finally:
+            self.replaying = False
+        return replayed
+
+    def apply(self, target, op, args):
+        state = self.state
+        tier = TIERNAMES.get(target, target)
+        if tier in TIERS:
+            line = state.schedule[tier]
+            if op == 'add':
+                if args[1] != SUBCHECK:
+                    line.insert(args[0], Player(args[1], args[2]))
+            elif op == 'extend':
+                line.extend([Player(twitch, switch) for twitch, switch in args[0] if not line.has_twitch(twitch)])
+            elif op == 'remove':
+                if line.has_twitch(args[0]):
+                    line.remove(args[0])
+            elif op == 'rename':
+                line.rename(args[0], args[1])
+            elif op == 'clear':
+                line.clear()
+        elif target == 'schedule':
+            if op == 'turn':
+                state.schedule.restore(args[0], args[1])
+            elif op == 'ratio':
+                state.schedule.setratio(args[0], args[1])
+        elif target == 'played':
+            if op == 'add':
+                state.played.add(args[0])
+            elif op == 'discard':
+                state.played.discard(args[0])
+            elif op == 'clear':
+                state.played.clear()
+        elif target == 'toggles':
+            state.toggles[args[0]] = args[1]
+        elif target == 'cooldowns':
+            state.cooldowns[args[0]] = args[1]
+        elif target == 'arena':
+            state.arenaid = args[0]
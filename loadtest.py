@@ -0,0 +1,314 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+"""
+loadtest.py drives the bot's commands offline to see how the queue and persistence paths hold up under heavy chat.
+It builds a Bot with fake credentials that never connects to Twitch, in a temporary directory so it gets its own empty
+playerlog database and journals, then feeds it chat messages and sub events through the same event_message() and
+event_raw_usernotice() entry points twitchio uses. Messages come either from a synthetic viewer battle (lots of !join,
+!queue and !amifree, with mods hitting !next and !plug) or from a recorded chat file, and the results are reported as
+throughput plus p50/p99 latency per command.
+
+A recorded chat file has one message per line, tab separated: channel, user, flags, text. flags has an m for moderators
+and an s for subscribers (or is just -). Sub events are written as text starting with USERNOTICE followed by the tags,
+e.g. "USERNOTICE msg-id=subgift;msg-param-recipient-display-name=someone". --save writes a synthetic workload out in
+this format so the exact same chat can be replayed against a later version of the bot.
+
+--check runs a few scripted chats through the bot instead and checks what it answers, exiting with an error if
+anything is off. It's quick, so it's worth running after touching the queue or the schedule.
+
+Examples:
+    python loadtest.py --messages 20000
+    python loadtest.py --messages 20000 --rate 1000 --save battle.tsv
+    python loadtest.py --workload battle.tsv --json before.json
+    python loadtest.py --check
+"""
+
+SYNTHETIC = ( # (weight, text, mods only). {ign} is filled in with a made up in game name and {user} with another viewer.
+    (30, "!join {ign}", False),
+    (25, "gg that was close", False),
+    (12, "!queue", False),
+    (8, "!amifree", False),
+    (6, "!arena", False),
+    (5, "!drop", False),
+    (4, "!rename {ign}", False),
+    (2, "!next", True),
+    (2, "!plug {user} {ign}", True),
+    (1, "!remove {user}", True),
+    (1, "!showsubs", False),
+    (1, "!playedlist", False),
+)
+
+
+class FakeAuthor:
+    def __init__(self, name, is_mod=False, is_subscriber=False):
+        self.name = name
+        self.display_name = name
+        self.is_mod = is_mod
+        self.is_subscriber = is_subscriber
+        self._ws = None
+
+
+class FakeChannel:
+    def __init__(self, name, botismod=True):
+        self.name = name
+        self.botismod = botismod
+        self.sent = 0
+
+    async def send(self, content):
+        self.sent += 1
+
+    def _bot_is_mod(self): # The outbox asks twitchio's Channel this to pick the mod or non-mod rate limit.
+        return self.botismod
+
+
+class FakeMessage:
+    def __init__(self, content, author, channel, tags=None):
+        self.content = content
+        self.author = author
+        self.channel = channel
+        self.tags = tags or {}
+        self.echo = False
+        self.id = None
+
+
+def synthetic(count, channels, users, mods, seed): # Yields (channel, user, flags, text) for a made up viewer battle.
+    rng = random.Random(seed)
+    weights = [weight for weight, _, _ in SYNTHETIC]
+    viewers = ["viewer{}".format(i) for i in range(users)]
+    moderators = ["mod{}".format(i) for i in range(mods)]
+    for channel in channels: # Every battle starts with a mod opening the queue and taking the size limit off.
+        yield channel, moderators[0], "m", "!toggle open"
+        yield channel, moderators[0], "m", "!toggle limit"
+    for _ in range(count):
+        _, text, modsonly = rng.choices(SYNTHETIC, weights)[0]
+        channel = rng.choice(channels)
+        if rng.random() < 0.002:
+            yield channel, rng.choice(viewers), "-", "USERNOTICE msg-id=subgift;msg-param-recipient-display-name={}".format(rng.choice(viewers))
+            continue
+        user = rng.choice(moderators) if modsonly else rng.choice(viewers)
+        flags = "m" if modsonly else ("s" if rng.random() < 0.2 else "-")
+        yield channel, user, flags, text.format(ign="ign {}".format(rng.randrange(users)), user=rng.choice(viewers))
+
+
+def recorded(path): # Yields (channel, user, flags, text) from a recorded chat file.
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            parts = line.rstrip("\n").split("\t", 3)
+            if len(parts) == 4:
+                yield tuple(parts)
+
+
+CHECKS = ( # (what's being checked, [(user, flags, text), where user "USERNOTICE" sends text as its tags], replies that should have been said)
+    ("A new sub who's up because the line was empty keeps their turn when someone joins after them", [
+        ("mod", "m", "!toggle open"),
+        ("aa", "-", "!join aa"),
+        ("mod", "m", "!next"),
+        ("USERNOTICE", "-", "msg-id=sub;display-name=subby"),
+        ("subby", "s", "!optin subign"),
+        ("aa", "-", "!queue"),
+        ("rr", "-", "!join rr"),
+        ("mod", "m", "!next"),
+    ], ["aa🔥aa is done. No one else in line!", "Queue (1): 1. subby🔥subign", "subby🔥subign is done. rr🔥rr is up next! The arena info is in !arena, so pls join the room"]),
+    ("A new sub arriving mid match waits for whoever is playing", [
+        ("mod", "m", "!clearqueue"),
+        ("bb", "-", "!join bb"),
+        ("cc", "-", "!join cc"),
+        ("USERNOTICE", "-", "msg-id=sub;display-name=subtwo"),
+        ("mod", "m", "!next"),
+    ], ["bb🔥bb is done. subtwo🔥NULL is up next! The arena info is in !arena, so pls join the room"]),
+    ("If the person playing drops, whoever is up after them keeps their turn when someone joins", [
+        ("mod", "m", "!clearqueue"),
+        ("dd", "-", "!join dd"),
+        ("USERNOTICE", "-", "msg-id=sub;display-name=subthree"),
+        ("dd", "-", "!drop"),
+        ("ee", "-", "!join ee"),
+        ("mod", "m", "!next"),
+    ], ["subthree🔥NULL is done. ee🔥ee is up next! The arena info is in !arena, so pls join the room"]),
+    ("A new sub who also !joins can't join twice, and !drop takes them out of the queue they joined first", [
+        ("mod", "m", "!clearqueue"),
+        ("USERNOTICE", "-", "msg-id=sub;display-name=subfour"),
+        ("subfour", "s", "!join fourign"),
+        ("subfour", "s", "!join fourign"),
+        ("subfour", "s", "!drop"),
+        ("subfour", "s", "!drop"),
+    ], ["@subfour I've added you to the queue! Your in game name is fourign", "@subfour you're already in the queue",
+        "@subfour you have dropped from the queue", "@subfour you have dropped from the new subs list"]),
+    ("!ratio answers with the ratio it stored and turns down anything but one number or all", [
+        ("mod", "m", "!ratio sub 0"),
+        ("mod", "m", "!ratio sub foo 3"),
+        ("mod", "m", "!ratio vip all"),
+    ], ["@mod the ratio for sub has been set to 1", "@mod it's [!ratio tier number] or [!ratio tier all] without the [ ]. Current ratios: {'raid': None, 'vip': 1, 'newsub': None, 'sub': 1, 'regular': None}", "@mod the ratio for vip has been set to all"]),
+)
+
+
+class RecordingChannel(FakeChannel):
+    def __init__(self, name):
+        super().__init__(name)
+        self.said = []
+
+    async def send(self, content):
+        self.said.append(content)
+
+
+async def check(args): # Runs CHECKS in order in one channel, and returns how many failed. Replies can go out in a different order than the commands (the outbox merges some), so each check only looks for its replies among everything said during it.
+    import botsql
+    bot = botsql.Bot(token="loadtest", client_id="loadtest", client_secret="loadtest", channels=args.channels[:1])
+    await bot.warmup()
+    channel = RecordingChannel(args.channels[0])
+    state = bot.channelstate(channel)
+    failed = 0
+    for description, chat, expected in CHECKS:
+        for user, flags, text in chat:
+            if user == "USERNOTICE":
+                await bot.event_raw_usernotice(channel, dict(tag.split("=", 1) for tag in text.split(";")))
+            else:
+                await bot.event_message(FakeMessage(text, FakeAuthor(user, "m" in flags, "s" in flags), channel))
+            if state.next_cd is not None: # !next waits 10 seconds before it can be used again, which the checks don't need to.
+                state.next_cd.cancel()
+                state.next_cd = None
+        while bot.outbox.depth(): # The outbox paces what it sends, so the replies are waited for.
+            await asyncio.sleep(0.05)
+        await asyncio.sleep(0.05)
+        missing = [reply for reply in expected if reply not in channel.said]
+        if missing:
+            failed += 1
+            print("FAIL  {}\n      missing: {}\n      said:    {}".format(description, missing, channel.said))
+        else:
+            print("ok    {}".format(description))
+        channel.said.clear()
+    for outbox in bot.outbox.channels.values():
+        if outbox.task is not None:
+            outbox.task.cancel()
+    return failed
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+async def run(args, workload):
+    import botsql
+    bot = botsql.Bot(token="loadtest", client_id="loadtest", client_secret="loadtest", channels=args.channels)
+    await bot.warmup() # The same loading event_ready() starts, finished up front so the numbers are for a bot that's been up a while.
+    channels = {}
+    latencies = {}
+    tasks = []
+    sem = asyncio.Semaphore(args.concurrency)
+
+    async def deliver(name, user, flags, text, due):
+        async with sem:
+            channel = channels.setdefault(name, FakeChannel(name))
+            start = time.perf_counter()
+            if text.startswith("USERNOTICE "):
+                tags = dict(tag.split("=", 1) for tag in text[len("USERNOTICE "):].split(";"))
+                tags.setdefault("display-name", user)
+                await bot.event_raw_usernotice(channel, tags)
+                command = "usernotice:{}".format(tags.get("msg-id"))
+            else:
+                await bot.event_message(FakeMessage(text, FakeAuthor(user, "m" in flags, "s" in flags), channel))
+                command = text.split(" ")[0] if text.startswith("!") else "(chat)"
+            end = time.perf_counter()
+            latencies.setdefault(command, []).append(end - (due if due is not None else start)) # With a target rate, time spent waiting to be handled counts too.
+
+    begin = time.perf_counter()
+    for i, (name, user, flags, text) in enumerate(workload):
+        due = None
+        if args.rate:
+            due = begin + i / args.rate
+            delay = due - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        if args.concurrency == 1:
+            await deliver(name, user, flags, text, due)
+        else:
+            tasks.append(asyncio.create_task(deliver(name, user, flags, text, due)))
+    if tasks:
+        await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - begin
+    flushstart = time.perf_counter()
+    await asyncio.get_running_loop().run_in_executor(None, botsql.writer.flush)
+    flushtime = time.perf_counter() - flushstart
+    report = {
+        'messages': sum([len(values) for values in latencies.values()]),
+        'seconds': elapsed,
+        'throughput': sum([len(values) for values in latencies.values()]) / elapsed if elapsed else 0.0,
+        'flushseconds': flushtime,
+        'outboxdepth': bot.outbox.depth(),
+        'sent': sum([channel.sent for channel in channels.values()]),
+        'commands': {},
+    }
+    for command, values in sorted(latencies.items()):
+        values.sort()
+        report['commands'][command] = {
+            'count': len(values),
+            'p50ms': percentile(values, 0.50) * 1000,
+            'p99ms': percentile(values, 0.99) * 1000,
+            'maxms': values[-1] * 1000,
+        }
+    for outbox in bot.outbox.channels.values():
+        if outbox.task is not None:
+            outbox.task.cancel()
+    return report
+
+
+def show(report):
+    print("{messages} messages in {seconds:.2f}s ({throughput:.0f}/s), write-behind flush took {flushseconds:.3f}s".format(**report))
+    print("{sent} chat messages sent, {outboxdepth} still waiting in the outbox".format(**report))
+    print("{:<24}{:>8}{:>10}{:>10}{:>10}".format("command", "count", "p50 ms", "p99 ms", "max ms"))
+    for command, stats in report['commands'].items():
+        print("{:<24}{:>8}{:>10.3f}{:>10.3f}{:>10.3f}".format(command, stats['count'], stats['p50ms'], stats['p99ms'], stats['maxms']))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline load test for the bot's commands.")
+    parser.add_argument("--messages", type=int, default=10000, help="how many synthetic chat messages to send")
+    parser.add_argument("--workload", help="replay a recorded chat file instead of a synthetic battle")
+    parser.add_argument("--save", help="write the workload to this file so it can be replayed later")
+    parser.add_argument("--rate", type=float, default=0, help="messages per second to send at (0 sends as fast as possible)")
+    parser.add_argument("--concurrency", type=int, default=64, help="how many messages can be in flight at once, like twitchio's event tasks")
+    parser.add_argument("--channels", nargs="+", default=["introspecktive", "macatk_", "redflare006"])
+    parser.add_argument("--users", type=int, default=2000, help="how many different viewers the synthetic battle has")
+    parser.add_argument("--mods", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="also write the report to this file")
+    parser.add_argument("--check", action="store_true", help="run the scripted checks instead of a load test")
+    args = parser.parse_args()
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    if args.workload:
+        args.workload = os.path.abspath(args.workload)
+    for option in ("save", "json"):
+        if getattr(args, option):
+            setattr(args, option, os.path.abspath(getattr(args, option)))
+    sys.path.insert(0, here)
+    os.chdir(tempfile.mkdtemp(prefix="loadtest-")) # The bot's database, log.csv and journals all land here instead of next to the real ones.
+
+    if args.check:
+        sys.exit(1 if asyncio.run(check(args)) else 0)
+
+    if args.workload:
+        workload = list(recorded(args.workload))
+    else:
+        workload = list(synthetic(args.messages, args.channels, args.users, args.mods, args.seed))
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            f.writelines("\t".join(message) + "\n" for message in workload)
+
+    report = asyncio.run(run(args, workload))
+    show(report)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
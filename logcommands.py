@@ -0,0 +1,187 @@
+import asyncio
+import datetime
+
+from twitchio.ext import commands
+
+import botsql
+from playerqueue import Player
+
+"""
+The commands about who has played: !amifree and !playedlist for viewers, and for mods the played list (!plugplayed,
+!removeplayed, !clearplayed), the full log (!pluglog, !removelog, !showlog) and the play history (!history,
+!topplayers).
+"""
+
+
+class LogCommands(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+
+    @commands.command(name='amifree')
+    async def amifree(self,ctx): # !amifree allows a user to check if they can play today.
+        state = self.bot.channelstate(ctx.channel)
+        snapshot = self.bot.actors[state.name].snapshot
+        def render(): # Returns the reply, and the group to merge it into if it's an all clear.
+            if state.toggles['variety']:
+                if self.bot.playedrecently(state, ctx.author.name.lower()) or ctx.author.name.lower() in snapshot.played:
+                    return "@{} you have played in the past week or just now. In either case, give others a chance pls.".format(ctx.author.name), None
+            else:
+                if ctx.author.name.lower() in snapshot.played:
+                    return "@{} you have played today already. Give others a chance pls.".format(ctx.author.name), None
+            return "@{} all clear! Go for it!!".format(ctx.author.name), "all clear! Go for it!!"
+        answer = self.bot.responses.get(state.name, 'amifree', (ctx.author.name.lower(), state.toggles['variety']), snapshot.version, render)
+        if answer is not None:
+            if answer[1] is not None:
+                self.bot.ack(ctx, *answer)
+            else:
+                self.bot.say(ctx, answer[0])
+
+    @commands.command(name='playedlist')
+    async def playedlist(self,ctx): # !playedlist prints the state of the current set of players who have played during the stream in chat.
+        state = self.bot.channelstate(ctx.channel)
+        self.bot.showpages(ctx, 'playedlist', "Played", lambda: sorted(self.bot.actors[state.name].snapshot.played), numbered=False)
+
+    @commands.command(name='removeplayed')
+    async def removeplayed(self,ctx): # !removeplayed player is a moderator command that removes a player from the set of played players.
+        state = self.bot.channelstate(ctx.channel)
+        if ctx.author.is_mod:
+            if ctx.line.text:
+                userplayed = ctx.line.text
+                suggestions = []
+                if userplayed not in state.played:
+                    meant, suggestions = self.bot.resolve(state, userplayed, {'played'})
+                    userplayed = meant or userplayed
+                if userplayed in state.played:
+                    state.played.remove(userplayed)
+                    self.bot.say(ctx, "{} has been removed from the played list.".format(userplayed))
+                else:
+                    self.bot.say(ctx, self.bot.didyoumean("{} isn't in the played list.".format(userplayed), suggestions))
+            else:
+                self.bot.say(ctx, "@{} who did you want to remove? Type [!removeplayed user] referring to their in game or Twitch name (w/o the [])".format(ctx.author.name))
+
+    @commands.command(name='clearplayed')
+    async def clearplayed(self,ctx): # clearplayed is a moderator command to clear the set of played players.
+        state = self.bot.channelstate(ctx.channel)
+        if ctx.author.is_mod:
+            state.played.clear()
+            self.bot.say(ctx, "@{} the played list has been cleared".format(ctx.author.name))
+
+    @commands.command(name='pluglog')
+    async def pluglog(self,ctx): # !pluglog twitchname switchname is a command used to insert a player into the full_log, as if they played today.
+        state = self.bot.channelstate(ctx.channel)
+        if ctx.author.is_mod:
+            if ctx.line.text:
+                if self.bot.playedrecently(state, ctx.line.target):
+                    self.bot.say(ctx, "{} is already in the full log".format(ctx.line.words[0]))
+                elif not ctx.line.rest:
+                    self.bot.say(ctx, "@{} not enough positional arguments. It's [!pluglog twitchname switchname position] without the [ ] (position is optional). If no information is provided on Twitch name, use 'NULL' instead".format(ctx.author.name))
+                elif ctx.line.position is None:
+                    player = Player(ctx.line.target, ctx.line.rest)
+                    botsql.write_to_log(state, player)
+                    self.bot.say(ctx, "{} has been added to the full log at the back".format(player))
+                else: # The log isn't ordered anymore, so the position is accepted but has no effect.
+                    botsql.write_to_log(state, Player(ctx.line.target, ctx.line.name))
+                    self.bot.say(ctx, "{} has been added to the full log at position {}".format(ctx.line.name,ctx.line.position))
+            else:
+                self.bot.say(ctx, "@{} not enough positional arguments. It's [!pluglog twitchname switchname position] without the [ ] (position is optional). If no information is provided on Twitch name, use 'NULL' instead".format(ctx.author.name))
+
+    @commands.command(name='removelog')
+    async def removelog(self,ctx): # !removelog player is used to remove a person from the full_log as well as the SQLite3 database.
+        state = self.bot.channelstate(ctx.channel)
+        if ctx.author.is_mod:
+            if not self.bot.warm: # Someone removed now could be put back by the log that's still loading.
+                self.bot.say(ctx, "@{} the full log is still loading, try again in a few seconds".format(ctx.author.name))
+            elif ctx.line.text:
+                person = ctx.line.text
+                suggestions = []
+                if person not in state.full_log and not state.full_log.has_switch(person):
+                    meant, suggestions = self.bot.resolve(state, person, {'log'})
+                    person = meant or person
+                if person in state.full_log or state.full_log.has_switch(person):
+                    if person in state.full_log:
+                        state.full_log.remove_twitch(person)
+                        botsql.writer.delete_twitchname(state.name, person)
+                    else:
+                        state.full_log.remove_switch(person)
+                        botsql.writer.delete_switchname(state.name, person)
+                    self.bot.say(ctx, "{} has been removed from the full log".format(person))
+                else:
+                    self.bot.say(ctx, self.bot.didyoumean("{} isn't in the full log".format(person), suggestions))
+            else:
+                self.bot.say(ctx, "@{} not enough positional arguments. It's [!removelog twitchname] or [!removelog switchname] without the [ ]".format(ctx.author.name))
+
+    '''
+    @bot.command(name='clearlog')
+    async def clearlog(ctx):
+        if ctx.author.is_mod:
+            conn = sqlite3.connect("playerlog")
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM players")
+            cursor.execute("SELECT * FROM players")
+            print(cursor.fetchall())
+            conn.commit()
+            cursor.close()
+            full_log.clear()
+            self.bot.say(ctx, "@{} the full log has been cleared".format(ctx.author.name))
+    '''
+
+    @commands.command(name='showlog')
+    async def showlog(self,ctx): # !showlog is a moderator only command that prints the database contents to the terminal, usually only intended for the moderator running the program.
+        state = self.bot.channelstate(ctx.channel)
+        if ctx.author.is_mod:
+            print(state.full_log.entries())
+            await asyncio.get_running_loop().run_in_executor(None, botsql.writer.flush) # Makes sure recent plays have landed before reading the database back.
+            print(botsql.reader().players(state.name))
+
+    @commands.command(name='history')
+    async def history(self,ctx): # !history twitchname is a moderator only command that shows how often someone has played, to help decide who gets a turn.
+        state = self.bot.channelstate(ctx.channel)
+        if ctx.author.is_mod:
+            if not ctx.line.target:
+                self.bot.say(ctx, "@{} whose history did you want? Type [!history twitchname] without the [ ]".format(ctx.author.name))
+                return
+            if botsql.playhistory is None:
+                self.bot.say(ctx, "@{} the play history is still loading, try again in a few seconds".format(ctx.author.name))
+                return
+            played = botsql.playhistory.history(state.name, ctx.line.target.lstrip("@"))
+            if played is None:
+                self.bot.say(ctx, "@{} {} hasn't played here before".format(ctx.author.name, ctx.line.target))
+            else:
+                total, recent, first, last = played
+                self.bot.say(ctx, "@{} {} has played {} times since {} ({} in the past 30 days), last on {} ({} days ago)".format(
+                    ctx.author.name, ctx.line.target, total, first, recent, last, (datetime.date.today() - last).days))
+
+    @commands.command(name='topplayers')
+    async def topplayers(self,ctx): # !topplayers 30d is a moderator only command that shows who has played the most over the past number of days (or !topplayers all).
+        state = self.bot.channelstate(ctx.channel)
+        if ctx.author.is_mod:
+            period = ctx.line.target or "30d"
+            if period != "all" and not period.rstrip("d").isdigit():
+                self.bot.say(ctx, "@{} it's [!topplayers 30d] or [!topplayers all] without the [ ]".format(ctx.author.name))
+                return
+            days = None if period == "all" else int(period.rstrip("d"))
+            if botsql.playhistory is None:
+                self.bot.say(ctx, "@{} the play history is still loading, try again in a few seconds".format(ctx.author.name))
+                return
+            top = botsql.playhistory.top(state.name, days)
+            self.bot.say(ctx, "@{} most plays {}: {}".format(ctx.author.name, "ever" if days is None else "in the past {} days".format(days),
+                                                            ", ".join(["{} ({})".format(name, plays) for name, plays in top]) or "no one has played yet"))
+
+    @commands.command(name='plugplayed')
+    async def plugplayed(self,ctx): # !plugplayed switchname twitchname is a moderator only command to add a user to the set of players who already played.
+        state = self.bot.channelstate(ctx.channel)
+        if ctx.author.is_mod:
+            if ctx.line.text:
+                if ctx.line.target in state.played:
+                    self.bot.say(ctx, "{} is already in the played list".format(ctx.line.words[0]))
+                elif not ctx.line.text:
+                    self.bot.say(ctx, "@{} not enough positional arguments. It's [!plugplayed twitchname] without the [ ]. If no information is provided on Twitch name, just use their Switch name as a placeholder".format(ctx.author.name))
+                else:
+                    state.played.add(ctx.line.target)
+                    self.bot.say(ctx, "{} has been added to the played list".format(ctx.line.target))
+            else:
+                self.bot.say(ctx, "@{} not enough positional arguments. It's [!plugplayed twitchname] without the [ ]. If no information is provided on Twitch name, just use their Switch name as a placeholder".format(ctx.author.name))
+
+
+def prepare(bot): # Called by the bot's load_module() and reload_module().
+    bot.add_cog(LogCommands(bot))
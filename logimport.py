@@ -0,0 +1,157 @@
+"""
+logimport.py rebuilds the playerlog database from log.csv (or any other csv export of it) and reports where the two have
+drifted apart. Every play is written to both, so after anything goes wrong with the database the csv can bring it back.
+Plays are compared against everything in the database, the past week and the archive both, and imported plays older
+than a week go straight on into the archive, with playcounts updated to match. With --report the database is only
+read, never created or changed.
+
+The csv is streamed into a temporary table with executemany(), so only the line being read is ever held in memory no
+matter how long the log is, and SQLite keeps the temporary table on disk. The comparison and the import are then set
+operations inside SQLite: rows count as the same play when channel, twitch name, switch name and date all match, so
+running the import twice, or importing a csv that overlaps with what's already in the database, never adds a play twice.
+Everything is done in one transaction, so an import that fails partway leaves the database as it was.
+
+log.csv lines are "twitchname,switchname,dateplayed,channel". Lines from before channels existed have no channel and
+are given --channel. Switch names aren't quoted when the bot writes them, so any commas in them are put back together.
+
+Examples:
+    python logimport.py --report
+    python logimport.py log.csv old/log.csv
+    python logimport.py --dedupe --export dbonly.csv
+"""
+
+import argparse
+import csv
+import datetime
+import os
+import time
+
+from playerdb import PlayerLog
+
+CREATE_IMPORTED = "CREATE TEMP TABLE imported(channel text, twitchname text, switchname text, dateplayed date)"
+INSERT_IMPORTED = "INSERT INTO imported(channel, twitchname, switchname, dateplayed) VALUES (?, ?, ?, ?)"
+CSV_ONLY = ("CREATE TEMP TABLE csvonly AS SELECT channel, twitchname, switchname, dateplayed FROM imported "
+            "EXCEPT SELECT channel, twitchname, switchname, dateplayed FROM plays")
+DB_ONLY = ("CREATE TEMP TABLE dbonly AS SELECT channel, twitchname, switchname, dateplayed FROM plays {}"
+           "EXCEPT SELECT channel, twitchname, switchname, dateplayed FROM imported")
+IMPORT_MISSING = "INSERT INTO players(channel, twitchname, switchname, dateplayed) SELECT channel, twitchname, switchname, dateplayed FROM csvonly"
+DB_DUPLICATES = ("SELECT COALESCE(SUM(copies - 1), 0) FROM (SELECT COUNT(*) AS copies FROM players "
+                 "GROUP BY channel, twitchname, switchname, dateplayed HAVING copies > 1)")
+DELETE_DUPLICATES = ("DELETE FROM players WHERE rowid NOT IN (SELECT MIN(rowid) FROM players "
+                     "GROUP BY channel, twitchname, switchname, dateplayed)")
+DELETE_BEFORE = "DELETE FROM imported WHERE dateplayed <= date('now', ?)"
+HAS_SCHEMA = "SELECT name FROM sqlite_master WHERE name IN ('plays', 'players')"
+
+
+def isdate(field):
+    if len(field) != 10:
+        return False
+    try:
+        datetime.date.fromisoformat(field)
+        return True
+    except ValueError:
+        return False
+
+
+def split_row(fields, legacychannel): # Turns one csv line into (channel, twitchname, switchname, dateplayed), or None if it can't be read.
+    if len(fields) < 3:
+        return None
+    if isdate(fields[-1]): # Three column line from before channels existed.
+        return legacychannel, fields[0].lower(), ",".join(fields[1:-1]), fields[-1]
+    if len(fields) >= 4 and isdate(fields[-2]):
+        return fields[-1].lower(), fields[0].lower(), ",".join(fields[1:-2]), fields[-2]
+    return None
+
+
+def read_rows(paths, legacychannel, counts): # Yields rows from every csv one line at a time, counting what was read and skipped.
+    for path in paths:
+        with open(path, 'r', newline='', encoding='utf-8', errors='replace') as f:
+            for fields in csv.reader(f):
+                if not fields:
+                    continue
+                row = split_row(fields, legacychannel)
+                if row is None:
+                    counts['skipped'] += 1
+                    continue
+                counts['read'] += 1
+                yield row
+
+
+def show(title, cursor, limit):
+    rows = cursor.fetchmany(limit)
+    print(title)
+    for row in rows:
+        print("    {}".format(",".join(row)))
+    if len(rows) == limit:
+        print("    ...")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import csv logs of plays into the playerlog database and report differences between them.")
+    parser.add_argument("csvfiles", nargs="*", default=["log.csv"], help="csv files to read (default: log.csv)")
+    parser.add_argument("--db", default="playerlog", help="the SQLite3 database to import into")
+    parser.add_argument("--channel", default="introspecktive", help="the channel lines without one belong to")
+    parser.add_argument("--days", type=int, help="only compare and import plays from the past this many days")
+    parser.add_argument("--report", action="store_true", help="only report the differences, don't change the database")
+    parser.add_argument("--dedupe", action="store_true", help="also delete plays that are in the past week's table more than once")
+    parser.add_argument("--export", help="append plays that are only in the database to this csv, in log.csv's format")
+    parser.add_argument("--samples", type=int, default=10, help="how many differing rows to show of each kind")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.report: # Only reading, so nothing is created or migrated. The temporary tables still work on a read-only connection.
+        if not os.path.exists(args.db):
+            parser.error("there's no database at {}".format(args.db))
+        log = PlayerLog(args.db, readonly=True)
+        if len(log.conn.execute(HAS_SCHEMA).fetchall()) < 2:
+            parser.error("{} doesn't have the plays view and players table yet, so run the import once without --report".format(args.db))
+    else:
+        log = PlayerLog(args.db, args.channel)
+    conn = log.conn
+    counts = {'read': 0, 'skipped': 0}
+    with log.batch():
+        conn.execute(CREATE_IMPORTED)
+        conn.executemany(INSERT_IMPORTED, read_rows(args.csvfiles, args.channel.lower(), counts))
+        if args.days is not None:
+            conn.execute(DELETE_BEFORE, ("-{} day".format(args.days),))
+        print("Read {read} plays from {files} ({skipped} lines couldn't be read) in {seconds:.1f}s".format(
+            files=", ".join(args.csvfiles), seconds=time.perf_counter() - start, **counts))
+
+        conn.execute(CSV_ONLY) # Both differences are worked out once, then counted, shown and imported from.
+        if args.days is None:
+            conn.execute(DB_ONLY.format(""))
+        else: # Only the same days of the database are compared, or everything older would show up as missing from the csv.
+            conn.execute(DB_ONLY.format("WHERE dateplayed > date('now', ?) "), ("-{} day".format(args.days),))
+        csvonly = conn.execute("SELECT COUNT(*) FROM csvonly").fetchone()[0]
+        dbonly = conn.execute("SELECT COUNT(*) FROM dbonly").fetchone()[0]
+        duplicates = conn.execute(DB_DUPLICATES).fetchone()[0]
+        print("{} plays are only in the csv, {} are only in the database, and {} rows in the database are duplicates".format(csvonly, dbonly, duplicates))
+        if csvonly:
+            show("Only in the csv:", conn.execute("SELECT * FROM csvonly"), args.samples)
+        if dbonly:
+            show("Only in the database:", conn.execute("SELECT * FROM dbonly"), args.samples)
+
+        if args.export and dbonly:
+            with open(args.export, 'a', encoding='utf-8') as f:
+                for channel, twitchname, switchname, dateplayed in conn.execute("SELECT * FROM dbonly"):
+                    f.write("{},{},{},{}\n".format(twitchname, switchname, dateplayed, channel))
+            print("Appended {} plays to {}".format(dbonly, args.export))
+        if not args.report:
+            imported = conn.execute(IMPORT_MISSING).rowcount
+            log.count_plays("csvonly")
+            log.archive(7)
+            print("Imported {} plays into {}".format(imported, args.db))
+            if args.dedupe:
+                deleted = conn.execute(DELETE_DUPLICATES).rowcount
+                if deleted: # The duplicates were counted as plays too, so the counts are redone from what's left.
+                    conn.execute("DELETE FROM playcounts")
+                    log.count_plays("plays")
+                print("Deleted {} duplicate rows".format(deleted))
+        for table in ("imported", "csvonly", "dbonly"):
+            conn.execute("DROP TABLE {}".format(table))
+    log.close()
+    print("Done in {:.1f}s".format(time.perf_counter() - start))
+
+
+if __name__ == "__main__":
+    main()
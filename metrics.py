@@ -0,0 +1,160 @@
+import asyncio
+import bisect
+import contextlib
+import os
+import threading
+import time
+
+"""
+Metrics keeps counters, gauges and latency histograms for the bot, so that when it feels sluggish on stream the slow
+part can be found without attaching a profiler. Commands are timed as they're dispatched, the background writer times
+its database commits and file writes, and a sampler measures how late the event loop wakes up (anything the loop is
+stuck on delays every command in every channel). Moderators get a short summary with !stats, and everything is written
+in Prometheus' text format to a file every few seconds and, if a port is set, served over HTTP on localhost.
+
+Histograms use fixed buckets like Prometheus does, so recording a sample costs a binary search and two additions no
+matter how many samples there are, and percentiles are estimated from the buckets. The writer thread records into the
+same histograms as the event loop, so updates happen under a lock.
+"""
+
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)  # Upper bounds in seconds.
+
+
+class Histogram:
+    __slots__ = ('counts', 'count', 'sum', 'max')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)  # The last bucket is everything over the largest bound.
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q): # Estimates a percentile by interpolating inside the bucket it falls in, the same way Prometheus' histogram_quantile() does.
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if seen + count >= rank and count:
+                if i == len(BUCKETS):
+                    return self.max
+                lower = BUCKETS[i - 1] if i else 0.0
+                return min(self.max, lower + (BUCKETS[i] - lower) * (rank - seen) / count)
+            seen += count
+        return self.max
+
+
+class Metrics:
+    def __init__(self, prefix="zardbot"):
+        self.prefix = prefix
+        self.started = time.time()
+        self.lock = threading.Lock()
+        self.counters = {}  # (name, labels) -> count
+        self.histograms = {}  # (name, labels) -> Histogram
+        self.gauges = {}  # name -> (function returning the current value, "gauge" or "counter")
+
+    def count(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def observe(self, name, seconds, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    @contextlib.contextmanager
+    def timer(self, name, **labels): # Times the body of a with statement into a histogram.
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def gauge(self, name, function, kind="gauge"): # Registers a value that is read whenever the metrics are shown, e.g. how many messages are waiting in the outbox.
+        self.gauges[name] = (function, kind)
+
+    def histogram(self, name, **labels): # Returns the histogram for a name and labels, or an empty one if nothing was recorded yet.
+        return self.histograms.get((name, tuple(sorted(labels.items())))) or Histogram()
+
+    def by_label(self, name, label): # Returns {label value: Histogram} for every histogram of a name, e.g. each command's latencies.
+        with self.lock:
+            return {dict(labels).get(label): histogram for (key, labels), histogram in self.histograms.items() if key == name}
+
+    def render(self): # Everything in Prometheus' text exposition format.
+        lines = []
+        with self.lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted(self.histograms.items(), key=lambda item: item[0])
+            histograms = [(key, (list(histogram.counts), histogram.count, histogram.sum)) for key, histogram in histograms]
+        lines.append("# TYPE {}_uptime_seconds gauge".format(self.prefix))
+        lines.append("{}_uptime_seconds {:.0f}".format(self.prefix, time.time() - self.started))
+        for name, (function, kind) in sorted(self.gauges.items()):
+            lines.append("# TYPE {}_{} {}".format(self.prefix, name, kind))
+            lines.append("{}_{} {}".format(self.prefix, name, function()))
+        typed = set()
+        for (name, labels), value in counters:
+            if name not in typed:
+                lines.append("# TYPE {}_{}_total counter".format(self.prefix, name))
+                typed.add(name)
+            lines.append("{}_{}_total{} {}".format(self.prefix, name, self._labels(labels), value))
+        for (name, labels), (counts, count, total) in histograms:
+            if name not in typed:
+                lines.append("# TYPE {}_{} histogram".format(self.prefix, name))
+                typed.add(name)
+            cumulative = 0
+            for bound, bucketcount in zip(BUCKETS + ("+Inf",), counts):
+                cumulative += bucketcount
+                lines.append("{}_{}_bucket{} {}".format(self.prefix, name, self._labels(labels + (("le", bound),)), cumulative))
+            lines.append("{}_{}_sum{} {:.6f}".format(self.prefix, name, self._labels(labels), total))
+            lines.append("{}_{}_count{} {}".format(self.prefix, name, self._labels(labels), count))
+        return "\n".join(lines) + "\n"
+
+    async def sample_lag(self, interval=0.5): # Measures how much later than asked the event loop wakes up from a sleep.
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(interval)
+            self.observe("loop_lag_seconds", max(0.0, time.perf_counter() - start - interval))
+
+    async def export(self, path, every=15): # Rewrites the metrics file every few seconds, e.g. for node_exporter's textfile collector.
+        while True:
+            text = self.render()
+            await asyncio.get_running_loop().run_in_executor(None, self._write, path, text)
+            await asyncio.sleep(every)
+
+    async def serve(self, port, host="127.0.0.1"): # Serves the metrics over HTTP for Prometheus to scrape. Only listens on localhost unless told otherwise.
+        server = await asyncio.start_server(self._handle, host, port)
+        async with server:
+            await server.serve_forever()
+
+    async def _handle(self, reader, writer):
+        try:
+            await reader.readuntil(b"\r\n\r\n")
+            body = self.render().encode()
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/plain; version=0.0.4\r\nContent-Length: "
+                         + str(len(body)).encode() + b"\r\nConnection: close\r\n\r\n" + body)
+            await writer.drain()
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    def _write(self, path, text):
+        with open(path + ".tmp", 'w') as f:
+            f.write(text)
+        os.replace(path + ".tmp", path) # Whoever reads the file never sees it half written.
+
+    def _labels(self, labels):
+        if not labels:
+            return ""
+        return "{" + ",".join('{}="{}"'.format(key, str(value).replace("\\", "\\\\").replace('"', '\\"')) for key, value in labels) + "}"
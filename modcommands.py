@@ -0,0 +1,88 @@
+import time
+
+from twitchio.ext import commands
+
+import botsql
+from scheduler import TIERS
+
+"""
+The moderators' settings for a channel: !toggle, !cooldown, !setid and !ratio, plus !stats on how the bot is doing.
+"""
+
+
+class ModCommands(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+
+    @commands.command(name='toggle') # !toggle keyname is used by moderators to toggle on or off the various restrictions for the stream.
+    async def toggle(self,ctx):
+        state = self.bot.channelstate(ctx.channel)
+        if ctx.author.is_mod:
+            if not ctx.line.target:
+                self.bot.say(ctx, "@{} you forgot to give an argument for what is to be toggled.".format(ctx.author.name))
+            else:
+                if ctx.line.target not in state.toggles.keys():
+                    self.bot.say(ctx, "@{} {} is not a togglable argument. Current togglable arguments: {}".format(ctx.author.name, ctx.line.words[0], state.toggles))
+                else:
+                    state.toggles[ctx.line.target] = not state.toggles[ctx.line.target]
+                    self.bot.say(ctx, "@{} here are the states of your booleans: {}".format(ctx.author.name, state.toggles))
+
+    @commands.command(name='cooldown') # !cooldown join 3 30 is a moderator only command that lets viewers use !join 3 times per 30 seconds. !cooldown join off takes the limit away, and !cooldown on its own shows them all.
+    async def setcooldown(self,ctx):
+        state = self.bot.channelstate(ctx.channel)
+        if ctx.author.is_mod:
+            words = ctx.line.words
+            if not words:
+                self.bot.say(ctx, "@{} cooldowns: {}".format(ctx.author.name, ", ".join(["!{} {}/{}s".format(name, *limit) for name, limit in sorted(state.cooldowns.items()) if limit]) or "none"))
+                return
+            name = ctx.line.target.lstrip("!")
+            if name not in self.bot.commands:
+                self.bot.say(ctx, "@{} there's no !{} command".format(ctx.author.name, name))
+            elif len(words) == 2 and words[1].lower() == "off":
+                state.cooldowns[name] = None
+                self.bot.cooldowns.clear(state.name, name)
+                self.bot.say(ctx, "@{} !{} has no cooldown now".format(ctx.author.name, name))
+            elif len(words) == 3 and words[1].isdigit() and words[2].isdigit() and int(words[1]) > 0 and int(words[2]) > 0:
+                state.cooldowns[name] = (int(words[1]), int(words[2]))
+                self.bot.cooldowns.clear(state.name, name)
+                self.bot.say(ctx, "@{} viewers can use !{} {} times per {} seconds now".format(ctx.author.name, name, words[1], words[2]))
+            else:
+                self.bot.say(ctx, "@{} it's [!cooldown command uses seconds] or [!cooldown command off] without the [ ]".format(ctx.author.name))
+
+    @commands.command(name='setid')
+    async def setid(self,ctx): # !setid ARENA_ID allows a moderator to alter the arena ID.
+        state = self.bot.channelstate(ctx.channel)
+        if ctx.author.is_mod:
+            if not ctx.line.words:
+                self.bot.say(ctx, "@{} you need to provide an arena ID. Type !setid ARENA_ID".format(ctx.author.name))
+            else:
+                state.arenaid = ctx.line.words[0]
+                self.bot.say(ctx, "@{} the ID has been set to {}".format(ctx.author.name,state.arenaid))
+
+    @commands.command(name='ratio')
+    async def ratio(self,ctx): # !ratio tier number is a moderator only command that sets how many people from a tier can play in a row while lower tiers wait. !ratio tier all lets a tier always go first.
+        state = self.bot.channelstate(ctx.channel)
+        if ctx.author.is_mod:
+            if ctx.line.target in TIERS and len(ctx.line.words) == 2 and (ctx.line.position is not None or ctx.line.rest == 'all'):
+                state.schedule.setratio(ctx.line.target, None if ctx.line.rest == 'all' else max(1, ctx.line.position))
+                ratio = state.schedule.ratios[ctx.line.target]
+                self.bot.say(ctx, "@{} the ratio for {} has been set to {}".format(ctx.author.name, ctx.line.target, 'all' if ratio is None else ratio))
+            else:
+                self.bot.say(ctx, "@{} it's [!ratio tier number] or [!ratio tier all] without the [ ]. Current ratios: {}".format(ctx.author.name, state.schedule.ratios))
+
+    @commands.command(name='stats')
+    async def stats(self,ctx): # !stats is a moderator only command that sums up how the bot is doing: the slowest commands, event loop lag, the outbox and the database.
+        if ctx.author.is_mod:
+            commandstats = botsql.metrics.by_label("command_seconds", "command")
+            slowest = sorted(commandstats.items(), key=lambda item: item[1].quantile(0.99), reverse=True)[:3]
+            lag = botsql.metrics.histogram("loop_lag_seconds")
+            commit = botsql.metrics.histogram("db_commit_seconds")
+            self.bot.say(ctx, "up {}m | {} commands, slowest p99: {} | loop lag p99 {:.1f}ms max {:.1f}ms | outbox {} waiting, {} sent | db commit p50 {:.1f}ms p99 {:.1f}ms, {} writes waiting".format(
+                int(time.time() - botsql.metrics.started) // 60, sum([histogram.count for histogram in commandstats.values()]),
+                ", ".join(["!{} {:.1f}ms".format(command, histogram.quantile(0.99) * 1000) for command, histogram in slowest]) or "none yet",
+                lag.quantile(0.99) * 1000, lag.max * 1000, self.bot.outbox.depth(), self.bot.outbox.sent(),
+                commit.quantile(0.5) * 1000, commit.quantile(0.99) * 1000, botsql.writer.pending.qsize()))
+
+
+def prepare(bot): # Called by the bot's load_module() and reload_module().
+    bot.add_cog(ModCommands(bot))
@@ -0,0 +1,122 @@
+import bisect
+import heapq
+import math
+import unicodedata
+
+"""
+NameIndex finds the name a moderator meant when what they typed doesn't match anything exactly. In game names come in
+with odd spacing, capital letters, accents and full width or fancy Unicode letters, and retyping them while the stream
+waits is no fun. Every name is reduced to a key: NFKC normalized, casefolded, with accents, invisible characters, spaces
+and a leading @ taken out, so "Ｍｒ  Game", "mr game" and "MrGame" all have the key "mrgame".
+
+Each ChannelState has one NameIndex shared by its schedule tiers, played set and variety index, which add and discard
+names as they change, along with where each name is (the tier, "played" or "log"). search() then looks for the typed
+name three ways, best first: the same key, keys that start with it (a binary search in the sorted keys), and keys that
+share enough of its three letter chunks (trigrams, looked up in a dictionary of which keys have each one). A close key
+has to share at least one of the query's rarest few trigrams, so only the keys with those are compared, and chunks that
+half the log has (like "use" when everyone is user123) don't make the search go through half the log. None of the
+three look at every name, so lookups stay quick as the log grows into thousands of names.
+"""
+
+DROPPED = ('Mn', 'Cf', 'Zs', 'Zl', 'Zp', 'Cc')  # Accents, invisible characters, spaces and control characters.
+SIMILARITY = 0.4  # How much of their trigrams two keys need to share to count as a match.
+PREFIXES = 50  # How many keys starting with the query are looked at.
+
+
+def normalize(name): # The key a name is indexed and searched under.
+    name = unicodedata.normalize("NFKD", unicodedata.normalize("NFKC", name).casefold())
+    return unicodedata.normalize("NFC", "".join(ch for ch in name if unicodedata.category(ch) not in DROPPED)).lstrip("@")
+
+
+def trigrams(key): # The set of three letter chunks of a key, padded so the start of a name counts for a little more.
+    padded = "  {} ".format(key)
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class NameIndex:
+    def __init__(self):
+        self._names = {}  # name -> {source: how many times it's there}
+        self._bykey = {}  # key -> set of names with that key
+        self._keys = []  # every key, sorted, for prefix searches
+        self._bygram = {}  # trigram -> set of keys that have it
+        self._grams = {}  # key -> its trigrams
+
+    def __len__(self):
+        return len(self._names)
+
+    def add(self, name, source):
+        sources = self._names.get(name)
+        if sources is None:
+            sources = self._names[name] = {}
+            key = normalize(name)
+            names = self._bykey.get(key)
+            if names is None:
+                names = self._bykey[key] = set()
+                bisect.insort(self._keys, key)
+                self._grams[key] = trigrams(key)
+                for gram in self._grams[key]:
+                    self._bygram.setdefault(gram, set()).add(key)
+            names.add(name)
+        sources[source] = sources.get(source, 0) + 1
+
+    def discard(self, name, source):
+        sources = self._names.get(name)
+        if sources is None or source not in sources:
+            return
+        sources[source] -= 1
+        if sources[source]:
+            return
+        del sources[source]
+        if sources:
+            return
+        del self._names[name]
+        key = normalize(name)
+        names = self._bykey[key]
+        names.discard(name)
+        if not names:
+            del self._bykey[key]
+            del self._keys[bisect.bisect_left(self._keys, key)]
+            for gram in self._grams.pop(key):
+                keys = self._bygram[gram]
+                keys.discard(key)
+                if not keys:
+                    del self._bygram[gram]
+
+    def same(self, query, sources=None): # Names that are what was typed apart from case, spacing and Unicode, e.g. "mr game" for "Mr  Gáme".
+        return sorted(name for name in self._bykey.get(normalize(query), ()) if self._within(name, sources))
+
+    def search(self, query, sources=None, limit=3): # The names most likely meant by query, best first, only counting the given sources if there are any.
+        key = normalize(query)
+        if not key:
+            return []
+        scores = {}  # key -> how good a match it is, from 0 to 1
+        if key in self._bykey:
+            scores[key] = 1.0
+        start = bisect.bisect_left(self._keys, key)
+        for other in self._keys[start:start + PREFIXES]:
+            if not other.startswith(key):
+                break
+            scores.setdefault(other, 0.5 + 0.5 * len(key) / len(other))
+        grams = trigrams(key)
+        rarest = sorted(grams, key=lambda gram: len(self._bygram.get(gram, ())))
+        needed = math.ceil(SIMILARITY * len(grams) / (2 - SIMILARITY)) # The fewest trigrams a key can share and still be similar enough.
+        candidates = set()
+        for gram in rarest[:len(grams) - needed + 1]: # Anything sharing that many has to have at least one of these.
+            candidates.update(self._bygram.get(gram, ()))
+        for other in candidates:
+            othergrams = self._grams[other]
+            similarity = 2.0 * len(grams & othergrams) / (len(grams) + len(othergrams))
+            if similarity >= SIMILARITY and similarity * 0.9 > scores.get(other, 0.0): # A close spelling ranks just under the same key.
+                scores[other] = similarity * 0.9
+        found = []
+        ranked = [(-score, other) for other, score in scores.items()]
+        heapq.heapify(ranked) # Usually only the first few are needed, so they're popped off a heap instead of sorting them all.
+        while ranked:
+            _, other = heapq.heappop(ranked)
+            found.extend(sorted(name for name in self._bykey[other] if self._within(name, sources)))
+            if len(found) >= limit:
+                break
+        return found[:limit]
+
+    def _within(self, name, sources):
+        return sources is None or not sources.isdisjoint(self._names[name])
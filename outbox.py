@@ -0,0 +1,166 @@
+import asyncio
+import time
+from collections import deque
+
+"""
+The Outbox is where every chat message the bot wants to send goes, instead of straight to channel.send(). Twitch only lets
+an account send 20 messages per 30 seconds in a channel (100 if the bot is a moderator there), and anything past that is
+dropped. Each channel gets its own line of pending messages and a sender task that paces them with a token bucket sized
+so that no 30 second window ever goes over the limit. Replies to moderators go out before replies to viewers, and
+acknowledgements of the same kind that are still waiting are merged into one message, e.g. "@a @b @c added to the queue".
+"""
+
+MOD = 0  # Priority of replies to moderators. Lower goes first.
+VIEWER = 1  # Priority of replies to everyone else.
+MAXLENGTH = 500  # Twitch rejects chat messages longer than this.
+
+
+class TokenBucket:
+    def __init__(self, limit, per=30, burst=5):
+        self.configure(limit, per, burst)
+        self.tokens = float(self.burst)
+        self.stamp = time.monotonic()
+
+    def configure(self, limit, per=30, burst=5): # A burst of b with a refill of (limit - b) / per never lets more than limit through in any window of per seconds.
+        self.limit = limit
+        self.burst = burst
+        self.rate = (limit - burst) / per
+
+    def delay(self): # Seconds until a token is available, or 0 if one is available now.
+        self._refill()
+        return 0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self):
+        self._refill()
+        self.tokens -= 1
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+
+
+class Reply:
+    __slots__ = ('text', 'group', 'mentions')
+
+    def __init__(self, text, group=None, mention=None):
+        self.text = text  # What gets sent if nothing is merged into this reply.
+        self.group = group  # What follows the mentions once several replies are merged.
+        self.mentions = [mention] if mention else []
+
+    def render(self):
+        if len(self.mentions) < 2:
+            return self.text
+        return "{} {}".format(" ".join(self.mentions), self.group)
+
+    def merged_length(self, mention): # The length this reply would have with one more mention merged into it.
+        return len(" ".join(self.mentions)) + len(mention) + len(self.group) + 2
+
+
+class ChannelOutbox:
+    def __init__(self, channel):
+        self.channel = channel  # The most recent twitchio Channel object for this channel, used for sending.
+        self.pending = (deque(), deque())  # One line per priority, indexed by MOD and VIEWER.
+        self.open = {}  # (priority, group) -> the waiting Reply new acknowledgements of that group get merged into.
+        self.ismod = None
+        self.bucket = TokenBucket(20, 30, 5)
+        self.wakeup = asyncio.Event()
+        self.idle = asyncio.Event()
+        self.idle.set()
+        self.sent = 0
+        self.task = None
+
+    def __len__(self):
+        return len(self.pending[MOD]) + len(self.pending[VIEWER])
+
+    def put(self, text, priority=VIEWER, group=None, mention=None):
+        if group is not None and mention is not None:
+            reply = self.open.get((priority, group))
+            if reply is not None and reply.merged_length(mention) <= MAXLENGTH:
+                reply.mentions.append(mention)
+                return
+        reply = Reply(text, group, mention)
+        if group is not None and mention is not None:
+            self.open[(priority, group)] = reply
+        self.pending[priority].append(reply)
+        self.idle.clear()
+        self.wakeup.set()
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self.run())
+
+    async def run(self):
+        while True:
+            await self.wakeup.wait()
+            if not len(self):
+                self.wakeup.clear()
+                self.idle.set()
+                continue
+            self._check_mod()
+            delay = self.bucket.delay()
+            if delay:
+                await asyncio.sleep(delay)
+                continue
+            priority = MOD if self.pending[MOD] else VIEWER
+            reply = self.pending[priority].popleft()
+            if self.open.get((priority, reply.group)) is reply: # Once a reply is on its way out, nothing else can be merged into it.
+                del self.open[(priority, reply.group)]
+            self.bucket.take()
+            try:
+                await self.channel.send(reply.render())
+                self.sent += 1
+            except Exception as e:
+                print("Couldn't send to {}: {}".format(self.channel.name, e))
+
+    def _check_mod(self): # twitchio knows whether the bot is a moderator of the channel from its chatter cache.
+        try:
+            ismod = bool(self.channel._bot_is_mod())
+        except Exception:
+            ismod = False
+        if ismod != self.ismod:
+            self.ismod = ismod
+            if ismod:
+                self.bucket.configure(100, 30, 20)
+            else:
+                self.bucket.configure(20, 30, 5)
+
+
+class Outbox:
+    def __init__(self):
+        self.channels = {}  # channel name -> ChannelOutbox
+
+    def say(self, channel, text, priority=VIEWER): # Queues a message to be sent as is.
+        self._outbox(channel).put(text, priority)
+
+    def ack(self, channel, text, group, mention, priority=VIEWER): # Queues an acknowledgement that can be merged with others of the same group that haven't been sent yet.
+        self._outbox(channel).put(text, priority, group, mention)
+
+    def depth(self, channel=None): # How many messages are waiting to be sent, in one channel or in all of them.
+        if channel is not None:
+            outbox = self.channels.get(channel.lower())
+            return len(outbox) if outbox else 0
+        return sum([len(outbox) for outbox in self.channels.values()])
+
+    def sent(self): # How many messages have been sent in all channels since the bot started.
+        return sum([outbox.sent for outbox in self.channels.values()])
+
+    async def drain(self, timeout=None): # Waits until every channel has sent everything it has waiting.
+        waits = [outbox.idle.wait() for outbox in self.channels.values()]
+        if waits:
+            await asyncio.wait_for(asyncio.gather(*waits), timeout)
+
+    async def close(self, timeout=5):
+        try:
+            await self.drain(timeout)
+        except asyncio.TimeoutError:
+            print("{} messages were still waiting to be sent".format(self.depth()))
+        for outbox in self.channels.values():
+            if outbox.task is not None:
+                outbox.task.cancel()
+
+    def _outbox(self, channel):
+        name = channel.name.lower()
+        if name not in self.channels:
+            self.channels[name] = ChannelOutbox(channel)
+        else:
+            self.channels[name].channel = channel
+        return self.channels[name]
@@ -0,0 +1,74 @@
+from outbox import MAXLENGTH
+
+"""
+Pages splits a list that's too long for one chat message (the queue, the sub list, the played list) into pages that
+each fit, so !queue shows the first page and !queue 2 the next one, instead of one message that Twitch cuts off or
+rejects. Entries are written out compactly, numbered if their order matters, e.g.
+    Queue (23, page 1/2): 1. someone🔥their name, 2. zardfan🔥pika, ... !queue 2 for more
+
+Pages remembers the entries it was last built from and the text of each one. When it's given the entries again after a
+change, only the part from the first entry that's different onward is written out again, and only the pages from
+there on are split again. People join at the back far more often than anything else happens, so usually that's just the
+last page.
+"""
+
+RESERVED = 80  # Room left on each page for the title, page numbers and the hint about the next page.
+SEPARATOR = ", "
+
+
+class Pages:
+    def __init__(self, title, command, numbered=True, render=str, empty="no one"):
+        self.title = title  # e.g. "Queue", shown before the count
+        self.command = command  # The command that shows the next page, e.g. "queue".
+        self.numbered = numbered
+        self.render = render
+        self.empty = empty
+        self.budget = MAXLENGTH - RESERVED
+        self.entries = []
+        self.texts = []  # Each entry as it's shown.
+        self.starts = [0]  # Where each page starts in entries. The last page runs to the end.
+
+    def __len__(self): # How many pages there are.
+        return len(self.starts)
+
+    def update(self, entries): # Brings the pages up to date with entries, redoing only what comes after the first change.
+        entries = list(entries)
+        same = 0
+        shortest = min(len(entries), len(self.entries))
+        while same < shortest and entries[same] == self.entries[same]:
+            same += 1
+        if same == len(entries) == len(self.entries):
+            return
+        self.entries = entries
+        del self.texts[same:]
+        for position in range(same, len(entries)):
+            self.texts.append(self._text(position, entries[position]))
+        # The page before the one the change starts on is split again too, since a changed first entry might fit on it now.
+        page = max(0, next((i for i, start in enumerate(self.starts) if start >= same), len(self.starts)) - 1)
+        del self.starts[page + 1:]
+        length = 0
+        for position in range(self.starts[page], len(self.texts)):
+            added = len(self.texts[position]) + (len(SEPARATOR) if length else 0)
+            if length and length + added > self.budget:
+                self.starts.append(position)
+                length = len(self.texts[position])
+            else:
+                length += added
+
+    def page(self, number): # The text of a page, counting from 1. Numbers past the end show the last page.
+        number = min(max(number, 1), len(self.starts))
+        start = self.starts[number - 1]
+        end = self.starts[number] if number < len(self.starts) else len(self.texts)
+        text = "{} ({}".format(self.title, len(self.entries))
+        if len(self.starts) > 1:
+            text += ", page {}/{}".format(number, len(self.starts))
+        text += "): " + (SEPARATOR.join(self.texts[start:end]) or self.empty)
+        if number < len(self.starts):
+            text += " ... !{} {} for more".format(self.command, number + 1)
+        return text
+
+    def _text(self, position, entry):
+        text = self.render(entry)
+        if self.numbered:
+            text = "{}. {}".format(position + 1, text)
+        return text[:self.budget]
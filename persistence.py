@@ -0,0 +1,179 @@
+import concurrent.futures
+import contextlib
+import os
+import queue
+import threading
+
+from playerdb import PlayerLog
+
+RETRIES = 5  # How many batches a database change that keeps failing is tried in before it's given up on.
+
+"""
+WriteBehind moves every disk write the bot makes off of the event loop. Commands only put a small record of what
+changed into an in-memory queue and return right away. A background thread takes whatever has piled up, commits all
+of the database writes in a single transaction, and appends to log.csv and each journal file with one write apiece.
+The files are written even if the transaction fails. When it does, each database change is tried again on its own, so
+one bad write doesn't take the rest of the batch with it, and any that still fail are tried again with the next batch.
+If it's given a Metrics (see metrics.py), it records how long each commit, file write and batch took, and how many
+changes each batch had.
+
+The thread isn't started until start() is called, so creating a WriteBehind is free and changes can be queued before
+the database is even opened. call() runs a function with the writer's PlayerLog on the thread, in order with the writes
+around it, which is how the bot loads its logs at startup without a second connection racing the writes.
+"""
+
+
+class WriteBehind:
+    def __init__(self, path="playerlog", csvlog="log.csv", metrics=None):
+        self.path = path
+        self.csvlog = csvlog
+        self.metrics = metrics
+        self.pending = queue.Queue()
+        self.failed = []  # (kind, data, tries) for database changes that couldn't be written yet, retried with the next batch
+        self.thread = threading.Thread(target=self._run, name="WriteBehind", daemon=True)
+
+    def start(self): # Opens the database and starts writing whatever has been queued. Calling it again does nothing.
+        if self.thread.ident is None:
+            self.thread.start()
+
+    def log_play(self, channel, twitchname, switchname, dateplayed): # Records a finished turn in the database and in log.csv.
+        self.pending.put(("play", (channel, twitchname, switchname, dateplayed)))
+
+    def delete_twitchname(self, channel, twitchname):
+        self.pending.put(("deletetwitch", (channel, twitchname)))
+
+    def delete_switchname(self, channel, switchname):
+        self.pending.put(("deleteswitch", (channel, switchname)))
+
+    def archive(self, days=7): # Moves plays older than the given number of days out of the past week's table and into the archive.
+        self.pending.put(("archive", days))
+
+    def append(self, filename, line): # Adds a line to the end of a file, e.g. a change to a channel's journal.
+        self.pending.put(("append", (filename, line)))
+
+    def compact(self, snapshotfile, journalfile, snapshot): # Replaces the snapshot file, then starts the journal over, since the snapshot already includes it.
+        self.pending.put(("compact", (snapshotfile, journalfile, snapshot)))
+
+    def call(self, function): # Runs function(playerlog) on the writer's thread after everything queued so far, and returns a concurrent.futures.Future of what it returns.
+        future = concurrent.futures.Future()
+        self.pending.put(("call", (function, future)))
+        return future
+
+    def flush(self): # Blocks until everything that has been queued so far is on disk.
+        self.pending.join()
+
+    def close(self):
+        if self.thread.is_alive():
+            self.pending.put(("stop", None))
+            self.thread.join()
+
+    def _run(self):
+        log = PlayerLog(self.path)
+        if self.metrics:
+            log.oncommit = lambda seconds: self.metrics.observe("db_commit_seconds", seconds)
+        running = True
+        while running:
+            batch = [self.pending.get()]
+            while True:
+                try:
+                    batch.append(self.pending.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                with self._timer("writer_batch_seconds"):
+                    running = self._apply(log, batch)
+            except Exception as e: # A failed write shouldn't take the bot down with it, but it should be visible in the terminal.
+                print("WriteBehind failed to write {} changes: {}".format(len(batch), e))
+                if self.metrics:
+                    self.metrics.count("writer_errors")
+            finally:
+                if self.metrics:
+                    self.metrics.count("writer_changes", len(batch))
+                for _ in batch:
+                    self.pending.task_done()
+        log.close()
+
+    def _apply(self, log, batch):
+        running = True
+        changes = []  # (kind, data) for everything that touches the database, in the order it was queued
+        csvlines = []
+        snapshots = []  # (snapshotfile, snapshot) to replace
+        appends = {}  # filename -> lines to append
+        restart = set()  # files to start over instead of appending to
+        for kind, data in batch:
+            if kind == "play":
+                changes.append((kind, data))
+                csvlines.append("{1},{2},{3},{0}\n".format(*data)) # The channel goes last so older three column lines in log.csv still line up.
+            elif kind in ("deletetwitch", "deleteswitch", "archive", "call"):
+                changes.append((kind, data))
+            elif kind == "append":
+                appends.setdefault(data[0], []).append(data[1] + "\n")
+            elif kind == "compact":
+                snapshotfile, journalfile, snapshot = data
+                snapshots.append((snapshotfile, snapshot))
+                appends[journalfile] = [] # Anything journaled before the snapshot in this batch is already in it.
+                restart.add(journalfile)
+            elif kind == "stop":
+                running = False
+        self._write(log, changes)
+        if not running and self.failed:
+            print("WriteBehind is stopping with {} database changes it couldn't write: {}".format(len(self.failed), [data for kind, data, tries in self.failed]))
+        if csvlines or snapshots or appends:
+            with self._timer("file_write_seconds"):
+                if csvlines:
+                    with open(self.csvlog, 'a') as f: # The data is also stored in a csv file in case something goes wrong.
+                        f.write("".join(csvlines))
+                for snapshotfile, snapshot in snapshots:
+                    with open(snapshotfile + ".tmp", 'w', encoding='utf-8') as f:
+                        f.write(snapshot)
+                    os.replace(snapshotfile + ".tmp", snapshotfile)
+                for filename, lines in appends.items():
+                    with open(filename, 'w' if filename in restart else 'a', encoding='utf-8') as f:
+                        f.write("".join(lines))
+        return running
+
+    def _timer(self, name): # Times a with statement into one of the metrics' histograms, or does nothing without metrics.
+        return self.metrics.timer(name) if self.metrics else contextlib.nullcontext()
+
+    def _write(self, log, changes): # Commits changes (after any that failed last time) in one transaction. If that fails, each one is tried in a transaction of its own, and the ones that still fail are kept for the next batch.
+        changes, self.failed = self.failed + [(kind, data, 0) for kind, data in changes], []
+        if not changes:
+            return
+        try:
+            with log.batch():
+                for kind, data, tries in changes:
+                    self._change(log, kind, data)
+            return
+        except Exception as e:
+            print("WriteBehind failed to write {} database changes together, trying them one at a time: {}".format(len(changes), e))
+            if self.metrics:
+                self.metrics.count("writer_errors")
+        for kind, data, tries in changes:
+            if kind == "call" and data[1].done(): # It already ran, and whoever is waiting on it has its result.
+                continue
+            try:
+                with log.batch():
+                    self._change(log, kind, data)
+            except Exception as e:
+                if tries + 1 < RETRIES:
+                    self.failed.append((kind, data, tries + 1))
+                else:
+                    print("WriteBehind gave up on {} {} after {} tries: {}".format(kind, data, RETRIES, e))
+                if self.metrics:
+                    self.metrics.count("writer_errors")
+
+    def _change(self, log, kind, data):
+        if kind == "play":
+            log.insert(*data)
+        elif kind == "deletetwitch":
+            log.delete_twitchname(*data)
+        elif kind == "deleteswitch":
+            log.delete_switchname(*data)
+        elif kind == "archive":
+            log.archive(data)
+        elif kind == "call":
+            function, future = data
+            try:
+                future.set_result(function(log))
+            except Exception as e: # Whoever is waiting on the future gets the error instead of the rest of the batch.
+                future.set_exception(e)
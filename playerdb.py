@@ -0,0 +1,139 @@
+import contextlib
+import re
+import sqlite3
+import time
+
+"""
+PlayerLog is the one long-lived connection the bot keeps to the SQLite3 database of who has played and when.
+Opening a fresh connection for every command used to dominate the cost of !next and the log commands, so the
+connection is opened once, put in WAL mode, and every statement is parameterized so that SQLite3's statement
+cache can reuse the prepared form. The indexes keep lookups, deletes and the 7 day cleanup from scanning the table.
+Every row belongs to a channel, and the name indexes lead with the channel, so each channel's part of the table is
+its own contiguous range of the index.
+
+players only holds the past week, which is all the variety check needs. Older plays are moved into an archive with one
+table per month (archive_2024_05 and so on), which have no indexes since they're only ever added to and read as a whole,
+and the plays view puts the week and the archive back together. playcounts has how many times each person played in a
+channel on each day, and is kept up to date as plays are inserted, so questions like "who played the most this month"
+never have to go through the plays themselves. It counts every play that was logged, including ones later taken out of
+the variety log with !removelog.
+"""
+
+CREATE_TABLE = "CREATE TABLE IF NOT EXISTS players(twitchname text, switchname text, dateplayed date, channel text NOT NULL DEFAULT '')"
+ADD_CHANNEL = "ALTER TABLE players ADD COLUMN channel text NOT NULL DEFAULT '{}'" # Databases from before channels existed all belong to one channel.
+CREATE_INDEXES = (
+    "DROP INDEX IF EXISTS players_twitchname",
+    "DROP INDEX IF EXISTS players_switchname",
+    "CREATE INDEX IF NOT EXISTS players_channel_twitchname ON players(channel, twitchname)",
+    "CREATE INDEX IF NOT EXISTS players_channel_switchname ON players(channel, switchname)",
+    "CREATE INDEX IF NOT EXISTS players_dateplayed ON players(dateplayed)",
+)
+INSERT_PLAYER = "INSERT INTO players(channel, twitchname, switchname, dateplayed) VALUES (?, ?, ?, ?)"
+DELETE_TWITCHNAME = "DELETE FROM players WHERE channel = ? AND twitchname = ?"
+DELETE_SWITCHNAME = "DELETE FROM players WHERE channel = ? AND switchname = ?"
+DELETE_OLDER_THAN = "DELETE FROM players WHERE dateplayed <= date('now', ?)"
+CREATE_PLAYCOUNTS = ("CREATE TABLE playcounts(channel text NOT NULL, twitchname text NOT NULL, day date NOT NULL, plays integer NOT NULL, "
+                     "PRIMARY KEY (channel, twitchname, day)) WITHOUT ROWID")
+COUNT_PLAY = ("INSERT INTO playcounts(channel, twitchname, day, plays) VALUES (?, ?, ?, 1) "
+              "ON CONFLICT(channel, twitchname, day) DO UPDATE SET plays = plays + 1")
+COUNT_PLAYS = ("INSERT INTO playcounts(channel, twitchname, day, plays) SELECT channel, twitchname, dateplayed, COUNT(*) FROM {} "
+               "WHERE true GROUP BY channel, twitchname, dateplayed ON CONFLICT(channel, twitchname, day) DO UPDATE SET plays = plays + excluded.plays")
+SELECT_PLAYCOUNTS = "SELECT channel, twitchname, day, plays FROM playcounts ORDER BY day"
+ARCHIVE_MONTHS = "SELECT DISTINCT substr(dateplayed, 1, 7) FROM players WHERE dateplayed <= date('now', ?)"
+CREATE_ARCHIVE = "CREATE TABLE IF NOT EXISTS {}(channel text NOT NULL, twitchname text, switchname text, dateplayed date)"
+ARCHIVE_MONTH = ("INSERT INTO {} SELECT channel, twitchname, switchname, dateplayed FROM players " # A range on dateplayed, so each month is read straight from the index.
+                 "WHERE dateplayed <= date('now', ?) AND dateplayed >= ? AND dateplayed < date(?, '+1 month')")
+SELECT_ARCHIVES = "SELECT name FROM sqlite_master WHERE type = 'table' AND name GLOB 'archive_[0-9][0-9][0-9][0-9]_[0-9][0-9]' ORDER BY name"
+MONTH = re.compile(r"^\d{4}-\d{2}$")
+SELECT_PLAYERS = "SELECT channel, twitchname, switchname, dateplayed FROM players"
+SELECT_CHANNEL_PLAYERS = "SELECT channel, twitchname, switchname, dateplayed FROM players WHERE channel = ?"
+PLAYED_SINCE = "SELECT 1 FROM players WHERE channel = ? AND twitchname = ? AND dateplayed > date('now', ?) LIMIT 1"
+
+
+class PlayerLog:
+    def __init__(self, path="playerlog", legacychannel="introspecktive", readonly=False):
+        self._depth = 0
+        self.oncommit = None  # Called with how many seconds each commit took, e.g. by the writer to record it in the bot's metrics.
+        if readonly: # A second connection that only reads, next to the writer's. It skips the setup below, which the writer does.
+            self.conn = sqlite3.connect("file:{}?mode=ro".format(path), uri=True, cached_statements=64)
+            return
+        self.conn = sqlite3.connect(path, cached_statements=64)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL") # In WAL mode this is still safe against corruption, and skips an fsync per commit.
+        with self.conn:
+            self.conn.execute(CREATE_TABLE)
+            if "channel" not in [column[1] for column in self.conn.execute("PRAGMA table_info(players)")]:
+                self.conn.execute(ADD_CHANNEL.format(legacychannel.lower().replace("'", "")))
+            for statement in CREATE_INDEXES:
+                self.conn.execute(statement)
+            self._create_plays_view()
+            if not self.conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'playcounts'").fetchone():
+                self.conn.execute(CREATE_PLAYCOUNTS)
+                self.conn.execute(COUNT_PLAYS.format("plays")) # Counts up everything already in the database, once.
+
+    @contextlib.contextmanager
+    def batch(self): # Groups several writes into one transaction, which is committed when the outermost batch finishes.
+        self._depth += 1
+        try:
+            yield self
+        except BaseException:
+            if self._depth == 1:
+                self.conn.rollback()
+            raise
+        else:
+            if self._depth == 1:
+                start = time.perf_counter()
+                self.conn.commit()
+                if self.oncommit:
+                    self.oncommit(time.perf_counter() - start)
+        finally:
+            self._depth -= 1
+
+    def archive(self, days=7): # Moves plays from more than the given number of days ago into the monthly archive tables.
+        age = "-{} day".format(days)
+        with self.batch():
+            months = [month for (month,) in self.conn.execute(ARCHIVE_MONTHS, (age,)) if month and MONTH.match(month)]
+            for month in months:
+                table = "archive_{}".format(month.replace("-", "_"))
+                self.conn.execute(CREATE_ARCHIVE.format(table))
+                self.conn.execute(ARCHIVE_MONTH.format(table), (age, month + "-01", month + "-01"))
+            if months:
+                self._create_plays_view()
+            return self.conn.execute(DELETE_OLDER_THAN, (age,)).rowcount
+
+    def players(self, channel=None): # Returns (channel, twitchname, switchname, dateplayed) rows, for one channel or all of them. Only used at startup and by !showlog.
+        if channel is None:
+            return self.conn.execute(SELECT_PLAYERS).fetchall()
+        return self.conn.execute(SELECT_CHANNEL_PLAYERS, (channel,)).fetchall()
+
+    def played_since(self, channel, twitchname, days=7): # Whether someone has played in a channel in the past given number of days, straight from the database.
+        return self.conn.execute(PLAYED_SINCE, (channel, twitchname, "-{} day".format(days))).fetchone() is not None
+
+    def insert(self, channel, twitchname, switchname, dateplayed):
+        with self.batch():
+            self.conn.execute(INSERT_PLAYER, (channel, twitchname, switchname, dateplayed))
+            self.conn.execute(COUNT_PLAY, (channel, twitchname, dateplayed))
+
+    def count_plays(self, table): # Adds every play in a table (e.g. a temporary one full of imported plays) to playcounts.
+        with self.batch():
+            self.conn.execute(COUNT_PLAYS.format(table))
+
+    def playcounts(self): # Returns (channel, twitchname, day, plays) rows for every day anyone played, oldest first.
+        return self.conn.execute(SELECT_PLAYCOUNTS)
+
+    def delete_twitchname(self, channel, twitchname):
+        with self.batch():
+            return self.conn.execute(DELETE_TWITCHNAME, (channel, twitchname)).rowcount
+
+    def delete_switchname(self, channel, switchname):
+        with self.batch():
+            return self.conn.execute(DELETE_SWITCHNAME, (channel, switchname)).rowcount
+
+    def close(self):
+        self.conn.close()
+
+    def _create_plays_view(self): # The plays view is every play there is: the past week, then every month of the archive.
+        tables = ["players"] + [name for (name,) in self.conn.execute(SELECT_ARCHIVES)]
+        self.conn.execute("DROP VIEW IF EXISTS plays")
+        self.conn.execute("CREATE VIEW plays AS " + " UNION ALL ".join(
+            "SELECT channel, twitchname, switchname, dateplayed FROM {}".format(table) for table in tables))
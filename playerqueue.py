@@ -0,0 +1,181 @@
+import bisect
+from collections import namedtuple
+
+"""
+PlayerQueue is the ordered line of players used by the bot for both the regular queue and the subscriber list.
+Each entry is a Player with separate twitch and switch (in game) names. Alongside the ordered entries, hash indexes
+on both names are kept so that membership checks and lookups by either name are O(1), and removal or positional
+insertion only needs a binary search over the order keys instead of a scan and a full copy of the line.
+version goes up on every change, so anything derived from the line (like the text !queue sends) can tell when it's stale,
+and onchange (if set) is told about every change, which is how the journal saves the line. onresize (if set) is called
+after anyone is added or removed, which is how a Schedule keeps track of whose turn it is. If it's given a NameIndex
+(see nameindex.py), both names of everyone in line are kept in it under source, for mods' fuzzy lookups.
+"""
+
+
+class Player(namedtuple('Player', ['twitch', 'switch'])):
+    __slots__ = ()
+
+    def __str__(self): # Players are shown in chat the same way they always have been, as "twitchname🔥switchname".
+        return "{}🔥{}".format(self.twitch, self.switch)
+
+    @classmethod
+    def parse(cls, player): # Builds a Player out of the older "twitchname🔥switchname" string format.
+        twitch, _, switch = player.partition("🔥")
+        return cls(twitch, switch)
+
+
+class PlayerQueue:
+    def __init__(self, players=(), names=None, source=None):
+        self.version = 0
+        self.names = names
+        self.source = source
+        self.onchange = None  # Called as onchange(op, *args) after every change: ('add', position, twitch, switch), ('extend', players), ('remove', twitch), ('rename', twitch, switch) or ('clear',).
+        self.onresize = None  # Called with no arguments after players are added or removed.
+        self._keys = []  # Sorted order keys, parallel to self._entries. Gaps between keys leave room for positional inserts.
+        self._entries = []
+        self._bytwitch = {}  # twitch name -> order key of that player
+        self._byswitch = {}  # switch name -> {twitch name: None}, since several people can share an in game name (or "NULL")
+        for player in players:
+            self.append(player)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __iter__(self):
+        return iter(self._entries)
+
+    def __getitem__(self, index):
+        return self._entries[index]
+
+    def __str__(self): # Mirrors how the NumPy arrays used to be printed in chat, e.g. ['a🔥b' 'c🔥d'].
+        return "[{}]".format(" ".join("'{}'".format(player) for player in self._entries))
+
+    def has_twitch(self, twitch):
+        return twitch in self._bytwitch
+
+    def has_name(self, name): # True if name matches either a twitch name or a switch name in the line.
+        return name in self._bytwitch or name in self._byswitch
+
+    def get(self, twitch):
+        if twitch not in self._bytwitch:
+            return None
+        return self._entries[self._position(self._bytwitch[twitch])]
+
+    def find(self, name): # Looks a player up by twitch name first, then by switch name (the earliest one in line wins).
+        if name in self._bytwitch:
+            return self.get(name)
+        if name in self._byswitch:
+            return min((self.get(twitch) for twitch in self._byswitch[name]), key=self.index)
+        return None
+
+    def index(self, player): # Accepts a Player or a twitch name and returns its position in line.
+        twitch = player.twitch if isinstance(player, Player) else player
+        if twitch not in self._bytwitch:
+            raise ValueError("{} is not in the queue".format(twitch))
+        return self._position(self._bytwitch[twitch])
+
+    def append(self, player):
+        key = self._keys[-1] + 1.0 if self._keys else 0.0
+        self._add(len(self._entries), key, player)
+
+    def extend(self, players): # Adds several players to the back of the line, telling onchange about them all at once as ('extend', [[twitch, switch], ...]).
+        onchange, self.onchange = self.onchange, None
+        added = []
+        try:
+            for player in players:
+                self.append(player)
+                added.append([player.twitch, player.switch])
+        finally:
+            self.onchange = onchange
+            if onchange and added:
+                onchange('extend', added)
+
+    def insert(self, position, player): # Same semantics as list.insert(), so out of range positions go to either end.
+        if position < 0:
+            position = max(0, len(self._entries) + position)
+        if position >= len(self._entries):
+            return self.append(player)
+        if position == 0:
+            return self._add(0, self._keys[0] - 1.0, player)
+        key = (self._keys[position - 1] + self._keys[position]) / 2
+        if key in (self._keys[position - 1], self._keys[position]): # Ran out of float precision between two neighbours, so space the keys out again.
+            self._keys = [float(i) for i in range(len(self._keys))]
+            self._bytwitch = {entry.twitch: key for entry, key in zip(self._entries, self._keys)}
+            key = position - 0.5
+        self._add(position, key, player)
+
+    def remove(self, twitch): # Removes and returns the player with the given twitch name.
+        if twitch not in self._bytwitch:
+            raise ValueError("{} is not in the queue".format(twitch))
+        position = self._position(self._bytwitch.pop(twitch))
+        player = self._entries.pop(position)
+        del self._keys[position]
+        self._unindex_switch(player)
+        if self.names is not None:
+            self.names.discard(player.twitch, self.source)
+        self.version += 1
+        if self.onchange:
+            self.onchange('remove', twitch)
+        if self.onresize:
+            self.onresize()
+        return player
+
+    def popleft(self):
+        if not self._entries:
+            raise IndexError("pop from an empty queue")
+        return self.remove(self._entries[0].twitch)
+
+    def rename(self, twitch, switch): # Swaps in a new switch name for a player without changing their spot in line.
+        position = self.index(twitch)
+        self._unindex_switch(self._entries[position])
+        self._entries[position] = Player(twitch, switch)
+        self._byswitch.setdefault(switch, {})[twitch] = None
+        if self.names is not None:
+            self.names.add(switch, self.source)
+        self.version += 1
+        if self.onchange:
+            self.onchange('rename', twitch, switch)
+        return self._entries[position]
+
+    def clear(self):
+        if self.names is not None:
+            for player in self._entries:
+                self.names.discard(player.twitch, self.source)
+                self.names.discard(player.switch, self.source)
+        self._keys.clear()
+        self._entries.clear()
+        self._bytwitch.clear()
+        self._byswitch.clear()
+        self.version += 1
+        if self.onchange:
+            self.onchange('clear')
+        if self.onresize:
+            self.onresize()
+
+    def _position(self, key):
+        return bisect.bisect_left(self._keys, key)
+
+    def _add(self, position, key, player):
+        if player.twitch in self._bytwitch:
+            raise ValueError("{} is already in the queue".format(player.twitch))
+        self._keys.insert(position, key)
+        self._entries.insert(position, player)
+        self._bytwitch[player.twitch] = key
+        self._byswitch.setdefault(player.switch, {})[player.twitch] = None
+        if self.names is not None:
+            self.names.add(player.twitch, self.source)
+            self.names.add(player.switch, self.source)
+        self.version += 1
+        if self.onchange:
+            self.onchange('add', position, player.twitch, player.switch)
+        if self.onresize:
+            self.onresize()
+
+    def _unindex_switch(self, player):
+        if self.names is not None:
+            self.names.discard(player.switch, self.source)
+        twitches = self._byswitch[player.switch]
+        del twitches[player.twitch]
+        if not twitches:
+            del self._byswitch[player.switch]
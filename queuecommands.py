@@ -0,0 +1,175 @@
+import asyncio
+
+from twitchio.ext import commands
+
+import botsql
+from playerqueue import Player
+from scheduler import TIERS
+
+"""
+The queue commands: viewers use !join, !drop and !rename, mods move the line along with !next and fix it up with
+!plug, !remove, !changename and !clearqueue, and anyone can look at it with !queue and !arena.
+"""
+
+JOINED = ('sub', 'regular')  # The tiers !join puts people in. !drop and !rename look in these before any other tier someone is in.
+LINES = {'raid': "the raid list", 'vip': "the vip list", 'newsub': "the new subs list", 'sub': "the queue", 'regular': "the queue"}  # How !drop and !rename name each tier.
+
+
+class QueueCommands(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+
+    @commands.command(name='arena')
+    async def arena(self,ctx): # !arena prints the arena ID in the chat so that viewers can join.
+        snapshot = self.bot.actor(ctx.channel).snapshot
+        self.bot.cached(ctx, 'arena', lambda: "{}".format(snapshot.arenaid))
+
+    @commands.command(name='queue')
+    async def queue(self,ctx): # !queue prints the current state of the player list in chat. Once it's too long for one message, !queue 2 shows the next page.
+        state = self.bot.channelstate(ctx.channel)
+        self.bot.showpages(ctx, 'queue', "Queue", lambda: self.bot.actors[state.name].snapshot.queue)
+
+    @commands.command(name='remove')
+    async def remove(self,ctx): # !remove player is a moderator command used to remove someone from playerqueue, as well as sublist.
+        state = self.bot.channelstate(ctx.channel)
+        if ctx.author.is_mod:
+            if ctx.line.text:
+                userplayed = ctx.line.text
+                tier, player = state.schedule.find(userplayed)
+                suggestions = []
+                if player is None:
+                    meant, suggestions = self.bot.resolve(state, userplayed, set(TIERS))
+                    if meant is not None:
+                        tier, player = state.schedule.find(meant)
+                if player is not None:
+                    person = player.twitch
+                    #state.played.add(person)
+                    #botsql.write_to_log(state, player)
+                    state.schedule[tier].remove(person)
+                    self.bot.say(ctx, "{} has been removed from the queue.".format(person))
+                else:
+                    self.bot.say(ctx, self.bot.didyoumean("{} isn't in the queue.".format(userplayed), suggestions))
+            else:
+                self.bot.say(ctx, "@{} who did you want to remove? Type [!remove userplayed] referring to their in game or Twitch name (w/o the [])".format(ctx.author.name))
+
+    @commands.command(name='clearqueue')
+    async def clearqueue(self,ctx): # If necessary, a moderator can clear the entire playerqueue and sublist.
+        state = self.bot.channelstate(ctx.channel)
+        if ctx.author.is_mod:
+            state.schedule.clear()
+            self.bot.say(ctx, "@{} the player queue has been cleared".format(ctx.author.name))
+
+    @commands.command(name='next')
+    async def next(self,ctx): # !next is the command intended for the streamer to use once they're finished with a person. This takes into account subscriber priority as well.
+        state = self.bot.channelstate(ctx.channel)
+        if (state.next_cd==None or state.next_cd.done()) and ctx.author.is_mod:
+            if len(state.schedule) > 0:
+                removed = state.schedule.next()
+                state.played.add(removed.twitch)
+                botsql.write_to_log(state, removed)
+                if len(state.schedule) > 0:
+                    self.bot.say(ctx, "{} is done. {} is up next! The arena info is in !arena, so pls join the room".format(removed, state.schedule.peek()))
+                else:
+                    self.bot.say(ctx, "{} is done. No one else in line!".format(removed))
+            else:
+                self.bot.say(ctx, "No one's in line!")
+            state.next_cd = asyncio.create_task(self.bot.cooldown())
+
+    @commands.command(name='join')
+    async def join(self,ctx): # !join ingamename is the command for users to join the queue.
+        state = self.bot.channelstate(ctx.channel)
+        tier = 'sub' if state.toggles['subpriority'] and ctx.author.is_subscriber else 'regular' # With subpriority on, subs wait in their own tier that goes ahead of everyone else.
+        if not state.toggles['open']:
+            self.bot.ack(ctx, "@{} the queue is closed atm. Sorry!".format(ctx.author.name), "the queue is closed atm. Sorry!")
+        elif state.toggles['variety'] and self.bot.playedrecently(state, ctx.author.name.lower()):
+            self.bot.ack(ctx, "@{} you already played recently. Sorry!".format(ctx.author.name), "you already played recently. Sorry!")
+        elif not state.toggles['runback'] and ctx.author.name.lower() in state.played:
+            self.bot.ack(ctx, "@{} you already played today. Sorry!".format(ctx.author.name), "you already played today. Sorry!")
+        elif state.toggles['subsonlymode'] and not ctx.author.is_subscriber:
+            if state.toggles['verbose']:
+                self.bot.ack(ctx, "@{} the queue is subs only rn. Sorry!".format(ctx.author.name), "the queue is subs only rn. Sorry!")
+            else:
+                print("No verbose lol")
+        elif state.toggles['limit'] and len(state.schedule[tier]) >= 7:
+            if state.toggles['verbose']:
+                self.bot.ack(ctx, "@{} The queue is full. Try joining when Intro hits !next".format(ctx.author.name), "The queue is full. Try joining when Intro hits !next")
+            else:
+                print("No verbose lol")
+        elif state.schedule.tierof(ctx.author.name.lower(), JOINED) is not None:
+            self.bot.ack(ctx, "@{} you're already in the queue".format(ctx.author.name), "you're already in the queue")
+        else:
+            if ctx.line.text:
+                state.schedule[tier].append(Player(ctx.author.name.lower(), ctx.line.text))
+                self.bot.outbox.ack(ctx.channel, "@{} I've added you to the queue! Your in game name is {}".format(ctx.author.name, ctx.line.text),
+                                "added to the queue!", "@{} ({})".format(ctx.author.name, ctx.line.text))
+            else:
+                self.bot.say(ctx, "@{} you didn't provide enough arguments! It's [!join in_game_name] without the [ ]".format(ctx.author.name))
+
+    @commands.command(name='drop')
+    async def drop(self,ctx): # If a user can no longer play, they can type !drop to remove themselves from the queue.
+        state = self.bot.channelstate(ctx.channel)
+        tier = state.schedule.tierof(ctx.author.name.lower(), JOINED) or state.schedule.tierof(ctx.author.name.lower())
+        if tier is not None:
+            state.schedule[tier].remove(ctx.author.name.lower())
+            self.bot.ack(ctx, "@{} you have dropped from {}".format(ctx.author.name, LINES[tier]), "you have dropped from {}".format(LINES[tier]))
+        else:
+            self.bot.ack(ctx, "@{} you aren't in the queue".format(ctx.author.name), "you aren't in the queue")
+
+    @commands.command(name='rename')
+    async def rename(self,ctx):  # If a user input their name wrong when joining, they can use !changename newingamename to fix the mishap.
+            state = self.bot.channelstate(ctx.channel)
+            tier = state.schedule.tierof(ctx.author.name.lower(), JOINED) or state.schedule.tierof(ctx.author.name.lower())
+            if tier is not None:
+                if not ctx.line.text:
+                    self.bot.say(ctx, "@{} not enough positional arguments. It's !rename newingamename".format(ctx.author.name))
+                else:
+                    state.schedule[tier].rename(ctx.author.name.lower(), ctx.line.text)
+                    self.bot.say(ctx, "@{} I've changed your in game name in {} to {}".format(ctx.author.name, LINES[tier], ctx.line.text))
+            else:
+                self.bot.say(ctx, "@{} you're not in the queue".format(ctx.author.name))
+
+    @commands.command(name='changename')
+    async def changename(self,ctx): # If a user input their name wrong when joining, a moderator can use !changename twitchname newingamename to fix the mishap.
+        state = self.bot.channelstate(ctx.channel)
+        if ctx.author.is_mod:
+            twitch = ctx.line.target.lstrip("@")
+            tier = state.schedule.tierof(twitch)
+            suggestions = []
+            if tier is None and twitch:
+                meant, suggestions = self.bot.resolve(state, twitch, set(TIERS))
+                if meant is not None:
+                    tier, player = state.schedule.find(meant)
+                    twitch = player.twitch
+            if tier is not None:
+                if not ctx.line.rest:
+                    self.bot.say(ctx, "@{} not enough positional arguments. It's !changename twitchname newingamename".format(ctx.author.name))
+                else:
+                    state.schedule[tier].rename(twitch, ctx.line.rest)
+                    self.bot.say(ctx, "@{} I've changed @{}'s in game name to {}".format(ctx.author.name, twitch, ctx.line.rest))
+            else:
+                self.bot.say(ctx, self.bot.didyoumean("@{} I couldn't find this user in the queue.".format(ctx.author.name), suggestions))
+
+    @commands.command(name='plug')
+    async def plug(self,ctx): # !plug twitchname switchname is a moderator only command to insert someone into the queue.
+        state = self.bot.channelstate(ctx.channel)
+        if ctx.author.is_mod:
+            if ctx.line.text:
+                if state.playerqueue.has_twitch(ctx.line.target):
+                    self.bot.say(ctx, "{} is already in the queue".format(ctx.line.words[0]))
+                elif not ctx.line.rest:
+                    self.bot.say(ctx, "@{} not enough positional arguments. It's [!plug twitchname switchname position] without the [ ] (position is optional). If no information is provided on Twitch name, use 'NULL' instead".format(ctx.author.name))
+                elif ctx.line.position is None:
+                    state.playerqueue.append(Player(ctx.line.target, ctx.line.rest))
+                    state.played.discard(state.playerqueue[-1].twitch)
+                    self.bot.say(ctx, "{} has been added to the queue at the back".format(state.playerqueue[-1]))
+                else:
+                    state.playerqueue.insert(ctx.line.position, Player(ctx.line.target, ctx.line.name))
+                    if ctx.line.target in state.played:
+                        state.played.discard(ctx.line.target)
+                    self.bot.say(ctx, "{} has been added to the queue at position {}".format(ctx.line.name, ctx.line.position))
+            else:
+                self.bot.say(ctx, "@{} not enough positional arguments. It's [!plug twitchname switchname position] without the [ ] (position is optional). If no information is provided on Twitch name, use 'NULL' instead".format(ctx.author.name))
+
+
+def prepare(bot): # Called by the bot's load_module() and reload_module().
+    bot.add_cog(QueueCommands(bot))
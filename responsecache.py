@@ -0,0 +1,38 @@
+import time
+from collections import OrderedDict
+
+"""
+ResponseCache keeps the answers to read-only commands like !queue and !arena, so that viewers spamming them don't make the
+bot format the same list over and over. An answer is stored along with the version of the channel state it was built
+from, and is only rebuilt once something has changed. On top of that, the same answer isn't sent again in a channel
+within a few seconds of the last time, since everyone can still see it in chat.
+"""
+
+
+class ResponseCache:
+    def __init__(self, window=10, maxsize=1024):
+        self.window = window  # Seconds during which the same answer won't be sent twice in a channel.
+        self.maxsize = maxsize
+        self.rendered = OrderedDict()  # (channel, command, key) -> (version, text), least recently used first
+        self.lastsent = OrderedDict()  # (channel, command, key) -> (version, time it was last sent)
+
+    def get(self, channel, command, key, version, render): # Returns what render() built for this version, or None if the same answer was sent moments ago.
+        cachekey = (channel, command, key)
+        cached = self.rendered.get(cachekey)
+        if cached is None or cached[0] != version:
+            cached = (version, render())
+            self.rendered[cachekey] = cached
+        self.rendered.move_to_end(cachekey)
+        now = time.monotonic()
+        sent = self.lastsent.get(cachekey)
+        if sent is not None and sent[0] == version and now - sent[1] < self.window:
+            return None
+        self.lastsent[cachekey] = (version, now)
+        self.lastsent.move_to_end(cachekey)
+        for entries in (self.rendered, self.lastsent):
+            while len(entries) > self.maxsize:
+                entries.popitem(last=False)
+        return cached[1]
+
+    def clear(self): # Forgets every answer built so far, e.g. once the code that builds them has been reloaded.
+        self.rendered.clear()
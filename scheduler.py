@@ -0,0 +1,160 @@
+from playerqueue import PlayerQueue
+
+"""
+Schedule decides who plays next when there's more than one line. Each priority tier is its own PlayerQueue, from the
+highest priority down: raids, VIPs, new subs (the people offered a spot by the newsubperk), subs (when the subpriority
+toggle is on) and everyone else. Whoever is at the front of the tier that's up is the person currently playing, so a new
+sub arriving mid match doesn't bump them; the tiers are only looked at again when !next is hit. If the tier that's up
+runs out some other way (the person playing drops, or !next emptied every line), the next tier is picked as soon as
+there's someone to pick, so whoever is shown as playing then stays put too instead of being bumped by the next !join.
+
+A tier's ratio is how many of its players can go in a row while a lower tier has people waiting. None means the tier
+always goes first, which is how new subs have always been treated. With new subs at 2 and regulars waiting, it goes
+new sub, new sub, regular, new sub, new sub, regular and so on. Picking the next tier only looks at the handful of tiers,
+and taking someone off the front of one is a binary search in its PlayerQueue, so !next costs the same no matter how
+many gift subs pile up. peek() is just as cheap, and upcoming() plays the rotation forward to show the whole order.
+playorder() does the playing forward on its own, so it can also be run on frozen copies of the tiers (see actor.py), and
+once only one tier has anyone left it just copies the rest of that tier instead of choosing a tier for each of them.
+
+version goes up on every turn or ratio change, and onchange (if set) is told about them as ('turn', tier, streaks) or
+('ratio', tier, ratio), which is how the journal saves them alongside the tiers themselves.
+"""
+
+TIERS = ('raid', 'vip', 'newsub', 'sub', 'regular')  # Highest priority first.
+RATIOS = {'raid': None, 'vip': 1, 'newsub': None, 'sub': 1, 'regular': None}
+
+
+def playorder(tiers, ratios, streaks, up, limit=None): # The order people in tiers will play in, starting with whoever is playing now. tiers only has to have len() and indexing for each tier.
+    taken = dict.fromkeys(TIERS, 0)
+    streaks = dict(streaks)
+    order = []
+    total = sum([len(tiers[tier]) for tier in TIERS])
+    total = total if limit is None else min(limit, total)
+    while len(order) < total:
+        waiting = [tier for tier in TIERS if len(tiers[tier]) > taken[tier]]
+        if len(waiting) == 1: # Everyone left is in one tier, so they go in its order.
+            line = tiers[waiting[0]]
+            order.extend(line[taken[waiting[0]]:taken[waiting[0]] + total - len(order)])
+            break
+        tier = up if taken[up] < len(tiers[up]) else choose(tiers, ratios, streaks, taken)
+        order.append(tiers[tier][taken[tier]])
+        taken[tier] += 1
+        following = choose(tiers, ratios, streaks, taken)
+        if following is not None:
+            up = following
+            take(streaks, following)
+    return order
+
+
+def choose(tiers, ratios, streaks, taken=None): # The highest tier with people waiting that hasn't used up its ratio, or None if everyone's played.
+    waiting = [tier for tier in TIERS if len(tiers[tier]) > (taken[tier] if taken else 0)]
+    for i, tier in enumerate(waiting):
+        ratio = ratios[tier]
+        if ratio is None or streaks[tier] < ratio or i == len(waiting) - 1:
+            return tier
+    return None
+
+
+def take(streaks, tier): # Counts a turn for tier, and starts the count over for every tier above it since they just waited.
+    streaks[tier] += 1
+    for higher in TIERS[:TIERS.index(tier)]:
+        streaks[higher] = 0
+
+
+class Schedule:
+    def __init__(self, ratios=None, names=None):
+        self.tiers = {tier: PlayerQueue(names=names, source=tier) for tier in TIERS}  # names, if given, is a NameIndex every tier keeps its names in.
+        self.ratios = dict(RATIOS, **(ratios or {}))
+        self.streaks = dict.fromkeys(TIERS, 0)  # How many turns each tier has had in a row since a lower tier last got one.
+        self.up = 'regular'  # The tier the person currently playing came from. Only empty when every tier is.
+        self.onchange = None
+        self._version = 0
+        self._turning = False  # Set while next() picks the following tier itself.
+        for line in self.tiers.values():
+            line.onresize = self._settle
+
+    def __getitem__(self, tier):
+        return self.tiers[tier]
+
+    def __len__(self):
+        return sum([len(line) for line in self.tiers.values()])
+
+    def __str__(self): # Shown in chat in the same format as a single PlayerQueue.
+        return "[{}]".format(" ".join("'{}'".format(player) for player in self.upcoming()))
+
+    @property
+    def version(self):
+        return self._version + sum([line.version for line in self.tiers.values()])
+
+    def tierof(self, twitch, tiers=TIERS): # The highest of tiers someone is waiting in, or None if they aren't in any of them.
+        for tier in tiers:
+            if self.tiers[tier].has_twitch(twitch):
+                return tier
+        return None
+
+    def find(self, name): # Looks a player up by twitch name in every tier first, then by switch name. Returns (tier, player) or (None, None).
+        tier = self.tierof(name)
+        if tier is not None:
+            return tier, self.tiers[tier].get(name)
+        for tier in TIERS:
+            if self.tiers[tier].has_name(name):
+                return tier, self.tiers[tier].find(name)
+        return None, None
+
+    def peek(self): # Who's playing right now, or None if every tier is empty.
+        tier = self._current()
+        return self.tiers[tier][0] if tier is not None else None
+
+    def next(self): # Takes the person currently playing out of their tier, works out whose turn it is and returns who was taken out.
+        tier = self._current()
+        if tier is None:
+            raise IndexError("next from an empty schedule")
+        self._turning = True
+        try:
+            player = self.tiers[tier].popleft()
+        finally:
+            self._turning = False
+        following = choose(self.tiers, self.ratios, self.streaks)
+        if following is not None:
+            self.up = following
+            take(self.streaks, following)
+            self._changed('turn', following, dict(self.streaks))
+        return player
+
+    def upcoming(self, limit=None): # The order people will play in if nothing changes, starting with whoever is playing now.
+        return playorder(self.tiers, self.ratios, self.streaks, self.up, limit)
+
+    def setratio(self, tier, ratio):
+        if tier not in self.tiers:
+            raise ValueError("{} is not a tier".format(tier))
+        self.ratios[tier] = ratio
+        self._changed('ratio', tier, ratio)
+
+    def restore(self, up, streaks): # Puts back whose turn it is, e.g. when the journal is replayed.
+        self.up = up
+        self.streaks.update(streaks)
+        self._changed('turn', up, dict(self.streaks))
+        self._settle()
+
+    def clear(self):
+        for line in self.tiers.values():
+            line.clear()
+        self.restore('regular', dict.fromkeys(TIERS, 0))
+
+    def _settle(self): # Moves up off an empty tier onto the one whose turn it is now, so that person isn't bumped later on by someone joining the old one.
+        if self._turning or self.tiers[self.up]:
+            return
+        following = choose(self.tiers, self.ratios, self.streaks)
+        if following is not None:
+            self.up = following
+            self._changed('turn', following, dict(self.streaks))
+
+    def _current(self):
+        if self.tiers[self.up]:
+            return self.up
+        return choose(self.tiers, self.ratios, self.streaks)
+
+    def _changed(self, op, *args):
+        self._version += 1
+        if self.onchange:
+            self.onchange(op, *args)
@@ -0,0 +1,93 @@
+from twitchio.ext import commands
+
+from playerqueue import Player
+
+"""
+The new sub list commands: new subs !optin with their in game name or !optout, and mods manage the list with !plugsub,
+!removesub and !clearsubs.
+"""
+
+
+class SubCommands(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+
+    @commands.command(name='amiasub')
+    async def amiasub(self,ctx):
+        self.bot.say(ctx, "{}".format(ctx.author.is_subscriber))
+
+    @commands.command(name='optin')
+    async def optin(self,ctx): # !optin in_game_name is to be used by the new subscriber, but only intended if they were propmpted to do so from event_usernotice_subscription()
+        state = self.bot.channelstate(ctx.channel)
+        if state.sublist.has_twitch(ctx.author.name.lower()):
+            if ctx.line.text: # The user needs to provide their in game name so that the streamer can verify that it's actually them when they join his lobby.
+                state.sublist.rename(ctx.author.name.lower(), ctx.line.text)
+                self.bot.say(ctx, "@{} you've been registered in the new subs list! The arena ID is {}".format(ctx.author.name, state.arenaid))
+            else:
+                self.bot.say(ctx, "@{} you need to provide your in game name too! Type [!optin in_game_name]".format(ctx.author.name))
+        else:
+            self.bot.say(ctx, "@{} you're not on the new sub list rn.".format(ctx.author.name))
+
+    @commands.command(name='optout')
+    async def optout(self,ctx): # !optout is also intended for the user to opt out, but only if they were prompted to do so from event_usernotice_subscription().
+        state = self.bot.channelstate(ctx.channel)
+        if state.sublist.has_twitch(ctx.author.name.lower()):
+            state.sublist.remove(ctx.author.name.lower())
+            self.bot.say(ctx, "@{} you've opted out of the new sub list.".format(ctx.author.name))
+        else:
+            self.bot.say(ctx, "@{} you're not on the new sub list rn.".format(ctx.author.name))
+
+    @commands.command(name='showsubs')
+    async def showsubs(self,ctx): # !showsubs prints the state of the subscriber list in chat.
+        state = self.bot.channelstate(ctx.channel)
+        self.bot.showpages(ctx, 'showsubs', "New subs", lambda: self.bot.actors[state.name].snapshot.subs)
+
+    @commands.command(name='removesub')
+    async def removesub(self,ctx): # !removesub player is a moderator only command to remove a subscriber from the sublist specifically.
+        state = self.bot.channelstate(ctx.channel)
+        if ctx.author.is_mod:
+            if ctx.line.text:
+                userplayed = ctx.line.text
+                suggestions = []
+                if not state.sublist.has_name(userplayed):
+                    meant, suggestions = self.bot.resolve(state, userplayed, {'newsub'})
+                    userplayed = meant or userplayed
+                if state.sublist.has_name(userplayed):
+                    state.sublist.remove(state.sublist.find(userplayed).twitch)
+                    self.bot.say(ctx, "{} has been removed from the sublist.".format(userplayed))
+                else:
+                    self.bot.say(ctx, self.bot.didyoumean("{} isn't in the sublist.".format(userplayed), suggestions))
+            else:
+                self.bot.say(ctx, "@{} who did you want to remove? Type [!removesub persontoremove] referring to their in game or Twitch name (w/o the [])".format(ctx.author.name))
+
+    @commands.command(name='clearsubs')
+    async def clearsubs(self,ctx): # !clearsubs is used to clear the subscriber list specifically.
+        state = self.bot.channelstate(ctx.channel)
+        if ctx.author.is_mod:
+            state.sublist.clear()
+            self.bot.say(ctx, "@{} the sub list has been cleared".format(ctx.author.name))
+
+    @commands.command(name='plugsub')
+    async def plugsub(self,ctx):
+        state = self.bot.channelstate(ctx.channel)
+        if ctx.author.is_mod: # !plugsub twitchname switchname is a moderator only command used to plug someone into the sublist.
+            if ctx.line.text:
+                if state.sublist.has_twitch(ctx.line.target):
+                    self.bot.say(ctx, "{} is already in the queue".format(ctx.line.words[0]))
+                elif not ctx.line.rest:
+                    self.bot.say(ctx, "@{} not enough positional arguments. It's [!plugsub twitchname switchname position] without the [ ] (position is optional). If no information is provided on Twitch name, use 'NULL' instead".format(ctx.author.name))
+                elif ctx.line.position is None:
+                    state.sublist.append(Player(ctx.line.target, ctx.line.rest))
+                    state.played.discard(state.sublist[-1].twitch)
+                    self.bot.say(ctx, "{} has been added to the sublist at the back".format(state.sublist[-1]))
+                else:
+                    state.sublist.insert(ctx.line.position, Player(ctx.line.target, ctx.line.name))
+                    if ctx.line.target in state.played:
+                        state.played.discard(ctx.line.target)
+                    self.bot.say(ctx, "{} has been added to the sublist at position {}".format(ctx.line.name, ctx.line.position))
+            else:
+                self.bot.say(ctx, "@{} not enough positional arguments. It's [!plugsub twitchname switchname position] without the [ ] (position is optional). If no information is provided on Twitch name, use 'NULL' instead".format(ctx.author.name))
+
+
+def prepare(bot): # Called by the bot's load_module() and reload_module().
+    bot.add_cog(SubCommands(bot))
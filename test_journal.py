@@ -0,0 +1,118 @@
+"""
+Tests for Journal: that a channel's state rebuilt from its snapshot and journal is the state that was saved, with or
+without a compaction in between, and when the bot died partway through writing. Run them with python -m pytest.
+"""
+
+import os
+
+import pytest
+
+from channelstate import ChannelState
+from journal import Journal
+from persistence import WriteBehind
+from playerqueue import Player
+
+
+@pytest.fixture
+def writer(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path) # The journal and snapshot files are written to the current directory.
+    writer = WriteBehind(str(tmp_path / "playerlog"), str(tmp_path / "log.csv"))
+    writer.start()
+    yield writer
+    writer.close()
+
+
+def attached(writer, compactevery=1000):
+    state = ChannelState("chan")
+    journal = Journal(writer, "chan", compactevery)
+    journal.attach(state)
+    return state, journal
+
+
+def restored(writer):
+    state, journal = attached(writer)
+    journal.replay()
+    return state
+
+
+def saved(state): # Everything the journal is meant to bring back.
+    schedule = state.schedule
+    return {
+        'tiers': {tier: list(line) for tier, line in schedule.tiers.items()},
+        'order': schedule.upcoming(),
+        'up': schedule.up,
+        'streaks': dict(schedule.streaks),
+        'ratios': dict(schedule.ratios),
+        'played': set(state.played),
+        'toggles': dict(state.toggles),
+        'cooldowns': {name: limit and tuple(limit) for name, limit in state.cooldowns.items()}, # They come back from JSON as lists, which work the same.
+        'arena': state.arenaid,
+    }
+
+
+def battle(state): # A bit of everything a stream does to the state.
+    schedule = state.schedule
+    state.toggles['open'] = True
+    for name in ("r1", "r2", "r3"):
+        schedule['regular'].append(Player(name, name + "ign"))
+    schedule['newsub'].extend([Player("n1", "NULL"), Player("n2", "NULL")])
+    schedule['sub'].insert(0, Player("s1", "s1ign"))
+    schedule.setratio('newsub', 2)
+    state.played.add(schedule.next().twitch)
+    schedule['newsub'].rename("n2", "n2ign")
+    schedule['regular'].remove("r3")
+    state.played.add(schedule.next().twitch)
+    state.arenaid = "ABC12"
+    state.cooldowns['join'] = [2, 30]
+    state.played.discard("r1")
+
+
+def test_replay_rebuilds_the_state(writer):
+    state, journal = attached(writer)
+    battle(state)
+    writer.flush()
+    assert saved(restored(writer)) == saved(state)
+
+
+def test_replay_after_compacting(writer):
+    state, journal = attached(writer, compactevery=4)
+    battle(state)
+    writer.flush()
+    assert os.path.exists("snapshot-chan.json")
+    assert len(open("journal-chan.jsonl", encoding='utf-8').readlines()) < journal.seq
+    assert saved(restored(writer)) == saved(state)
+
+
+def test_replay_skips_what_the_snapshot_already_has(writer): # The bot died after writing a snapshot but before starting the journal over.
+    state, journal = attached(writer)
+    battle(state)
+    writer.flush()
+    with open("journal-chan.jsonl", encoding='utf-8') as f:
+        before = f.read()
+    journal.compact()
+    state.schedule['regular'].append(Player("late", "late"))
+    writer.flush()
+    with open("journal-chan.jsonl", encoding='utf-8') as f:
+        after = f.read()
+    with open("journal-chan.jsonl", 'w', encoding='utf-8') as f:
+        f.write(before + after)
+    assert saved(restored(writer)) == saved(state)
+
+
+def test_replay_ignores_a_cut_off_last_line(writer):
+    state, journal = attached(writer)
+    battle(state)
+    writer.flush()
+    with open("journal-chan.jsonl", 'a', encoding='utf-8') as f:
+        f.write('[999, "queue", "add", 0, "hal')
+    assert saved(restored(writer)) == saved(state)
+
+
+def test_replaying_doesnt_journal_anything(writer):
+    state, journal = attached(writer)
+    battle(state)
+    writer.flush()
+    size = os.path.getsize("journal-chan.jsonl")
+    restored(writer)
+    writer.flush()
+    assert os.path.getsize("journal-chan.jsonl") == size
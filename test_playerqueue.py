@@ -0,0 +1,101 @@
+"""
+Tests for PlayerQueue: keeping its order, its name indexes and the NameIndex it's given in step as people are added,
+removed and renamed. Run them with python -m pytest.
+"""
+
+import pytest
+
+from nameindex import NameIndex
+from playerqueue import Player, PlayerQueue
+
+
+def players(queue):
+    return [player.twitch for player in queue]
+
+
+def test_insert_matches_list_insert():
+    queue, model = PlayerQueue(), []
+    for i, position in enumerate([0, 0, 1, 5, -1, -10, 2, 3, 99, 1]):
+        queue.insert(position, Player("p{}".format(i), "s{}".format(i)))
+        model.insert(position, "p{}".format(i))
+        assert players(queue) == model
+    assert [queue.index(twitch) for twitch in model] == list(range(len(model)))
+
+
+def test_insert_into_the_same_gap_many_times(): # Runs out of float precision between two keys, so they have to be spaced out again.
+    queue = PlayerQueue([Player("first", "a"), Player("last", "b")])
+    model = ["first", "last"]
+    for i in range(200):
+        queue.insert(1, Player("p{}".format(i), "x"))
+        model.insert(1, "p{}".format(i))
+    assert players(queue) == model
+    assert queue.index("p0") == 200
+    assert queue.get("last") == Player("last", "b")
+
+
+def test_remove_and_lookups():
+    queue = PlayerQueue([Player("a", "same"), Player("b", "same"), Player("c", "other")])
+    assert queue.find("same") == Player("a", "same") # The earliest one in line wins.
+    assert queue.remove("a") == Player("a", "same")
+    assert players(queue) == ["b", "c"]
+    assert not queue.has_twitch("a")
+    assert queue.find("same") == Player("b", "same")
+    queue.remove("b")
+    assert not queue.has_name("same")
+    assert queue.popleft() == Player("c", "other")
+    assert len(queue) == 0
+    with pytest.raises(ValueError):
+        queue.remove("a")
+    with pytest.raises(IndexError):
+        queue.popleft()
+
+
+def test_rename_keeps_the_spot_in_line():
+    queue = PlayerQueue([Player("a", "x"), Player("b", "y"), Player("c", "z")])
+    assert queue.rename("b", "new") == Player("b", "new")
+    assert players(queue) == ["a", "b", "c"]
+    assert queue.find("new") == Player("b", "new")
+    assert not queue.has_name("y")
+    with pytest.raises(ValueError):
+        queue.rename("nobody", "x")
+
+
+def test_adding_someone_twice_raises_and_changes_nothing():
+    queue = PlayerQueue([Player("a", "x"), Player("b", "y")])
+    version = queue.version
+    with pytest.raises(ValueError):
+        queue.append(Player("a", "other"))
+    with pytest.raises(ValueError):
+        queue.insert(0, Player("b", "other"))
+    assert players(queue) == ["a", "b"]
+    assert queue.find("other") is None
+    assert queue.version == version
+
+
+def test_onchange_and_onresize():
+    queue = PlayerQueue()
+    changes, resizes = [], []
+    queue.onchange = lambda op, *args: changes.append((op,) + args)
+    queue.onresize = lambda: resizes.append(len(queue))
+    queue.append(Player("a", "x"))
+    queue.extend([Player("b", "y"), Player("c", "z")])
+    queue.rename("b", "w")
+    queue.remove("a")
+    queue.clear()
+    assert changes == [('add', 0, "a", "x"), ('extend', [["b", "y"], ["c", "z"]]), ('rename', "b", "w"), ('remove', "a"), ('clear',)]
+    assert resizes == [1, 2, 3, 2, 0] # Renaming doesn't change who's in line.
+
+
+def test_names_are_kept_in_the_name_index():
+    names = NameIndex()
+    queue = PlayerQueue(names=names, source='regular')
+    queue.append(Player("alice", "ally"))
+    queue.append(Player("bob", "bobby"))
+    assert names.same("Alice") == ["alice"]
+    queue.rename("bob", "robert")
+    assert names.same("bobby") == []
+    assert names.same("robert") == ["robert"]
+    queue.remove("alice")
+    assert names.same("alice") == [] and names.same("ally") == []
+    queue.clear()
+    assert len(names) == 0
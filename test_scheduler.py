@@ -0,0 +1,108 @@
+"""
+Tests for Schedule: whose turn it is across the priority tiers, how ratios share turns out, and that upcoming() agrees
+with what next() actually does. Run them with python -m pytest.
+"""
+
+import pytest
+
+from playerqueue import Player
+from scheduler import TIERS, Schedule
+
+
+def join(schedule, tier, *names):
+    for name in names:
+        schedule[tier].append(Player(name, name))
+
+
+def play(schedule): # Hits next() until everyone has played, and returns who played in order.
+    order = []
+    while len(schedule):
+        order.append(schedule.peek().twitch)
+        schedule.next()
+    return order
+
+
+def test_a_new_sub_waits_for_whoever_is_playing():
+    schedule = Schedule()
+    join(schedule, 'regular', "r1", "r2")
+    join(schedule, 'newsub', "n1")
+    assert schedule.peek().twitch == "r1"
+    assert schedule.next() == Player("r1", "r1")
+    assert play(schedule) == ["n1", "r2"]
+
+
+def test_ratios_take_turns():
+    schedule = Schedule()
+    schedule.setratio('newsub', 2)
+    join(schedule, 'regular', "r1", "r2", "r3")
+    join(schedule, 'newsub', "n1", "n2", "n3", "n4")
+    assert play(schedule) == ["r1", "n1", "n2", "r2", "n3", "n4", "r3"]
+
+
+def test_subs_alternate_with_regulars():
+    schedule = Schedule()
+    join(schedule, 'regular', "r1", "r2", "r3")
+    join(schedule, 'sub', "s1", "s2", "s3")
+    assert play(schedule) == ["r1", "s1", "r2", "s2", "r3", "s3"]
+
+
+def test_upcoming_matches_next():
+    schedule = Schedule()
+    schedule.setratio('newsub', 2)
+    join(schedule, 'regular', "r1", "r2", "r3", "r4")
+    join(schedule, 'sub', "s1", "s2")
+    join(schedule, 'newsub', "n1", "n2", "n3")
+    join(schedule, 'vip', "v1")
+    upcoming = [player.twitch for player in schedule.upcoming()]
+    assert [player.twitch for player in schedule.upcoming(limit=3)] == upcoming[:3]
+    assert play(schedule) == upcoming
+
+
+def test_whoever_is_up_after_the_line_empties_keeps_their_turn(): # !join aa, !next, a new sub, !join rr, !next.
+    schedule = Schedule()
+    join(schedule, 'regular', "aa")
+    schedule.next()
+    join(schedule, 'newsub', "subby")
+    join(schedule, 'regular', "rr")
+    assert schedule.peek().twitch == "subby"
+    assert schedule.next().twitch == "subby"
+    assert schedule.peek().twitch == "rr"
+
+
+def test_whoever_is_up_after_the_player_drops_keeps_their_turn():
+    schedule = Schedule()
+    join(schedule, 'regular', "dd")
+    join(schedule, 'newsub', "sub")
+    schedule['regular'].remove("dd")
+    join(schedule, 'regular', "ee")
+    assert play(schedule) == ["sub", "ee"]
+
+
+def test_tierof_and_find():
+    schedule = Schedule()
+    join(schedule, 'newsub', "both")
+    schedule['regular'].append(Player("both", "ign"))
+    assert schedule.tierof("both") == 'newsub'
+    assert schedule.tierof("both", ('sub', 'regular')) == 'regular'
+    assert schedule.tierof("nobody") is None
+    assert schedule.find("ign") == ('regular', Player("both", "ign"))
+    assert schedule.find("nobody") == (None, None)
+
+
+def test_turns_and_ratios_are_reported():
+    schedule = Schedule()
+    changes = []
+    schedule.onchange = lambda op, *args: changes.append((op,) + args)
+    join(schedule, 'regular', "r1", "r2")
+    schedule.setratio('sub', None)
+    schedule.next()
+    assert changes == [('ratio', 'sub', None), ('turn', 'regular', dict(dict.fromkeys(TIERS, 0), regular=1))]
+    with pytest.raises(ValueError):
+        schedule.setratio('nobody', 1)
+
+
+def test_next_on_an_empty_schedule():
+    schedule = Schedule()
+    assert schedule.peek() is None
+    with pytest.raises(IndexError):
+        schedule.next()
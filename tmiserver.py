@@ -0,0 +1,240 @@
+import asyncio
+import itertools
+import socket
+import time
+from collections import deque
+
+from aiohttp import WSMsgType, web
+
+from outbox import MAXLENGTH
+
+"""
+TMIServer is a stand-in for Twitch's chat server (TMI) that runs on this machine, so the bot can be tested end to end
+without a live channel. twitchio connects to it over a websocket instead of irc-ws.chat.twitch.tv (point
+twitchio.websocket.HOST at url), and from parsing the IRC lines to sending the replies everything goes through the same
+code it does on stream. Only the parts of TMI the bot uses are there:
+    logging in (any PASS and NICK work) and CAP REQ, answered with ACKs and the usual welcome numerics
+    JOIN, answered with NAMES and a USERSTATE that makes the bot a moderator of the channel unless botismod is False
+    PRIVMSG and USERNOTICE from viewers, with the tags twitchio reads (badges, mod, subscriber, display-name, msg-id...),
+    and a membership JOIN the first time each viewer talks if the bot asked for twitch.tv/membership
+    PING and PONG, which ping() uses to measure how far behind the bot is in reading chat
+    Twitch's limits on the bot's own messages: 20 per 30 seconds in a channel (100 where it's a moderator), no sending
+    the same message twice within 30 seconds unless it's a moderator, and nothing over 500 characters. Messages past
+    the limits are dropped, with the NOTICE Twitch sends for them, and counted in dropped.
+
+Lines for a connection are collected and sent together in one websocket frame once the one before it has gone out, so
+a crowd of thousands costs the server a few frames per tick rather than one per message. See e2etest.py for the crowd
+that talks through it.
+"""
+
+WINDOW = 30.0  # Seconds Twitch counts the bot's messages over.
+LIMIT = 20  # How many messages the bot can send in a channel per WINDOW.
+MODLIMIT = 100  # The same in channels where the bot is a moderator.
+NOTICES = {
+    'msg_ratelimit': "Your message was not sent because you are sending messages too quickly.",
+    'msg_duplicate': "Your message was not sent because it is identical to the previous one you sent, less than 30 seconds ago.",
+}
+
+
+def escape(value): # Tag values can't have spaces, semicolons or backslashes in them, so they're escaped the IRCv3 way.
+    return str(value).replace("\\", "\\\\").replace(";", "\\:").replace(" ", "\\s").replace("\r", "\\r").replace("\n", "\\n")
+
+
+def tagged(tags, line):
+    return "@{} {}".format(";".join("{}={}".format(key, escape(value)) for key, value in tags.items()), line)
+
+
+class Connection:
+    def __init__(self, ws):
+        self.ws = ws
+        self.nick = None
+        self.caps = set()
+        self.channels = set()
+        self.lines = []  # Waiting to go out in the next frame.
+        self.waiting = asyncio.Event()
+        self.pings = deque()  # (future, when it was sent) for each PING that hasn't had its PONG yet
+        self.task = asyncio.create_task(self.pump())
+
+    def send(self, line):
+        self.lines.append(line)
+        self.waiting.set()
+
+    async def pump(self): # Sends everything that piled up while the last frame was going out, all in one frame.
+        while not self.ws.closed:
+            await self.waiting.wait()
+            self.waiting.clear()
+            lines, self.lines = self.lines, []
+            await self.ws.send_str("\r\n".join(lines) + "\r\n")
+
+
+class TMIServer:
+    def __init__(self, botismod=True, window=WINDOW):
+        self.botismod = botismod
+        self.window = window
+        self.url = None
+        self.runner = None
+        self.connections = set()
+        self.joined = {}  # channel -> asyncio.Event that's set once the bot has joined it
+        self.members = {}  # channel -> viewers a membership JOIN has been sent for
+        self.sent = {}  # channel -> when each of the bot's messages in the last window got through
+        self.last = {}  # channel -> (text, when) of the last message the bot sent there, for the duplicate rule
+        self.ids = {}  # user or channel -> the made up ID Twitch would tag them with
+        self.messageids = itertools.count(1)
+        self.accepted = 0
+        self.dropped = {}  # reason -> how many of the bot's messages were dropped for it
+        self.onsend = None  # Called with (channel, text) for every message of the bot's that got through.
+
+    async def start(self, host="127.0.0.1", port=0): # Starts listening, on any free port by default, and returns the URL for twitchio.websocket.HOST.
+        app = web.Application()
+        app.router.add_get("/", self._handle)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        sock = socket.socket()
+        sock.bind((host, port))
+        await web.SockSite(self.runner, sock).start()
+        self.url = "ws://{}:{}".format(host, sock.getsockname()[1])
+        return self.url
+
+    async def close(self):
+        for connection in list(self.connections):
+            await connection.ws.close()
+        await self.runner.cleanup()
+
+    async def wait_joined(self, channels): # Waits until the bot is in every one of channels.
+        for channel in channels:
+            await self.joined.setdefault(channel.lower(), asyncio.Event()).wait()
+
+    def chat(self, channel, user, text, mod=False, subscriber=False): # user says text in channel.
+        channel, user = channel.lower(), user.lower()
+        self._member(channel, user)
+        badges = ["broadcaster/1"] if user == channel else (["moderator/1"] if mod else [])
+        if subscriber:
+            badges.append("subscriber/0")
+        tags = {
+            'badge-info': "", 'badges': ",".join(badges), 'color': "", 'display-name': user, 'emotes': "", 'first-msg': 0,
+            'flags': "", 'id': next(self.messageids), 'mod': int(mod), 'room-id': self._id(channel), 'subscriber': int(subscriber),
+            'tmi-sent-ts': int(time.time() * 1000), 'turbo': 0, 'user-id': self._id(user), 'user-type': "mod" if mod else "",
+        }
+        self._broadcast(channel, tagged(tags, ":{0}!{0}@{0}.tmi.twitch.tv PRIVMSG #{1} :{2}".format(user, channel, text)))
+
+    def usernotice(self, channel, user, msgid, params=None): # A sub, gift or other event from user, e.g. usernotice(c, "gifter", "subgift", {'msg-param-recipient-display-name': "someone"}).
+        channel, user = channel.lower(), user.lower()
+        tags = {
+            'badge-info': "", 'badges': "", 'color': "", 'display-name': user, 'emotes': "", 'flags': "",
+            'id': next(self.messageids), 'login': user, 'mod': 0, 'msg-id': msgid, 'room-id': self._id(channel), 'subscriber': 1,
+            'system-msg': "{} did a {}".format(user, msgid), 'tmi-sent-ts': int(time.time() * 1000), 'user-id': self._id(user),
+        }
+        tags.update(params or {})
+        tags['user-type'] = "" # twitchio expects this one to come last.
+        self._broadcast(channel, tagged(tags, ":tmi.twitch.tv USERNOTICE #{}".format(channel)))
+
+    async def ping(self): # Seconds until every connected bot has answered a PING, i.e. how far behind it is in reading what's been sent to it.
+        start = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        futures = []
+        for connection in self.connections:
+            future = loop.create_future()
+            connection.pings.append(future)
+            connection.send("PING :tmi.twitch.tv")
+            futures.append(future)
+        await asyncio.gather(*futures)
+        return time.perf_counter() - start
+
+    async def _handle(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        connection = Connection(ws)
+        self.connections.add(connection)
+        try:
+            async for message in ws:
+                if message.type == WSMsgType.TEXT:
+                    for line in message.data.split("\r\n"):
+                        if line.strip():
+                            self._command(connection, line.strip())
+        finally:
+            self.connections.discard(connection)
+            connection.task.cancel()
+            for future in connection.pings:
+                if not future.done():
+                    future.set_result(None)
+        return ws
+
+    def _command(self, connection, line): # One line from the bot.
+        command, _, rest = line.partition(" ")
+        if command == "NICK":
+            connection.nick = rest.lower()
+            for code, text in (("001", "Welcome, GLHF!"), ("002", "Your host is tmi.twitch.tv"), ("003", "This server is rather new"), ("004", "-"), ("375", "-"), ("372", "You are in a maze of twisty passages, all alike."), ("376", ">")):
+                connection.send(":tmi.twitch.tv {} {} :{}".format(code, connection.nick, text))
+        elif command == "CAP":
+            caps = rest.partition(":")[2].split()
+            connection.caps.update(caps)
+            connection.send(":tmi.twitch.tv CAP * ACK :{}".format(" ".join(caps)))
+        elif command == "JOIN":
+            for channel in rest.lower().split(","):
+                self._join(connection, channel.lstrip("#"))
+        elif command == "PART":
+            for channel in rest.lower().split(","):
+                connection.channels.discard(channel.lstrip("#"))
+                connection.send(":{0}!{0}@{0}.tmi.twitch.tv PART {1}".format(connection.nick, channel))
+        elif command == "PING":
+            connection.send(":tmi.twitch.tv PONG tmi.twitch.tv {}".format(rest))
+        elif command == "PONG":
+            if connection.pings:
+                future = connection.pings.popleft()
+                if not future.done():
+                    future.set_result(None)
+        elif command == "PRIVMSG":
+            channel, _, text = rest.partition(" :")
+            self._privmsg(connection, channel.lstrip("#").lower(), text)
+
+    def _join(self, connection, channel):
+        nick = connection.nick
+        connection.channels.add(channel)
+        connection.send(":{0}!{0}@{0}.tmi.twitch.tv JOIN #{1}".format(nick, channel))
+        connection.send(":{0}.tmi.twitch.tv 353 {0} = #{1} :{0}".format(nick, channel))
+        connection.send(":{0}.tmi.twitch.tv 366 {0} #{1} :End of /NAMES list".format(nick, channel))
+        badges = "moderator/1" if self.botismod else ""
+        connection.send(tagged({'badge-info': "", 'badges': badges, 'color': "", 'display-name': nick, 'emote-sets': 0, 'mod': int(self.botismod), 'subscriber': 0, 'user-type': "mod" if self.botismod else ""}, ":tmi.twitch.tv USERSTATE #{}".format(channel)))
+        connection.send(tagged({'emote-only': 0, 'followers-only': -1, 'r9k': 0, 'room-id': self._id(channel), 'slow': 0, 'subs-only': 0}, ":tmi.twitch.tv ROOMSTATE #{}".format(channel)))
+        self.joined.setdefault(channel, asyncio.Event()).set()
+
+    def _privmsg(self, connection, channel, text): # The bot said something. It goes through only if Twitch would let it.
+        now = time.monotonic()
+        sent = self.sent.setdefault(channel, deque())
+        while sent and sent[0] <= now - self.window:
+            sent.popleft()
+        last, when = self.last.get(channel, (None, 0.0))
+        if len(text) > MAXLENGTH:
+            reason = "msg_toolong"
+        elif len(sent) >= (MODLIMIT if self.botismod else LIMIT):
+            reason = "msg_ratelimit"
+        elif not self.botismod and text == last and now - when < self.window:
+            reason = "msg_duplicate"
+        else:
+            sent.append(now)
+            self.last[channel] = (text, now)
+            self.accepted += 1
+            if self.onsend:
+                self.onsend(channel, text)
+            return
+        self.dropped[reason] = self.dropped.get(reason, 0) + 1
+        if reason in NOTICES:
+            connection.send(tagged({'msg-id': reason}, ":tmi.twitch.tv NOTICE #{} :{}".format(channel, NOTICES[reason])))
+
+    def _member(self, channel, user): # Twitch tells bots with the membership capability who's in chat. Here that's the first time someone talks.
+        members = self.members.setdefault(channel, set())
+        if user in members:
+            return
+        members.add(user)
+        line = ":{0}!{0}@{0}.tmi.twitch.tv JOIN #{1}".format(user, channel)
+        for connection in self.connections:
+            if channel in connection.channels and "twitch.tv/membership" in connection.caps:
+                connection.send(line)
+
+    def _broadcast(self, channel, line):
+        for connection in self.connections:
+            if channel in connection.channels:
+                connection.send(line)
+
+    def _id(self, name):
+        return self.ids.setdefault(name, 1000 + len(self.ids))
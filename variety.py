@@ -0,0 +1,97 @@
+import datetime
+import heapq
+
+"""
+VarietyIndex answers "has this person played in the past week?" for the variety toggle. It maps each twitch name to the
+last date they played, so the check is a single dictionary lookup, and it is updated as people play or are plugged
+into/removed from the log, so it never goes stale during a long stream. A heap ordered by expiry date lets expire()
+drop people the moment their week is up without looking at anyone else. If index_names() is given a NameIndex (see
+nameindex.py), both names of everyone in the index are kept in it as "log".
+"""
+
+
+class VarietyIndex:
+    def __init__(self, days=7):
+        self.days = days
+        self.version = 0  # Goes up whenever someone is added to or dropped from the index.
+        self._lastplayed = {}  # twitch name -> (date last played, switch name they played under)
+        self._byswitch = {}  # switch name -> set of twitch names
+        self._expiries = []  # heap of (expiry date, twitch name). Entries made stale by a newer play are skipped when popped.
+        self.names = None
+
+    def __len__(self):
+        return len(self._lastplayed)
+
+    def __contains__(self, twitch):
+        return twitch in self._lastplayed and self._expiry(self._lastplayed[twitch][0]) > datetime.date.today()
+
+    def has_switch(self, switch):
+        return switch in self._byswitch
+
+    def entries(self): # Returns (twitch name, switch name, date played) for everyone currently in the index.
+        return [(twitch, switch, dateplayed.isoformat()) for twitch, (dateplayed, switch) in self._lastplayed.items()]
+
+    def record(self, twitch, switch, dateplayed):
+        if isinstance(dateplayed, str):
+            dateplayed = datetime.date.fromisoformat(dateplayed)
+        if twitch in self._lastplayed:
+            if self._lastplayed[twitch][0] > dateplayed: # An older play being loaded or plugged in doesn't shorten a newer one.
+                return
+            self._unindex_switch(twitch)
+        elif self.names is not None:
+            self.names.add(twitch, 'log')
+        self._lastplayed[twitch] = (dateplayed, switch)
+        if self.names is not None:
+            self.names.add(switch, 'log')
+        self.version += 1
+        self._byswitch.setdefault(switch, set()).add(twitch)
+        heapq.heappush(self._expiries, (self._expiry(dateplayed), twitch))
+
+    def remove_twitch(self, twitch):
+        if twitch in self._lastplayed:
+            self._unindex_switch(twitch)
+            del self._lastplayed[twitch]
+            if self.names is not None:
+                self.names.discard(twitch, 'log')
+            self.version += 1
+
+    def remove_switch(self, switch): # Removes everyone who played under the given switch name.
+        for twitch in list(self._byswitch.get(switch, ())):
+            self.remove_twitch(twitch)
+
+    def load(self, plays): # Records several (twitch, switch, dateplayed) plays at once, e.g. the past week's log at startup.
+        for twitch, switch, dateplayed in plays:
+            self.record(twitch, switch, dateplayed)
+
+    def expire(self, today=None): # Drops everyone whose week is up and returns how many were dropped.
+        today = today or datetime.date.today()
+        expired = 0
+        while self._expiries and self._expiries[0][0] <= today:
+            expiry, twitch = heapq.heappop(self._expiries)
+            if twitch in self._lastplayed and self._expiry(self._lastplayed[twitch][0]) == expiry:
+                self.remove_twitch(twitch)
+                expired += 1
+        if len(self._expiries) > 2 * len(self._lastplayed) + 64: # Too many stale heap entries have piled up, so rebuild it.
+            self._expiries = [(self._expiry(dateplayed), twitch) for twitch, (dateplayed, _) in self._lastplayed.items()]
+            heapq.heapify(self._expiries)
+        return expired
+
+    def next_expiry(self): # The date the next person's week is up, or None if the index is empty.
+        return self._expiries[0][0] if self._expiries else None
+
+    def _expiry(self, dateplayed):
+        return dateplayed + datetime.timedelta(days=self.days)
+
+    def index_names(self, names): # Starts keeping a NameIndex up to date, beginning with everyone already in the index.
+        self.names = names
+        for twitch, (_, switch) in self._lastplayed.items():
+            names.add(twitch, 'log')
+            names.add(switch, 'log')
+
+    def _unindex_switch(self, twitch):
+        switch = self._lastplayed[twitch][1]
+        if self.names is not None:
+            self.names.discard(switch, 'log')
+        self._byswitch[switch].discard(twitch)
+        if not self._byswitch[switch]:
+            del self._byswitch[switch]